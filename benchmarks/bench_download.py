@@ -0,0 +1,103 @@
+# 下载器基准与续传验证：本地起一个支持 Range 的 http.server，可注入限速与断线
+# 用法：python benchmarks/bench_download.py [--mb 64] [--rate-mb 8] [--fail-every-mb 5] [--connections 1 4 8]
+import os, sys, time, random, hashlib, argparse, tempfile, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rtsub.download import SegmentedDownloader, DownloadCancelled, discard_partial
+
+class RangeHandler(BaseHTTPRequestHandler):
+    payload = b""
+    rate = 0            # 每连接限速（字节/秒），0 为不限
+    fail_every = 0      # 每连接发送约这么多字节后随机断开，0 为不断线
+    def log_message(self, *args):
+        pass
+    def do_GET(self):
+        data = self.payload
+        total = len(data)
+        start, end = 0, total - 1
+        rng = self.headers.get("Range")
+        if rng and rng.startswith("bytes="):
+            a, _, b = rng[6:].partition("-")
+            start = int(a) if a else 0
+            end = min(int(b), total - 1) if b else total - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        limit = random.randint(self.fail_every // 2, self.fail_every) if self.fail_every else None
+        sent, pos, t0 = 0, start, time.perf_counter()
+        try:
+            while pos <= end:
+                n = min(64 * 1024, end - pos + 1)
+                if limit is not None and sent + n > limit:
+                    return  # 模拟断线：不发完就关闭连接
+                self.wfile.write(data[pos:pos + n])
+                pos += n; sent += n
+                if self.rate:
+                    ahead = sent / self.rate - (time.perf_counter() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def serve(payload: bytes, rate: int, fail_every: int):
+    RangeHandler.payload = payload
+    RangeHandler.rate = rate
+    RangeHandler.fail_every = fail_every
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}/model.zip"
+
+def check(dest: str, digest: str):
+    with open(dest, "rb") as f:
+        ok = hashlib.sha256(f.read()).hexdigest() == digest
+    if not ok:
+        raise SystemExit(f"checksum mismatch: {dest}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=64)
+    ap.add_argument("--rate-mb", type=float, default=8.0, help="per-connection rate limit, MB/s")
+    ap.add_argument("--fail-every-mb", type=float, default=5.0, help="drop each connection after ~N MB (0=never)")
+    ap.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8])
+    args = ap.parse_args()
+    payload = os.urandom(args.mb * 1024 * 1024)
+    digest = hashlib.sha256(payload).hexdigest()
+    srv, url = serve(payload, int(args.rate_mb * 1024 * 1024), int(args.fail_every_mb * 1024 * 1024))
+    tmp = tempfile.mkdtemp()
+    try:
+        for n in args.connections:
+            dest = os.path.join(tmp, f"c{n}.zip")
+            dl = SegmentedDownloader(url, dest, connections=n, min_segment=1024 * 1024, backoff=0.05, retries=8)
+            t0 = time.perf_counter()
+            dl.run()
+            dt = time.perf_counter() - t0
+            check(dest, digest)
+            print(f"connections={n:<2} {args.mb / dt:7.1f} MB/s  {dt:6.2f} s  retries={dl.retried}")
+
+        # 续传：下载到一半取消，再次下载应只取剩余部分
+        dest = os.path.join(tmp, "resume.zip")
+        half = len(payload) // 2
+        first = SegmentedDownloader(url, dest, connections=4, min_segment=1024 * 1024, backoff=0.05, retries=8,
+                                    cancelled=lambda: first.done_bytes() >= half)
+        try:
+            first.run()
+        except DownloadCancelled:
+            pass
+        second = SegmentedDownloader(url, dest, connections=4, min_segment=1024 * 1024, backoff=0.05, retries=8)
+        second.run()
+        check(dest, digest)
+        print(f"resume: {first.done_bytes() / 2 ** 20:.1f} MB kept from the cancelled run, "
+              f"{second.resumed_bytes / 2 ** 20:.1f} MB reused, checksum ok")
+        discard_partial(dest)
+    finally:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# 端到端延迟基准：参考录音 → 采集（电平 + 重采样）→ 识别（ASRWorker 背后的 RecognitionEngine）→ 翻译
+# 用法：python benchmarks/bench_latency.py [a.wav b.wav ...] [--mode paced|full|both] [--stub | --model 目录] [--json out.json]
+# 不给 WAV 时生成一段合成“语音”；--stub（无模型时默认）用确定性的桩识别器/翻译器，可在没有模型的机器上复现。
+# 延迟从“最后一个词在录音里结束的时刻”算起：paced 模式下即按实时节拍播放到该样本的时刻，
+# full 模式下为含该样本的音频块写入环形缓冲的时刻（此时延迟主要反映排队）。
+import os, sys, json, time, wave, bisect, argparse, platform, threading, subprocess
+from typing import Dict, List, Optional
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rtsub.audio import StreamingResampler, LevelMeter, OverflowPolicy
+from rtsub.engine import CaptureEngine, RecognitionEngine
+from rtsub.endpoint import percentile, FixedEndpointPolicy, LatencyBudgetPolicy
+from rtsub.modelpool import _rss_bytes
+from rtsub.batch import _pcm_from_wav
+
+RATE = 16000
+
+def _burn(seconds: float):
+    # 用忙等模拟计算量，让各阶段的 CPU 时间可比
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+# ----------------- 桩识别器 / 翻译器 -----------------
+class StubRecognizer:
+    # 接口与 KaldiRecognizer 一致：连续发声区记为一个词，词后静音达到 endpoint_s 时 AcceptWaveform 返回 True
+    def __init__(self, rate: int = RATE, cost: float = 0.1, endpoint_s: float = 0.5, thresh_db: float = -35.0,
+                 word_gap_s: float = 0.06):
+        self.rate = rate
+        self.cost = cost
+        self.endpoint_s = endpoint_s
+        self.thresh_db = thresh_db
+        self.word_gap_s = word_gap_s
+        self.frame = rate // 50
+        self._rem = np.empty(0, dtype=np.int16)
+        self._t = 0.0
+        self._cur: Optional[float] = None
+        self._last_voiced = 0.0
+        self._words: List = []
+        self._final: List = []
+        self._n = 0
+
+    def _close_word(self):
+        self._n += 1
+        self._words.append((f"w{self._n}", round(self._cur, 3), round(self._last_voiced, 3)))
+        self._cur = None
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        x = np.concatenate([self._rem, np.frombuffer(data, dtype=np.int16)])
+        _burn(self.cost * (x.size - self._rem.size) / self.rate)
+        nf = x.size // self.frame
+        self._rem = x[nf * self.frame:].copy()
+        f = x[:nf * self.frame].reshape(nf, self.frame).astype(np.float32)
+        energy = 10.0 * np.log10(np.einsum("ij,ij->i", f, f) / (self.frame * 32768.0 ** 2) + 1e-10)
+        step = self.frame / self.rate
+        endpoint = False
+        for e in energy:
+            t_end = self._t + step
+            if e > self.thresh_db:
+                if self._cur is None:
+                    self._cur = self._t
+                self._last_voiced = t_end
+            else:
+                if self._cur is not None and t_end - self._last_voiced >= self.word_gap_s:
+                    self._close_word()
+                if self._cur is None and self._words and t_end - self._words[-1][2] >= self.endpoint_s:
+                    self._final, self._words = self._final + self._words, []
+                    endpoint = True
+            self._t = t_end
+        return endpoint
+
+    @staticmethod
+    def _json(words, key: str, words_key: str) -> str:
+        return json.dumps({key: " ".join(w[0] for w in words),
+                           words_key: [{"word": w[0], "start": w[1], "end": w[2], "conf": 1.0} for w in words]})
+
+    def Result(self) -> str:
+        words, self._final = self._final, []
+        return self._json(words, "text", "result")
+
+    def PartialResult(self) -> str:
+        words = list(self._words)
+        if self._cur is not None:
+            words.append((f"w{self._n + 1}", round(self._cur, 3), round(self._last_voiced, 3)))
+        return self._json(words, "partial", "partial_result")
+
+    def FinalResult(self) -> str:
+        if self._cur is not None:
+            self._close_word()
+        words, self._final, self._words = self._final + self._words, [], []
+        return self._json(words, "text", "result")
+
+class StubTranslator:
+    def __init__(self, tgt: str, cost_ms: float = 15.0, per_char_ms: float = 0.3):
+        self.tgt = tgt
+        self.cost_ms = cost_ms
+        self.per_char_ms = per_char_ms
+
+    def __call__(self, text: str) -> str:
+        _burn((self.cost_ms + self.per_char_ms * len(text)) / 1000.0)
+        return f"[{self.tgt}] {text.upper()}"
+
+    def batch(self, texts: List[str]) -> List[str]:
+        # 批量调用：固定开销只付一次
+        _burn((self.cost_ms + self.per_char_ms * sum(len(t) for t in texts)) / 1000.0)
+        return [f"[{self.tgt}] {t.upper()}" for t in texts]
+
+# ----------------- 记录词结束位置与各阶段 CPU 的包装 -----------------
+class TimedRecognizer:
+    # 包住真实或桩识别器：把识别器时间轴上的词结束时刻映射回原始 16k 样本位置（VAD 跳过的静音不送识别器），
+    # 并统计 AcceptWaveform 的 CPU 时间
+    def __init__(self, rec, ring, rate: int = RATE):
+        self.rec = rec
+        self.ring = ring
+        self.rate = rate
+        self.fed = 0
+        self._fed_at: List[int] = []
+        self._read_at: List[int] = []
+        self.decode_cpu = 0.0
+        self.last_end: Optional[int] = None
+
+    def _orig_pos(self, rec_t: float) -> int:
+        s = int(rec_t * self.rate)
+        i = bisect.bisect_left(self._fed_at, s)
+        if i >= len(self._fed_at):
+            return self.ring.read_total
+        return self._read_at[i] - (self._fed_at[i] - s)
+
+    def _note(self, res: str) -> str:
+        try:
+            words = json.loads(res or "{}").get("result") or []
+        except Exception:
+            words = []
+        self.last_end = self._orig_pos(float(words[-1]["end"])) if words else self.ring.read_total
+        return res
+
+    def AcceptWaveform(self, data: bytes) -> bool:
+        c0 = time.thread_time()
+        ok = self.rec.AcceptWaveform(data)
+        self.decode_cpu += time.thread_time() - c0
+        self.fed += len(data) // 2
+        self._fed_at.append(self.fed)
+        self._read_at.append(self.ring.read_total)
+        return ok
+
+    def Result(self) -> str:
+        return self._note(self.rec.Result())
+
+    def FinalResult(self) -> str:
+        return self._note(self.rec.FinalResult())
+
+    def PartialResult(self) -> str:
+        return self.rec.PartialResult()
+
+class BenchEngine(RecognitionEngine):
+    def __init__(self, *a, translator=None, **kw):
+        self.translator = translator
+        self.trans_cpu = 0.0
+        super().__init__(*a, **kw)
+
+    def _translate(self, text: str) -> str:
+        c0 = time.thread_time()
+        try:
+            return self.translator(text) if self.translator else super()._translate(text)
+        finally:
+            self.trans_cpu += time.thread_time() - c0
+
+    def _translate_batch(self, texts: List[str]) -> List[str]:
+        c0 = time.thread_time()
+        try:
+            return self.translator.batch(texts) if self.translator else super()._translate_batch(texts)
+        finally:
+            self.trans_cpu += time.thread_time() - c0
+
+# ----------------- 参考音频 -----------------
+def synth_speech(seconds: float, rate: int = 48000, seed: int = 0) -> np.ndarray:
+    # 合成的“说话”：谐波嗡声组成的词（150–450 ms），词间 60–200 ms，句间 0.7–1.5 s 静音，底噪约 -60 dBFS
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    out = rng.normal(0, 30, n)
+    pos = int(0.5 * rate)
+    while pos < n:
+        for _ in range(int(rng.integers(3, 12))):
+            ln = int(rng.uniform(0.15, 0.45) * rate)
+            if pos + ln >= n:
+                break
+            t = np.arange(ln) / rate
+            f0 = rng.uniform(110, 220)
+            w = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+            out[pos:pos + ln] += 5000 * w * np.hanning(ln) ** 0.3
+            pos += ln + int(rng.uniform(0.06, 0.2) * rate)
+        pos += int(rng.uniform(0.7, 1.5) * rate)
+    return np.clip(out, -32768, 32767).astype(np.int16)
+
+def load_wav(path: str):
+    with wave.open(path, "rb") as w:
+        rate = w.getframerate()
+    return _pcm_from_wav(path, rate), rate
+
+# ----------------- 单次运行 -----------------
+def _dist(values: List[float]) -> Dict:
+    ms = [v * 1000.0 for v in values]
+    return {"n": len(ms), "p50_ms": round(percentile(ms, 50), 1), "p95_ms": round(percentile(ms, 95), 1),
+            "p99_ms": round(percentile(ms, 99), 1), "max_ms": round(max(ms), 1) if ms else 0.0,
+            "mean_ms": round(sum(ms) / len(ms), 1) if ms else 0.0}
+
+def run_once(name: str, audio: np.ndarray, in_rate: int, paced: bool, args, model=None) -> Dict:
+    translator = StubTranslator(args.tgt_lang, args.stub_trans_ms) if model is None and args.translate else None
+    endpoint = (LatencyBudgetPolicy(budget=args.budget) if args.endpoint == "budget" else FixedEndpointPolicy())
+    src_t, txt_t, ends = {}, {}, {}
+    lock = threading.Lock()
+
+    def on_source(seg_id: int, text: str):
+        with lock:
+            src_t[seg_id] = time.perf_counter()
+            ends[seg_id] = timed.last_end if timed.last_end is not None else eng.ring.read_total
+
+    def on_text(seg_id: int, src: str, trans: str):
+        with lock:
+            txt_t.setdefault(seg_id, time.perf_counter())
+
+    errors = []
+    eng = BenchEngine(args.asr_lang, args.tgt_lang if args.translate else args.asr_lang, translator=translator,
+                      vad=args.vad, endpoint=endpoint, speculative=args.speculative, trans_batch=args.trans_batch,
+                      overflow_policy=OverflowPolicy.DROP_OLDEST if paced else OverflowPolicy.BLOCK,
+                      on_source=on_source, on_text=on_text, on_error=errors.append)
+    rec = StubRecognizer(cost=args.stub_cost) if model is None else eng._make_recognizer(model)
+    timed = TimedRecognizer(rec, eng.ring)
+
+    cpu = {}
+    def asr():
+        c0 = time.thread_time()
+        eng.run_with_recognizer(timed)
+        cpu["asr"] = time.thread_time() - c0
+
+    # 采集阶段走 CaptureEngine 的真实处理路径（电平表 + 流式重采样 + 写环形缓冲），只是数据来自文件
+    cap = CaptureEngine(None, rate=RATE, chunk=args.chunk, sink=eng.ring)
+    cap._resampler = StreamingResampler(in_rate, RATE, max_chunk=args.chunk * 4) if in_rate != RATE else None
+    meter = LevelMeter(in_rate, ui_hz=15.0, max_chunk=args.chunk * 4)
+    tail = np.zeros(int(args.tail * in_rate), dtype=np.int16)
+    stream = np.concatenate([audio, tail])
+    writes_pos: List[int] = []
+    writes_t: List[float] = []
+    player_done = threading.Event()
+
+    def player():
+        c0 = time.thread_time()
+        for start in range(0, stream.size, args.chunk):
+            end = min(stream.size, start + args.chunk)
+            if paced:
+                delay = t0 + end / in_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while eng.ring.fill() > eng.ring.capacity // 2:
+                    time.sleep(0.001)
+            cap._process(stream[start:end], meter)
+            writes_pos.append(eng.ring.written)
+            writes_t.append(time.perf_counter())
+        cpu["capture"] = time.thread_time() - c0
+        player_done.set()
+
+    peak = [_rss_bytes()]
+    def monitor():
+        while not player_done.is_set() or th_asr.is_alive():
+            peak[0] = max(peak[0], _rss_bytes())
+            time.sleep(0.02)
+
+    p0 = time.process_time()
+    t0 = time.perf_counter()
+    th_asr = threading.Thread(target=asr, name="bench-asr", daemon=True)
+    th_play = threading.Thread(target=player, name="bench-capture", daemon=True)
+    th_mon = threading.Thread(target=monitor, name="bench-rss", daemon=True)
+    for th in (th_asr, th_play, th_mon):
+        th.start()
+    th_play.join()
+    # 排空：缓冲读完、没有未出句的部分结果、翻译全部完成或被丢弃，且静默一小段时间
+    deadline = time.perf_counter() + args.drain_timeout
+    quiet_since = time.perf_counter()
+    seen = -1
+    while time.perf_counter() < deadline:
+        tr = eng._trans
+        state = (len(src_t), len(txt_t), tr.translated, tr.dropped)
+        if state != seen:
+            seen, quiet_since = state, time.perf_counter()
+        settled = (eng.ring.fill() == 0 and not eng._cur_partial
+                   and (not args.translate or tr.translated + tr.dropped >= tr.submitted))
+        if settled and time.perf_counter() - quiet_since > 0.3:
+            break
+        time.sleep(0.01)
+    wall = time.perf_counter() - t0
+    eng.stop()
+    th_asr.join(5.0)
+    th_mon.join(1.0)
+    proc_cpu = time.process_time() - p0
+
+    def spoken_at(pos: int) -> float:
+        if paced:
+            return t0 + pos / RATE
+        i = bisect.bisect_left(writes_pos, pos)
+        return writes_t[min(i, len(writes_t) - 1)]
+
+    src_lat = [src_t[s] - spoken_at(ends[s]) for s in src_t]
+    txt_lat = [txt_t[s] - spoken_at(ends[s]) for s in txt_t if s in ends]
+    audio_s = audio.size / in_rate
+    asr_cpu = cpu.get("asr", 0.0)
+    return {
+        "file": name, "mode": "paced" if paced else "full", "audio_s": round(audio_s, 2), "wall_s": round(wall, 3),
+        "rtf_wall": round(wall / audio_s, 4) if audio_s else 0.0,
+        "rtf_asr_cpu": round(asr_cpu / audio_s, 4) if audio_s else 0.0,
+        "segments": len(src_t), "translations": len(txt_t), "dropped_translations": eng._trans.dropped,
+        "latency": {"audio_to_source": _dist(src_lat), "audio_to_translation": _dist(txt_lat)},
+        "cpu_s": {"capture": round(cpu.get("capture", 0.0), 3), "asr": round(asr_cpu, 3),
+                  "decode": round(timed.decode_cpu, 3), "translate": round(eng.trans_cpu, 3),
+                  "process": round(proc_cpu, 3)},
+        "peak_rss_mb": round(peak[0] / 1024 ** 2, 1), "ring": eng.ring.stats(), "errors": errors,
+    }
+
+# ----------------- 汇总 -----------------
+def _meta(args) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        commit = ""
+    return {"commit": commit, "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "recognizer": "stub" if args.stub else args.model, "args": {k: v for k, v in vars(args).items() if k != "files"}}
+
+def _max_rss_mb() -> float:
+    try:
+        import resource
+        r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(r / 1024 ** 2 if sys.platform == "darwin" else r / 1024, 1)
+    except Exception:
+        return 0.0
+
+def print_row(r: Dict):
+    s, t = r["latency"]["audio_to_source"], r["latency"]["audio_to_translation"]
+    c = r["cpu_s"]
+    print(f"{os.path.basename(r['file']):>18} {r['mode']:>5}  audio {r['audio_s']:6.1f}s  wall {r['wall_s']:6.1f}s  "
+          f"RTF {r['rtf_wall']:.3f} (asr cpu {r['rtf_asr_cpu']:.3f})  segs {r['segments']:3d}  "
+          f"src p50/p95/p99 {s['p50_ms']:6.0f}/{s['p95_ms']:6.0f}/{s['p99_ms']:6.0f} ms  "
+          f"tr p50/p95/p99 {t['p50_ms']:6.0f}/{t['p95_ms']:6.0f}/{t['p99_ms']:6.0f} ms  "
+          f"cpu cap/asr/tr {c['capture']:.2f}/{c['asr']:.2f}/{c['translate']:.2f}s  rss {r['peak_rss_mb']:.0f} MB")
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end latency benchmark: audio → source subtitle → translation")
+    ap.add_argument("files", nargs="*", help="reference WAV files (default: synthetic speech)")
+    ap.add_argument("--mode", choices=["paced", "full", "both"], default="both")
+    ap.add_argument("--stub", action="store_true", help="stub recognizer/translator (default when --model is not given)")
+    ap.add_argument("--model", default=None, help="Vosk model folder name under models/ (a path to a folder inside models/ also works)")
+    ap.add_argument("--asr-lang", default="en")
+    ap.add_argument("--tgt-lang", default="zh")
+    ap.add_argument("--no-translate", dest="translate", action="store_false")
+    ap.add_argument("--synth-seconds", type=float, default=30.0)
+    ap.add_argument("--synth-rate", type=int, default=48000, help="synthetic capture rate (exercises resampling)")
+    ap.add_argument("--chunk", type=int, default=1024, help="capture frames per buffer")
+    ap.add_argument("--tail", type=float, default=2.0, help="seconds of trailing silence")
+    ap.add_argument("--vad", action="store_true")
+    ap.add_argument("--speculative", action="store_true")
+    ap.add_argument("--endpoint", choices=["fixed", "budget"], default="fixed")
+    ap.add_argument("--budget", type=float, default=0.4)
+    ap.add_argument("--stub-cost", type=float, default=0.1, help="stub recognizer CPU seconds per audio second")
+    ap.add_argument("--stub-trans-ms", type=float, default=15.0, help="stub translator CPU ms per segment")
+    ap.add_argument("--trans-batch", type=int, default=8, help="max segments per translation call (1 = off)")
+    ap.add_argument("--drain-timeout", type=float, default=15.0)
+    ap.add_argument("--json", default=None, help="write results as JSON ('-' for stdout)")
+    args = ap.parse_args()
+    args.stub = args.stub or not args.model
+
+    model = None
+    if not args.stub:
+        import vosk
+        from rtsub.utils import MODELS_DIR, argos_warm_up
+        from rtsub.cli import select_model
+        folder = select_model(args.model, args.asr_lang)
+        if not folder:
+            sys.exit(2)
+        t = time.perf_counter()
+        model = vosk.Model(os.path.join(MODELS_DIR, folder))
+        print(f"model loaded in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+        if args.translate:
+            t = time.perf_counter()
+            argos_warm_up(args.asr_lang, args.tgt_lang)
+            print(f"translator warmed up in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+    inputs = [(f, *load_wav(f)) for f in args.files] or \
+             [("synthetic", synth_speech(args.synth_seconds, args.synth_rate), args.synth_rate)]
+    modes = [True, False] if args.mode == "both" else [args.mode == "paced"]
+    runs = []
+    for name, audio, rate in inputs:
+        for paced in modes:
+            r = run_once(name, audio, rate, paced, args, model)
+            runs.append(r)
+            print_row(r)
+    result = {"meta": _meta(args), "max_rss_mb": _max_rss_mb(), "runs": runs}
+    if args.json == "-":
+        print(json.dumps(result, ensure_ascii=False, indent=1))
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1)
+
+if __name__ == "__main__":
+    main()
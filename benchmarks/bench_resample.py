@@ -0,0 +1,52 @@
+# 重采样微基准：旧的逐块 np.interp 实现 vs StreamingResampler
+# 用法：python benchmarks/bench_resample.py [--seconds 30] [--chunk 1024]
+import os, sys, time, argparse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rtsub.audio import StreamingResampler
+
+def interp_resample(audio_np: np.ndarray, src: float, dst: float) -> bytes:
+    # 与原 AudioCaptureWorker._resample_to_16k 相同的实现
+    dst_len = int(round(audio_np.size * dst / src))
+    if dst_len <= 0:
+        return b""
+    x_old = np.linspace(0, 1, num=audio_np.size, endpoint=False, dtype=np.float64)
+    x_new = np.linspace(0, 1, num=dst_len, endpoint=False, dtype=np.float64)
+    y = np.interp(x_new, x_old, audio_np.astype(np.float64))
+    y = np.clip(y, -32768, 32767).astype(np.int16)
+    return y.tobytes()
+
+def make_signal(rate: int, seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    x = 6000 * np.sin(2 * np.pi * 440 * t) + 3000 * np.sin(2 * np.pi * 9500 * t) + rng.normal(0, 300, t.size)
+    return np.clip(x, -32768, 32767).astype(np.int16)
+
+def run(rate: int, seconds: float, chunk: int):
+    x = make_signal(rate, seconds)
+    chunks = [x[i:i + chunk] for i in range(0, x.size, chunk)]
+    t0 = time.perf_counter()
+    for c in chunks:
+        interp_resample(c, rate, 16000)
+    t_old = time.perf_counter() - t0
+    rs = StreamingResampler(rate, 16000, max_chunk=chunk)
+    t0 = time.perf_counter()
+    for c in chunks:
+        rs.process(c).tobytes()
+    t_new = time.perf_counter() - t0
+    us = 1e6 / len(chunks)
+    print(f"{rate:>6} Hz  chunks={len(chunks):<6} interp={t_old * us:8.1f} us/chunk  "
+          f"polyphase={t_new * us:8.1f} us/chunk  speedup={t_old / t_new:5.2f}x  "
+          f"audio/cpu(polyphase)={seconds / t_new:7.0f}x")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=30.0)
+    ap.add_argument("--chunk", type=int, default=1024)
+    args = ap.parse_args()
+    for rate in (48000, 44100, 32000, 22050):
+        run(rate, args.seconds, args.chunk)
+
+if __name__ == "__main__":
+    main()
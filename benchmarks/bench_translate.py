@@ -0,0 +1,108 @@
+# 翻译基准：
+#   1) 短段落快速路径（直接 SentencePiece + CTranslate2）vs argos 完整 translate()（分句 + 分词）的单段耗时
+#   2) 逐段 argos_translate vs 积压段落合批的 argos_translate_batch 的吞吐
+# 用法：python benchmarks/bench_translate.py [--src en --tgt zh] [--segments 64] [--batch 1,2,4,8,16] [--text-file 每行一段.txt]
+# 需要已安装对应的 Argos 语言包；翻译缓存在基准期间关闭，避免命中缓存。
+import os, sys, time, argparse, statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from rtsub import argosbatch
+from rtsub.utils import (ARGOS_OK, argos_pair_installed, argos_translate, argos_translate_batch, argos_warm_up,
+                         configure_translation_cache)
+
+SAMPLES = [
+    "Good morning everyone, let's get started.",
+    "Can you hear me clearly on the other side?",
+    "The quarterly numbers look better than we expected.",
+    "I think we should move the release to next week.",
+    "Please send me the slides after the meeting.",
+    "We still need to fix the login issue on mobile.",
+    "Does anyone have questions about the new schedule?",
+    "Let's take a five minute break and come back.",
+    "The customer asked for a demo on Thursday afternoon.",
+    "Thanks for joining, see you all tomorrow.",
+]
+
+def load_segments(path, n: int):
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            base = [ln.strip() for ln in f if ln.strip()]
+    else:
+        base = SAMPLES
+    # 段落末尾加序号，避免相同文本之间互相影响计时
+    return [f"{base[i % len(base)]} ({i})" if i >= len(base) else base[i] for i in range(n)]
+
+def run_single(segs, src, tgt):
+    t0 = time.perf_counter()
+    for s in segs:
+        argos_translate(s, src, tgt)
+    return time.perf_counter() - t0
+
+def run_batched(segs, src, tgt, size: int):
+    t0 = time.perf_counter()
+    for i in range(0, len(segs), size):
+        argos_translate_batch(segs[i:i + size], src, tgt)
+    return time.perf_counter() - t0
+
+def isolated(segs, src, tgt, fn, repeat: int):
+    times = []
+    for i in range(repeat):
+        s = segs[i % len(segs)]
+        t0 = time.perf_counter()
+        fn(s)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+def per_segment(segs, src, tgt, fast: bool):
+    # 快速路径按长度开关：FAST_MAX_CHARS 置 0 时 argos_translate 每段都走 argos 完整流程
+    saved = argosbatch.FAST_MAX_CHARS
+    argosbatch.FAST_MAX_CHARS = saved if fast else 0
+    try:
+        times = []
+        for s in segs:
+            t0 = time.perf_counter()
+            argos_translate(s, src, tgt)
+            times.append(time.perf_counter() - t0)
+    finally:
+        argosbatch.FAST_MAX_CHARS = saved
+    return times
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default="en")
+    ap.add_argument("--tgt", default="zh")
+    ap.add_argument("--segments", type=int, default=64)
+    ap.add_argument("--batch", default="1,2,4,8,16")
+    ap.add_argument("--text-file", default=None)
+    ap.add_argument("--repeat", type=int, default=10, help="isolated-segment repetitions")
+    args = ap.parse_args()
+    if not ARGOS_OK or not argos_pair_installed(args.src, args.tgt):
+        print(f"Argos package {args.src}->{args.tgt} is not installed; nothing to benchmark")
+        sys.exit(1)
+    configure_translation_cache(enabled=False)
+    t = time.perf_counter()
+    argos_warm_up(args.src, args.tgt)
+    print(f"warm-up {time.perf_counter() - t:.2f}s")
+    segs = load_segments(args.text_file, args.segments)
+
+    short = [x for x in segs if argosbatch.is_short(x)]
+    if short:
+        full = per_segment(short, args.src, args.tgt, fast=False)
+        fast = per_segment(short, args.src, args.tgt, fast=True)
+        f50, q50 = statistics.median(full), statistics.median(fast)
+        print(f"per segment ({len(short)} short, <= {argosbatch.FAST_MAX_CHARS} chars): "
+              f"full p50 {f50 * 1000:.1f} ms, fast p50 {q50 * 1000:.1f} ms, "
+              f"saved {(f50 - q50) * 1000:.1f} ms/seg (x{f50 / max(q50, 1e-9):.2f})")
+
+    base = run_single(segs, args.src, args.tgt)
+    print(f"{'sequential':>12}: {base:7.2f}s  {len(segs) / base:6.1f} seg/s  {base / len(segs) * 1000:7.1f} ms/seg")
+    for size in [int(x) for x in args.batch.split(",") if x.strip()]:
+        dt = run_batched(segs, args.src, args.tgt, size)
+        print(f"{'batch ' + str(size):>12}: {dt:7.2f}s  {len(segs) / dt:6.1f} seg/s  {dt / len(segs) * 1000:7.1f} ms/seg"
+              f"  x{base / dt:.2f}")
+    one = isolated(segs, args.src, args.tgt, lambda s: argos_translate(s, args.src, args.tgt), args.repeat)
+    one_b = isolated(segs, args.src, args.tgt, lambda s: argos_translate_batch([s], args.src, args.tgt), args.repeat)
+    print(f"isolated segment: single {one * 1000:.1f} ms, batch-of-1 {one_b * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
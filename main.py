@@ -1,4 +1,20 @@
-from rtsub.app import main
+import sys
+from rtsub.startup import PROFILE
 
+# 全部放在 __main__ 里：批处理的 spawn 工作进程会以 __mp_main__ 重新执行本文件，不能因此导入 PySide6
 if __name__ == "__main__":
+    PROFILE.begin()
+    if "--headless" in sys.argv[1:]:
+        # 无界面模式不导入 PySide6
+        sys.argv.remove("--headless")
+        with PROFILE.phase("import rtsub.headless"):
+            from rtsub.headless import main as headless_main
+        sys.exit(headless_main())
+    if "--batch" in sys.argv[1:]:
+        sys.argv.remove("--batch")
+        from rtsub.batch import main as batch_main
+        sys.exit(batch_main())
+
+    with PROFILE.phase("import rtsub.app"):
+        from rtsub.app import main
     main()
@@ -1,12 +1,17 @@
 import sys, os, locale
+from importlib.util import find_spec
 from typing import Optional
-import pyaudio
-from PySide6.QtCore import Slot
+from PySide6.QtCore import Slot, QTimer
 from PySide6.QtWidgets import QApplication, QMessageBox
 
+from .startup import PROFILE
 from .ui import MainWindow, OverlayWindow
-from .workers import AudioCaptureWorker, ASRWorker
-from .utils import MODELS_DIR, argos_pair_installed, argos_find_package, argos_install_from_file, TranslateRoute, abs_path
+from .workers import AudioCaptureWorker, ASRWorker, DeviceScanWorker
+from .engine import auto_pick_device
+from .endpoint import LatencyBudgetPolicy
+from .metrics import MetricsExporter, summary_fields
+from .utils import MODELS_DIR, argos_index_lookup, argos_install_from_file, TranslateRoute, abs_path
+from .utils import package_url
 from .utils import ensure_vosk_model_ready, ARGOS_OK
 from .i18n import set_lang, t
 
@@ -21,20 +26,44 @@ def _detect_lang_from_system() -> str:
 class App:
     def __init__(self):
         set_lang(_detect_lang_from_system())
-        self.qt = QApplication(sys.argv)
-        self.qt.setApplicationName(t("app.title"))
+        with PROFILE.phase("QApplication"):
+            self.qt = QApplication(sys.argv)
+            self.qt.setApplicationName(t("app.title"))
         os.makedirs(MODELS_DIR, exist_ok=True)
-        self.overlay = OverlayWindow()
-        self.win = MainWindow()
-        self.win.show()
-        self.pa = pyaudio.PyAudio()
+        with PROFILE.phase("OverlayWindow"):
+            self.overlay = OverlayWindow()
+        with PROFILE.phase("MainWindow"):
+            self.win = MainWindow()
+        with PROFILE.phase("show"):
+            self.win.show()
+        # PortAudio 在后台初始化并枚举设备；首屏只显示“自动选择”
+        self.pa = None  # pyaudio.PyAudio，由设备扫描线程创建
         self.device_map = {}
-        self._scan_devices()
+        self.win.devCombo.clear()
+        self.win.devCombo.addItem(t("input.auto"))
+        self._scan = DeviceScanWorker(parent=self.win)
+        self._scan.finished.connect(self._on_devices_scanned)
+        self._scan.start()
+        QTimer.singleShot(0, lambda: PROFILE.mark("first event loop tick"))
         self.cap: Optional[AudioCaptureWorker] = None
+        self._capture_text = ""
         self.asr: Optional[ASRWorker] = None
         self.win.startStopRequested.connect(self._toggle)
         self.win.subtitleStyleChanged.connect(self.overlay.apply_subtitle_font)
         self.win.emit_current_subtitle_style()
+        # 各阶段计时：运行中每秒刷新状态面板；设置了 RTSUB_METRICS_PORT / RTSUB_METRICS_FILE 时对外导出
+        self._metrics_timer = QTimer(self.win)
+        self._metrics_timer.setInterval(1000)
+        self._metrics_timer.timeout.connect(self._refresh_metrics)
+        self._metrics_timer.start()
+        self.metrics_exporter: Optional[MetricsExporter] = None
+        try:
+            exporter = MetricsExporter.from_env()
+            if exporter is not None:
+                self.metrics_exporter = exporter.start()
+                self.win.lbMetrics.setToolTip(t("metrics.exporting", where=exporter.describe()))
+        except Exception as e:
+            print(f"metrics export disabled: {e}", file=sys.stderr)
 
     def _toggle(self):
         if self.cap or self.asr:
@@ -42,55 +71,28 @@ class App:
         else:
             self.start()
 
-    def _scan_devices(self):
-        items = [t("input.auto")]
-        device_map = {}
-        try:
-            n = self.pa.get_device_count()
-            for i in range(n):
-                try:
-                    info = self.pa.get_device_info_by_index(i)
-                    if info.get("maxInputChannels", 0) > 0:
-                        name = f"{info.get('name','?')} (#{i})"
-                        items.append(name); device_map[name] = i
-                except Exception:
-                    continue
-        except Exception:
-            pass
-        self.device_map = device_map
+    @Slot(list, object)
+    def _on_devices_scanned(self, devices: list, pa):
+        PROFILE.mark("device scan")
+        if self.pa is None:
+            self.pa = pa
+        elif pa is not None:
+            try: pa.terminate()
+            except Exception: pass
+        current = self.win.devCombo.currentText()
+        self.device_map = dict(devices)
         self.win.devCombo.clear()
-        self.win.devCombo.addItems(items)
+        self.win.devCombo.addItems([t("input.auto")] + [name for name, _ in devices])
+        if current in self.device_map:
+            self.win.devCombo.setCurrentText(current)
+        PROFILE.finish()
 
-    def _auto_pick_device(self) -> Optional[int]:
-        try:
-            n = self.pa.get_device_count()
-            for i in range(n):
-                info = self.pa.get_device_info_by_index(i)
-                if info.get("maxInputChannels", 0) <= 0:
-                    continue
-                name = str(info.get("name", "")).lower()
-                if any(k in name for k in ["stereo mix", "立体声", "what u hear", "wave out", "loopback", "monitor", "speakers", "扬声器", "realtek"]):
-                    if self._test_device(i):
-                        return i
-        except Exception:
-            pass
-        try:
-            n = self.pa.get_device_count()
-            for i in range(n):
-                info = self.pa.get_device_info_by_index(i)
-                if info.get("maxInputChannels", 0) > 0 and self._test_device(i):
-                    return i
-        except Exception:
-            pass
-        return None
-
-    def _test_device(self, idx) -> bool:
-        try:
-            s = self.pa.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True,
-                             input_device_index=idx, frames_per_buffer=1024)
-            s.close(); return True
-        except Exception:
-            return False
+    def _audio(self):
+        # 设备扫描尚未完成时就点了开始：就地初始化
+        if self.pa is None:
+            import pyaudio
+            self.pa = pyaudio.PyAudio()
+        return self.pa
 
     @Slot()
     def start(self):
@@ -107,15 +109,16 @@ class App:
             QMessageBox.critical(self.win, t("dlg.title.fail"), t("msg.asr_model_unavailable", msg=msg)); return
         if ARGOS_OK:
             trans_data = self.win.transModelCombo.currentData() or {}
-            if not trans_data.get("installed"):
+            installed = trans_data.get("installed")  # None：预热线程尚未查完，不在界面线程里查
+            if installed is False:
                 src, tgt = trans_data.get("pair", (asr_lang, tgt_lang))
-                pkg = argos_find_package(src, tgt)
-                if pkg:
+                meta = argos_index_lookup(src, tgt)
+                if meta:
                     r = QMessageBox.question(self.win, t("dlg.title.download_trans"),
                                              t("dlg.ask.download_trans", src=src, tgt=tgt),
                                              QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
                     if r == QMessageBox.Yes:
-                        url = getattr(pkg, "download_url", None)
+                        url = package_url(meta)
                         if url:
                             tmp_dir = abs_path("_argos_tmp"); os.makedirs(tmp_dir, exist_ok=True)
                             tmp_file = os.path.join(tmp_dir, f"{src}_{tgt}.argosmodel")
@@ -131,13 +134,14 @@ class App:
                                 else:
                                     QMessageBox.critical(self.win, t("dlg.title.fail"), t("dlg.argos_install_fail", err=msg2))
                             self.win._download_with_dialog(url, tmp_file, t("dlg.title.download_trans"), on_ok=on_ok)
-            pairs_text = t("engine.pairs_installed") if argos_pair_installed(asr_lang, tgt_lang) else t("engine.pairs_missing")
-            self.win.lbArgos.setText(t("label.engine") + pairs_text)
+            if installed is not None:
+                pairs_text = t("engine.pairs_installed") if installed else t("engine.pairs_missing")
+                self.win.lbArgos.setText(t("label.engine") + pairs_text)
         else:
             self.win.lbArgos.setText(t("label.engine") + t("engine.no_argos"))
         name = self.win.devCombo.currentText()
         if name == t("input.auto"):
-            device_index = self._auto_pick_device()
+            device_index = auto_pick_device(self._audio())
         else:
             device_index = self.device_map.get(name)
         if device_index is None:
@@ -145,8 +149,11 @@ class App:
             return
         try:
             self.asr = ASRWorker(asr_lang=asr_lang, tgt_lang=tgt_lang,
-                                 route=TranslateRoute.AUTO, model_folder=model_folder, rate=16000, parent=self.win)
-            self.asr.textReady.connect(self.overlay.show_texts)
+                                 route=TranslateRoute.AUTO, model_folder=model_folder, rate=16000,
+                                 vad=True, endpoint=LatencyBudgetPolicy(budget=0.4),
+                                 speculative=self.win.chkSpeculative.isChecked(), parent=self.win)
+            self.asr.sourceReady.connect(self.overlay.show_source)
+            self.asr.textReady.connect(self.overlay.show_translation)
             self.asr.status.connect(lambda s: self.win.lbStatus.setText(t("label.status") + s))
             self.asr.error.connect(self._on_asr_error)
             self.asr.start()
@@ -155,9 +162,11 @@ class App:
             QMessageBox.critical(self.win, t("dlg.title.fail"), t("msg.asr_thread_fail", err=e))
             return
         try:
-            self.cap = AudioCaptureWorker(device_index=device_index, rate=16000, chunk=1024, parent=self.win)
+            self.cap = AudioCaptureWorker(device_index=device_index, rate=16000, chunk=1024,
+                                          sink=self.asr.ring, callback_mode=True, parent=self.win)
             self.cap.levelChanged.connect(self.win.pbLevel.setValue)
-            self.cap.chunkReady.connect(self.asr.feed)
+            self.cap.captureInfo.connect(self._on_capture_info)
+            self.cap.inputStats.connect(self._on_input_stats)
             self.cap.error.connect(self._on_cap_error)
             self.cap.start()
         except Exception as e:
@@ -189,8 +198,38 @@ class App:
             self.asr = None
         self.win.setRunning(False)
         self.win.pbLevel.setValue(0)
+        self._capture_text = ""
+        self.win.lbCapture.setText(t("label.capture") + "-")
         self.win.lbStatus.setText(t("label.status") + t("status.stopped"))
 
+    @Slot()
+    def _refresh_metrics(self):
+        if self.asr is None:
+            return
+        text = t("label.metrics") + t("metrics.summary", **summary_fields())
+        if self.asr.engine.speculative:
+            text += t("metrics.spec", **self.asr.spec_stats())
+        self.win.lbMetrics.setText(text)
+
+    @Slot(int, int, int)
+    def _on_capture_info(self, rate: int, up: int, down: int):
+        if up == down:
+            text = t("capture.native", rate=rate)
+        elif up == 1:
+            text = t("capture.decimate", rate=rate, down=down)
+        else:
+            text = t("capture.polyphase", rate=rate, up=up, down=down)
+        self._capture_text = text
+        self.win.lbCapture.setText(t("label.capture") + text)
+
+    @Slot(int, float)
+    def _on_input_stats(self, overflows: int, latency_ms: float):
+        parts = [self._capture_text] if self._capture_text else []
+        parts.append(t("capture.latency", ms=f"{latency_ms:.0f}"))
+        if overflows:
+            parts.append(t("capture.overflows", n=overflows))
+        self.win.lbCapture.setText(t("label.capture") + " · ".join(parts))
+
     @Slot(str)
     def _on_cap_error(self, msg: str):
         self.win.lbStatus.setText(t("msg.cap_error", msg=msg))
@@ -202,18 +241,15 @@ class App:
         self.stop()
 
 def main():
+    # 只检查是否可导入，不在启动时真正加载 vosk 等重量级模块
     need = ["pyaudio", "numpy", "vosk"]
-    miss = []
-    for p in need:
-        try:
-            __import__(p)
-        except Exception:
-            miss.append(p)
+    miss = [p for p in need if find_spec(p) is None]
     if miss:
         print("Missing deps:", ", ".join(miss))
         print("Install: pip install " + " ".join(miss))
         sys.exit(1)
-    app = App()
+    with PROFILE.phase("App"):
+        app = App()
     ret = 0
     try:
         ret = app.qt.exec()
@@ -222,8 +258,13 @@ def main():
             app.stop()
         except Exception:
             pass
+        if app.metrics_exporter is not None:
+            app.metrics_exporter.stop()
+        if app._scan.isRunning():
+            app._scan.wait(3000)
         try:
-            app.pa.terminate()
+            if app.pa is not None:
+                app.pa.terminate()
         except Exception:
             pass
     sys.exit(ret)
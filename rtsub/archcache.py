@@ -0,0 +1,129 @@
+import os, sys, json, time, shutil, threading
+from typing import Dict, Optional
+
+# ----------------- 按内容寻址的模型压缩包缓存（每用户一份，跨检出目录共享） -----------------
+# 已校验的压缩包按 SHA-256 存放在 <root>/<sha[:2]>/<sha>.zip，index.json 记录 URL→哈希、大小与最后使用时间。
+# 删除后重装、或同一台机器上另一个检出目录安装同一模型时，直接从缓存解压，不再下载。
+# 解压校验失败过的压缩包哈希记入 bad，之后遇到同样内容直接拒绝。
+
+def default_cache_root() -> str:
+    env = os.environ.get("RTSUB_CACHE_DIR")
+    if env:
+        return os.path.join(env, "archives")
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "rtsub", "archives")
+
+class ArchiveCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 6 * 1024 ** 3):
+        self.root = root or default_cache_root()
+        self.max_bytes = int(max_bytes)
+        self.index_path = os.path.join(self.root, "index.json")
+        self._lock = threading.Lock()
+
+    # 每次操作都重新读索引：其他进程（另一个检出目录）可能刚写过
+    def _read(self) -> Dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = {}
+        data.setdefault("archives", {})
+        data.setdefault("urls", {})
+        data.setdefault("bad", {})
+        return data
+
+    def _write(self, data: Dict):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.index_path)
+        except Exception:
+            pass
+
+    def path_for(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], f"{sha}.zip")
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        # 命中返回缓存文件路径并刷新 LRU 时间；文件缺失或大小不符则视为未命中并清掉条目
+        with self._lock:
+            data = self._read()
+            sha = data["urls"].get(url)
+            e = data["archives"].get(sha) if sha else None
+            if not e:
+                return None
+            path = self.path_for(sha)
+            try:
+                ok = os.path.getsize(path) == e["size"]
+            except OSError:
+                ok = False
+            if not ok:
+                data["archives"].pop(sha, None)
+                data["urls"].pop(url, None)
+                self._write(data)
+                return None
+            e["last_used"] = time.time()
+            self._write(data)
+            return path
+
+    def is_bad(self, sha: Optional[str]) -> bool:
+        return bool(sha) and sha in self._read()["bad"]
+
+    def mark_bad(self, sha: Optional[str], reason: str):
+        if not sha:
+            return
+        with self._lock:
+            data = self._read()
+            data["bad"][sha] = {"reason": reason, "at": time.time()}
+            if data["archives"].pop(sha, None) is not None:
+                try:
+                    os.remove(self.path_for(sha))
+                except OSError:
+                    pass
+            data["urls"] = {u: s for u, s in data["urls"].items() if s != sha}
+            self._write(data)
+
+    def put(self, path: str, sha: str, url: Optional[str] = None, name: str = "") -> str:
+        # 把已校验的压缩包移入缓存（同一文件系统时是改名，否则复制后删除源文件）
+        with self._lock:
+            dest = self.path_for(sha)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.exists(dest):
+                os.remove(path)
+            else:
+                shutil.move(path, dest)
+            data = self._read()
+            data["archives"][sha] = {"size": os.path.getsize(dest), "name": name, "last_used": time.time()}
+            if url:
+                data["urls"][url] = sha
+            self._evict(data, keep=sha)
+            self._write(data)
+            return dest
+
+    def _evict(self, data: Dict, keep: str):
+        arch = data["archives"]
+        total = sum(e["size"] for e in arch.values())
+        for sha in sorted(arch, key=lambda s: arch[s]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha == keep:
+                continue
+            total -= arch.pop(sha)["size"]
+            try:
+                os.remove(self.path_for(sha))
+            except OSError:
+                pass
+        data["urls"] = {u: s for u, s in data["urls"].items() if s in arch}
+
+    def stats(self) -> Dict:
+        data = self._read()
+        return {"archives": len(data["archives"]), "bytes": sum(e["size"] for e in data["archives"].values()),
+                "bad": len(data["bad"]), "max_bytes": self.max_bytes}
+
+ARCHIVE_CACHE = ArchiveCache()
@@ -0,0 +1,122 @@
+import threading, weakref
+from typing import List, Optional
+
+# ----------------- Argos 批量翻译：多段文字合成一次 CTranslate2 translate_batch -----------------
+# 分句、分词、解码与 argostranslate 的 apply_packaged_translation 保持一致（beam 4、length_penalty 0.2、
+# replace_unknowns、target_prefix），区别只是把多段的句子放进同一批；stanza 分句管线按包缓存一份，
+# 不像 argos 那样每次调用都重建。
+# 短段落快速路径：识别端送来的通常是一句话（≤ src_max = 72 字符、单行），整段直接用包里的
+# SentencePiece / BPE 编码后交给 CTranslate2，跳过分句（argos 每次调用都会重建 stanza 管线或跑 sbd 模型）。
+# 长文本、多行文本仍按 argos 的方式拆段落、分句；没有 stanza 时长文本退回原来的 translate()。
+# 不能批量的翻译对象（远程 / few-shot、旧版 argos 没有 pkg.tokenizer）batcher_for() 返回 None，
+# 调用方逐段走原来的 translate()。
+
+_MAX_BATCH = 32
+FAST_MAX_CHARS = 72  # 与识别端 src_max 一致；设为 0 关闭快速路径
+
+def is_short(text: str) -> bool:
+    return len(text) <= FAST_MAX_CHARS and "\n" not in text
+
+class PackageBatcher:
+    def __init__(self, tr, can_split: bool = True):
+        self.tr = tr  # argostranslate.translate.PackageTranslation
+        self.pkg = tr.pkg
+        self.can_split = can_split  # 装了 stanza 才能自己分句
+        self._stanza = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # 预热线程与翻译线程可能同时首次取模型
+
+    def _translator(self):
+        # 与 PackageTranslation 共用同一个 ctranslate2.Translator，不重复加载模型
+        if self.tr.translator is None:
+            with self._load_lock:
+                if self.tr.translator is None:
+                    import ctranslate2
+                    from argostranslate import settings
+                    self.tr.translator = ctranslate2.Translator(str(self.pkg.package_path / "model"),
+                                                                device=settings.device)
+        return self.tr.translator
+
+    def full_translate(self, text: str) -> str:
+        # argos 完整流程；先在锁内备好模型，避免 argos 在 translate() 里自己再懒加载一份
+        self._translator()
+        return self.tr.translate(text)
+
+    def warm_up(self):
+        self.translate("Hello.")
+        if self.can_split:
+            self.sentences("Hello.")
+
+    def sentences(self, text: str) -> List[str]:
+        with self._lock:
+            if self._stanza is None:
+                import stanza
+                from argostranslate import settings
+                self._stanza = stanza.Pipeline(lang=self.pkg.from_code, dir=str(self.pkg.package_path / "stanza"),
+                                               processors="tokenize", use_gpu=settings.device == "cuda",
+                                               logging_level="WARNING")
+            doc = self._stanza(text)
+        return [s.text for s in doc.sentences]
+
+    def _decode(self, tokens: List[str]) -> str:
+        value = self.pkg.tokenizer.decode(tokens)
+        prefix = getattr(self.pkg, "target_prefix", "")
+        if prefix and value.startswith(prefix):
+            value = value[len(prefix):]
+        return value[1:] if value.startswith(" ") else value
+
+    def translate_sentences(self, groups: List[List[str]]) -> List[str]:
+        # groups[i] 是第 i 个段落已经分好的句子；所有句子一次送进 translate_batch，再按段落拼回
+        flat, spans = [], []
+        for sents in groups:
+            start = len(flat)
+            flat.extend(self.pkg.tokenizer.encode(s) for s in sents)
+            spans.append((start, len(flat)))
+        results = []
+        if flat:
+            prefix = getattr(self.pkg, "target_prefix", "")
+            results = self._translator().translate_batch(
+                flat, target_prefix=[[prefix]] * len(flat) if prefix else None, replace_unknowns=True,
+                max_batch_size=_MAX_BATCH, beam_size=4, num_hypotheses=1, length_penalty=0.2)
+        return [self._decode([tok for r in results[a:b] for tok in r.hypotheses[0]]) for a, b in spans]
+
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        # 短段落整段当作一句；其余与 argos 相同，先按换行拆段落、段落内分句，译完用换行拼回
+        out = list(texts)
+        groups, layout = [], []
+        for i, text in enumerate(texts):
+            if is_short(text):
+                paras = [[text.strip()] if text.strip() else []]
+            elif self.can_split:
+                paras = [self.sentences(p) if p.strip() else [] for p in text.split("\n")]
+            else:
+                out[i] = self.full_translate(text)
+                continue
+            layout.append((i, len(paras)))
+            groups.extend(paras)
+        done = iter(self.translate_sentences(groups))
+        for i, n in layout:
+            out[i] = "\n".join(next(done) for _ in range(n)).lstrip("\n")
+        return out
+
+    def translate(self, text: str) -> str:
+        return self.translate_batch([text])[0]
+
+_BATCHERS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+def batcher_for(tr) -> Optional[PackageBatcher]:
+    base = getattr(tr, "underlying", tr)  # 解开 argos 的 CachedTranslation
+    with _LOCK:
+        if base in _BATCHERS:
+            return _BATCHERS[base]
+        b = None
+        try:
+            from argostranslate import settings
+            pkg = getattr(base, "pkg", None)
+            if pkg is not None and hasattr(pkg, "tokenizer") and hasattr(base, "translator"):
+                b = PackageBatcher(base, can_split=bool(getattr(settings, "stanza_available", True)))
+        except Exception:
+            b = None
+        _BATCHERS[base] = b
+        return b
@@ -0,0 +1,425 @@
+import time, threading
+from collections import deque
+from math import gcd, exp
+from typing import Optional, Dict, List, Tuple
+import numpy as np
+
+# ----------------- 流式多相重采样 -----------------
+def _design_lowpass(up: int, down: int, taps_per_phase: int, rolloff: float = 0.9, beta: float = 8.0) -> np.ndarray:
+    n = up * taps_per_phase
+    fc = 0.5 * rolloff / max(up, down)  # 以上采样后的采样率归一化
+    m = np.arange(n, dtype=np.float64) - (n - 1) / 2.0
+    h = 2.0 * fc * np.sinc(2.0 * fc * m) * np.kaiser(n, beta)
+    h *= up / h.sum()  # 补偿插零带来的增益损失
+    return h
+
+class StreamingResampler:
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 64, max_chunk: int = 4096):
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        g = gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.passthrough = self.up == self.down
+        self.taps = int(taps_per_phase)
+        h = _design_lowpass(self.up, self.down, self.taps)
+        # table[p, k] = h[p + k * up]，按输入样本逆序与历史对齐
+        self._table = np.ascontiguousarray(h.reshape(self.taps, self.up).T[:, ::-1], dtype=np.float32)
+        self._fir = self._table[0].copy() if self.up == 1 else None
+        self._hist = self.taps - 1
+        self._t0 = 0     # 下一个输出样本在上采样域中相对当前块起点的位置
+        self._phase = 0  # 已输出样本数 mod up，相位序列按 up 个输出为周期重复
+        self._alloc(max_chunk)
+
+    def _alloc(self, max_chunk: int):
+        self._max_chunk = int(max_chunk)
+        self._buf = np.zeros(self._hist + self._max_chunk, dtype=np.float32)
+        self._win = np.lib.stride_tricks.sliding_window_view(self._buf, self.taps)
+        max_out = self._max_chunk * self.up // self.down + 2
+        self._out = np.empty(max_out, dtype=np.int16)
+        self._frames = np.empty((max_out, self.taps), dtype=np.float32)
+        self._y = np.empty(max_out, dtype=np.float32)
+        if self._fir is None:
+            # 按周期平铺的输入下标与系数行：任意相位起点都能取到连续切片，避免逐块 gather 系数
+            r = np.arange(self.up + max_out, dtype=np.int64)
+            self._idx_tiled = (r * self.down) // self.up
+            self._coef_tiled = np.ascontiguousarray(self._table[(r * self.down) % self.up])
+
+    def reset(self):
+        self._buf[:self._hist] = 0.0
+        self._t0 = 0
+        self._phase = 0
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        # 返回的数组指向内部预分配缓冲区，下一次调用前有效
+        if self.passthrough:
+            return x
+        n_in = int(x.size)
+        if n_in == 0:
+            return self._out[:0]
+        if n_in > self._max_chunk:
+            hist = self._buf[:self._hist].copy()
+            self._alloc(n_in)
+            self._buf[:self._hist] = hist
+        buf = self._buf
+        buf[self._hist:self._hist + n_in] = x
+        span = n_in * self.up
+        n_out = max(0, -(-(span - self._t0) // self.down))
+        out = self._out[:n_out]
+        if n_out:
+            win = self._win
+            frames = self._frames[:n_out]
+            y = self._y[:n_out]
+            if self._fir is not None:
+                # 整数倍降采样（如 48k→16k）：步长切片取窗口，单次矩阵向量乘
+                start = self._t0
+                np.copyto(frames, win[start:start + n_out * self.down:self.down])
+                np.matmul(frames, self._fir, out=y)
+            else:
+                r = self._phase
+                offset = (r * self.down - self._t0) // self.up
+                idx = self._idx_tiled[r:r + n_out] - offset
+                np.take(win, idx, axis=0, out=frames)
+                np.einsum("nk,nk->n", frames, self._coef_tiled[r:r + n_out], out=y)
+                self._phase = (r + n_out) % self.up
+            np.clip(y, -32768.0, 32767.0, out=y)
+            out[:] = y
+        self._t0 = self._t0 + n_out * self.down - span
+        buf[:self._hist] = buf[n_in:n_in + self._hist]
+        return out
+
+# ----------------- 电平表（增量峰值跟踪 + 限频输出） -----------------
+class LevelMeter:
+    def __init__(self, rate: int, ui_hz: float = 15.0, release_s: float = 1.5, floor: float = 100.0,
+                 max_chunk: int = 4096):
+        self.rate = int(rate)
+        self.floor = float(floor)
+        self.release_s = float(release_s)
+        self.set_ui_hz(ui_hz)
+        self._ref = 1500.0
+        self._peak = 0.0
+        self._since = 0
+        self._scratch = np.empty(max_chunk, dtype=np.float32)
+
+    def set_ui_hz(self, ui_hz: float):
+        self.ui_hz = max(0.5, float(ui_hz))
+        self._emit_every = max(1, int(self.rate / self.ui_hz))
+
+    def update(self, audio: np.ndarray) -> Optional[float]:
+        # 返回 0-100 的电平；未到刷新间隔时返回 None，调用方不必发信号
+        n = int(audio.size)
+        if n == 0:
+            return None
+        if n > self._scratch.size:
+            self._scratch = np.empty(n, dtype=np.float32)
+        buf = self._scratch[:n]
+        np.copyto(buf, audio, casting="unsafe")
+        rms = float(np.sqrt(np.dot(buf, buf) / n))
+        # 峰值跟踪：瞬时上冲，按 release_s 指数回落，代替对最近 30 块求 95 分位数
+        decay = exp(-n / (self.rate * self.release_s))
+        self._ref = max(rms, self._ref * decay, self.floor)
+        level = min(100.0, rms / self._ref * 100.0)
+        if level > self._peak:
+            self._peak = level
+        self._since += n
+        if self._since < self._emit_every:
+            return None
+        out, self._peak = self._peak, 0.0
+        self._since = min(self._since - self._emit_every, self._emit_every)
+        return out
+
+# ----------------- 采集 → 识别 的预分配环形缓冲 -----------------
+class OverflowPolicy:
+    BLOCK = "block"                # 写端等待空间（超时后仍按丢最旧处理）
+    DROP_OLDEST = "drop_oldest"    # 覆盖最旧的样本
+    SKIP_TO_LIVE = "skip_to_live"  # 丢掉整段积压，只保留最新写入的数据
+
+class AudioRing:
+    def __init__(self, capacity: int, policy: str = OverflowPolicy.DROP_OLDEST, block_timeout: float = 0.5):
+        self.capacity = int(capacity)
+        self.policy = policy
+        self.block_timeout = float(block_timeout)
+        self._buf = np.zeros(self.capacity, dtype=np.int16)
+        self._head = 0   # 下一个读位置
+        self._size = 0
+        self._cv = threading.Condition()
+        self._closed = False
+        self.written = 0
+        self.read_total = 0
+        self.dropped = 0
+        self.overruns = 0
+        self.high_water = 0
+        # 采集时间戳：每次写入记一条 (写入后的累计位置, 时间)，读端据此得到所读样本的采集时刻。
+        # 不设上限：只在对应样本被读走或丢弃时删除，读端落后再多也不会丢掉未读样本的时间戳
+        # （每条至少对应一个缓冲区里的样本，条数不超过 capacity）
+        self._marks = deque()
+        self._rpos = 0   # 已读或已丢弃的样本在写入计数上的位置
+        self.read_ts = 0.0
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+
+    def reopen(self):
+        with self._cv:
+            self._closed = False
+            self._head = self._size = 0
+            self._marks.clear()
+            self._rpos = self.written
+            self.read_ts = 0.0
+
+    def fill(self) -> int:
+        with self._cv:
+            return self._size
+
+    def _discard(self, n: int):
+        self._head = (self._head + n) % self.capacity
+        self._size -= n
+        self.dropped += n
+        self._rpos += n
+        self._drop_marks()
+
+    def _drop_marks(self):
+        # 删掉样本已全部读走或丢弃的写入批次
+        marks = self._marks
+        while marks and marks[0][0] <= self._rpos:
+            marks.popleft()
+
+    def write(self, samples: np.ndarray, ts: Optional[float] = None) -> int:
+        # ts：这批样本的采集时刻（time.monotonic），缺省为写入时刻
+        n = int(samples.size)
+        if n == 0:
+            return 0
+        with self._cv:
+            if self._closed:
+                return 0
+            if n > self.capacity:
+                self.dropped += n - self.capacity
+                samples = samples[-self.capacity:]; n = self.capacity
+            free = self.capacity - self._size
+            if n > free and self.policy == OverflowPolicy.BLOCK:
+                self._cv.wait_for(lambda: self._closed or self.capacity - self._size >= n, self.block_timeout)
+                if self._closed:
+                    return 0
+                free = self.capacity - self._size
+            if n > free:
+                self.overruns += 1
+                self._discard(self._size if self.policy == OverflowPolicy.SKIP_TO_LIVE else n - free)
+            tail = (self._head + self._size) % self.capacity
+            first = min(n, self.capacity - tail)
+            self._buf[tail:tail + first] = samples[:first]
+            if first < n:
+                self._buf[:n - first] = samples[first:]
+            self._size += n
+            self.written += n
+            self._marks.append((self.written, time.monotonic() if ts is None else ts))
+            if self._size > self.high_water:
+                self.high_water = self._size
+            self._cv.notify_all()
+        return n
+
+    def read_into(self, out: np.ndarray, timeout: float = 0.2) -> int:
+        # 有数据就尽量多读（至多 out.size），否则最多等待 timeout 秒；返回读到的样本数
+        with self._cv:
+            if not self._size and not self._closed:
+                self._cv.wait_for(lambda: self._size or self._closed, timeout)
+            n = min(self._size, int(out.size))
+            if n == 0:
+                return 0
+            first = min(n, self.capacity - self._head)
+            out[:first] = self._buf[self._head:self._head + first]
+            if first < n:
+                out[first:n] = self._buf[:n - first]
+            self._head = (self._head + n) % self.capacity
+            self._size -= n
+            self.read_total += n
+            # read_ts 取本次读到的第一个样本所属写入批次的时间戳
+            self._drop_marks()
+            if self._marks:
+                self.read_ts = self._marks[0][1]
+            self._rpos += n
+            self._cv.notify_all()
+            return n
+
+    def stats(self) -> Dict[str, int]:
+        with self._cv:
+            return {"capacity": self.capacity, "fill": self._size, "high_water": self.high_water,
+                    "written": self.written, "read": self.read_total,
+                    "dropped": self.dropped, "overruns": self.overruns}
+
+# ----------------- 语音活动检测（能量 + 过零率） -----------------
+class VoiceGate:
+    def __init__(self, rate: int = 16000, frame_ms: int = 20, margin_db: float = 9.0, min_db: float = -60.0,
+                 zcr_max: float = 0.35, start_frames: int = 2, hangover_ms: int = 400, preroll_ms: int = 300,
+                 floor_rise_db_s: float = 2.0):
+        self.rate = int(rate)
+        self.frame = max(1, self.rate * int(frame_ms) // 1000)
+        self.margin_db = float(margin_db)
+        self.min_db = float(min_db)
+        self.zcr_max = float(zcr_max)
+        self.start_frames = max(1, int(start_frames))
+        self.hang_frames = max(1, int(hangover_ms) // int(frame_ms))
+        self.floor_rise = float(floor_rise_db_s) * self.frame / self.rate
+        self._pre = AudioRing(max(self.frame, self.rate * int(preroll_ms) // 1000))
+        self._rem = np.empty(self.frame, dtype=np.int16)
+        self._rem_n = 0
+        self._floor = -50.0
+        self._active = False
+        self._run = 0
+        self._hang = 0
+        self.total = 0
+        self.skipped = 0
+        self.segments = 0
+
+    def reset(self):
+        self._pre.reopen()
+        self._rem_n = 0
+        self._active = False
+        self._run = self._hang = 0
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        x = frames.astype(np.float32)
+        energy = 10.0 * np.log10(np.einsum("ij,ij->i", x, x) / (self.frame * 32768.0 ** 2) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(self.frame)
+        # 噪声底：遇到更低的能量立即下调，否则按 floor_rise_db_s 缓慢上浮（持续的音乐床会被逐渐视为背景）
+        self._floor = min(self._floor + self.floor_rise * len(energy), float(energy.min()))
+        loud = (energy > self._floor + self.margin_db) & (energy > self.min_db)
+        return loud & ((zcr < self.zcr_max) | (energy > self._floor + 2 * self.margin_db))
+
+    def process(self, pcm: np.ndarray) -> List[Optional[np.ndarray]]:
+        # 返回按时间顺序的事件：ndarray 为需要送去识别的语音（含预卷），None 表示一段语音刚结束
+        out: List[Optional[np.ndarray]] = []
+        n = int(pcm.size)
+        self.total += n
+        if self._rem_n:
+            take = min(self.frame - self._rem_n, n)
+            self._rem[self._rem_n:self._rem_n + take] = pcm[:take]
+            self._rem_n += take
+            pcm = pcm[take:]
+            if self._rem_n < self.frame:
+                return out
+            data = np.concatenate([self._rem, pcm])
+            self._rem_n = 0
+        else:
+            data = pcm
+        nf = data.size // self.frame
+        tail = data.size - nf * self.frame
+        if tail:
+            self._rem[:tail] = data[nf * self.frame:]
+            self._rem_n = tail
+        if nf == 0:
+            return out
+        frames = data[:nf * self.frame].reshape(nf, self.frame)
+        speech = self._classify(frames)
+        start = 0 if self._active else -1
+        for i in range(nf):
+            sp = bool(speech[i])
+            if self._active:
+                if sp:
+                    self._hang = self.hang_frames
+                    continue
+                self._hang -= 1
+                if self._hang > 0:
+                    continue
+                out.append(frames[start:i + 1].reshape(-1).copy())
+                out.append(None)
+                self._active = False
+                self._run = 0
+                start = -1
+                continue
+            self._run = self._run + 1 if sp else 0
+            if self._run < self.start_frames:
+                self._pre.write(frames[i])
+                self.skipped += self.frame
+                continue
+            # 激活：先补上预卷（包含刚才判为语音的几帧），再从下一帧开始连续输出
+            pre = np.empty(self._pre.fill(), dtype=np.int16)
+            k = self._pre.read_into(pre, timeout=0)
+            self.skipped -= min(self.skipped, k)
+            self.segments += 1
+            self._active = True
+            self._hang = self.hang_frames
+            out.append(np.concatenate([pre[:k], frames[i]]))
+            start = i + 1
+        if self._active and start < nf:
+            out.append(frames[start:].reshape(-1).copy())
+        return out
+
+    def skipped_ratio(self) -> float:
+        return self.skipped / self.total if self.total else 0.0
+
+# ----------------- 整段录音按静音切块（批处理用） -----------------
+def split_at_silence(pcm: np.ndarray, rate: int = 16000, target_s: float = 30.0, max_s: float = 45.0,
+                     min_s: float = 5.0, min_gap_s: float = 0.3, frame_ms: int = 20, margin_db: float = 10.0,
+                     min_db: float = -60.0) -> List[Tuple[int, int]]:
+    # 返回首尾相接的 [起, 止) 样本区间。切点取最接近 target_s 的静音段中点（静音段至少 min_gap_s），
+    # [min_s, max_s] 内找不到静音时，在 [target_s, max_s] 里能量最低的帧处硬切
+    n = int(pcm.size)
+    frame = max(1, rate * int(frame_ms) // 1000)
+    nf = n // frame
+    max_len = int(max_s * rate)
+    if n <= max_len or nf < 2:
+        return [(0, n)] if n else []
+    x = pcm[:nf * frame].reshape(nf, frame).astype(np.float32)
+    energy = 10.0 * np.log10(np.einsum("ij,ij->i", x, x) / (frame * 32768.0 ** 2) + 1e-10)
+    # 整段离线可见，噪声底直接取能量的低分位数，不需要 VoiceGate 那样的自适应跟踪
+    floor = float(np.percentile(energy, 10))
+    silent = energy < max(floor + margin_db, min_db)
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= max(1, int(min_gap_s * 1000 / frame_ms))
+    cuts = (starts[keep] + ends[keep]) // 2 * frame
+    target, min_len = int(target_s * rate), int(min_s * rate)
+    bounds = [0]
+    pos = 0
+    while n - pos > max_len:
+        lo, hi = pos + min_len, pos + max_len
+        cand = cuts[np.searchsorted(cuts, lo, "left"):np.searchsorted(cuts, hi, "right")]
+        if cand.size:
+            cut = int(cand[np.argmin(np.abs(cand - (pos + target)))])
+        else:
+            a, b = (pos + target) // frame, min(nf, hi // frame)
+            cut = (a + int(np.argmin(energy[a:b]))) * frame if b > a else hi
+        bounds.append(cut)
+        pos = cut
+    bounds.append(n)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+# ----------------- 采集采样率协商 -----------------
+_RATE_CACHE = {}
+_RATE_LOCK = threading.Lock()
+
+def capture_rate_candidates(target: int, default_rate: int):
+    # 优先原生目标采样率，其次整数倍（走纯降采样快路径），最后才是设备默认采样率
+    cands = [target] + [target * k for k in (2, 3, 6)] + [int(default_rate)]
+    seen, out = set(), []
+    for r in cands:
+        if r > 0 and r not in seen:
+            seen.add(r); out.append(r)
+    return out
+
+def negotiate_capture_rate(pa, device_index, dev_info: dict, fmt, channels: int = 1, target: int = 16000) -> int:
+    default_rate = int(dev_info.get("defaultSampleRate", target) or target)
+    key = (device_index, dev_info.get("name"), dev_info.get("hostApi"), channels, target)
+    with _RATE_LOCK:
+        if key in _RATE_CACHE:
+            return _RATE_CACHE[key]
+    dev = device_index if device_index is not None else dev_info.get("index")
+    chosen = default_rate
+    for rate in capture_rate_candidates(target, default_rate):
+        try:
+            if pa.is_format_supported(rate, input_device=dev, input_channels=channels, input_format=fmt):
+                chosen = rate
+                break
+        except Exception:
+            continue
+    with _RATE_LOCK:
+        _RATE_CACHE[key] = chosen
+    return chosen
+
+def forget_capture_rate(device_index=None):
+    with _RATE_LOCK:
+        for k in [k for k in _RATE_CACHE if device_index is None or k[0] == device_index]:
+            _RATE_CACHE.pop(k, None)
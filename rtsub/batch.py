@@ -0,0 +1,243 @@
+import os, sys, json, time, wave, shutil, argparse, threading, subprocess, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from .utils import MODELS_DIR, argos_translate_batch, argos_warm_up
+from .audio import StreamingResampler, split_at_silence
+from .cli import ROUTES, MODEL_HELP, log, select_model
+
+# ----------------- 批处理：录音文件 → 字幕（SRT / VTT） -----------------
+# 用法：python main.py --batch meeting.wav talk.mp3 --asr-lang en --tgt-lang zh [-j 8] [--format srt,vtt] [-o out/]
+# 整段音频按静音切块，块交给进程池识别（每个工作进程只加载一次 vosk.Model）；
+# 主进程按块顺序合并词时间戳、切成字幕条并翻译，翻译与后续块的识别同时进行。
+# 非 WAV 格式（以及 WAV 里的浮点 / 压缩编码）需要 PATH 中有 ffmpeg。
+
+RATE = 16000
+WordT = Tuple[str, float, float]  # (词, 起, 止)，单位秒，已加上块偏移
+
+class BatchError(Exception):
+    pass
+
+# ---- 读取音频（统一为 16 kHz 单声道 int16） ----
+def _pcm_from_wav(path: str, rate: int) -> np.ndarray:
+    with wave.open(path, "rb") as w:
+        ch, width, src_rate, n = w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()
+        raw = w.readframes(n)
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif width == 2:
+        x = np.frombuffer(raw, dtype="<i2")
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        x = (b[:, 1].astype(np.int16) | (b[:, 2].astype(np.int8).astype(np.int16) << 8))
+    elif width == 4:
+        x = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise BatchError(f"不支持的采样位宽：{width * 8} bit")
+    x = x[:x.size // ch * ch]
+    if ch > 1:
+        x = x.reshape(-1, ch).mean(axis=1).astype(np.int16)
+    if src_rate == rate:
+        return np.ascontiguousarray(x)
+    rs = StreamingResampler(src_rate, rate)
+    block = 1 << 16
+    return np.concatenate([rs.process(x[i:i + block]).copy() for i in range(0, x.size, block)] or [x[:0]])
+
+def _pcm_from_ffmpeg(path: str, rate: int) -> np.ndarray:
+    exe = shutil.which("ffmpeg")
+    if not exe:
+        raise BatchError("该格式需要 ffmpeg（未在 PATH 中找到）")
+    proc = subprocess.run([exe, "-nostdin", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(rate), "-"],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise BatchError(f"ffmpeg 解码失败：{proc.stderr.decode('utf-8', 'replace').strip()[-300:]}")
+    return np.frombuffer(proc.stdout, dtype="<i2")
+
+def load_audio(path: str, rate: int = RATE) -> np.ndarray:
+    if path.lower().endswith(".wav"):
+        try:
+            return _pcm_from_wav(path, rate)
+        except (wave.Error, EOFError):
+            pass  # 浮点 / ADPCM 等 wave 模块读不了的编码交给 ffmpeg
+    return _pcm_from_ffmpeg(path, rate)
+
+# ---- 工作进程：每个进程常驻一个 vosk.Model ----
+_MODEL = None
+
+def _worker_init(model_path: str):
+    global _MODEL
+    import vosk
+    try:
+        vosk.SetLogLevel(-1)
+    except Exception:
+        pass
+    _MODEL = vosk.Model(model_path)
+
+def _decode_chunk(idx: int, offset: float, pcm: bytes, rate: int = RATE):
+    # 返回 (块序号, 话语列表, 该块 CPU 秒)；每个话语是带绝对时间戳的词列表
+    import vosk
+    t0 = time.process_time()
+    rec = vosk.KaldiRecognizer(_MODEL, rate)
+    rec.SetWords(True)
+    utts: List[List[WordT]] = []
+
+    def collect(res: str):
+        try:
+            words = json.loads(res or "{}").get("result") or []
+        except Exception:
+            words = []
+        words = [(w["word"], round(offset + w["start"], 3), round(offset + w["end"], 3)) for w in words if w.get("word")]
+        if words:
+            utts.append(words)
+
+    step = rate  # 0.5 s（int16 每样本 2 字节）
+    for i in range(0, len(pcm), step):
+        if rec.AcceptWaveform(pcm[i:i + step]):
+            collect(rec.Result())
+    collect(rec.FinalResult())
+    return idx, utts, time.process_time() - t0
+
+# ---- 字幕条 ----
+def make_cues(utts: List[List[WordT]], max_chars: int = 42, max_dur: float = 6.0, max_gap: float = 0.8) -> List[Dict]:
+    # 在话语内部按停顿、时长与字数再切，避免一条字幕占满屏幕
+    cues = []
+    for words in utts:
+        cur: List[WordT] = []
+        for w in words:
+            if cur and (w[1] - cur[-1][2] > max_gap or w[2] - cur[0][1] > max_dur
+                        or sum(len(x[0]) + 1 for x in cur) + len(w[0]) > max_chars):
+                cues.append(cur)
+                cur = []
+            cur.append(w)
+        if cur:
+            cues.append(cur)
+    return [{"start": c[0][1], "end": c[-1][2], "text": " ".join(w[0] for w in c)} for c in cues]
+
+def _ts(t: float, sep: str) -> str:
+    ms = int(round(max(0.0, t) * 1000))
+    h, ms = divmod(ms, 3600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+def _cue_lines(c: Dict, subs: str) -> str:
+    trans = c.get("translation")
+    if subs == "source" or trans is None:
+        return c["text"]
+    return trans if subs == "target" else f"{c['text']}\n{trans}"
+
+def write_srt(path: str, cues: List[Dict], subs: str = "both"):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, c in enumerate(cues, 1):
+            f.write(f"{i}\n{_ts(c['start'], ',')} --> {_ts(c['end'], ',')}\n{_cue_lines(c, subs)}\n\n")
+
+def write_vtt(path: str, cues: List[Dict], subs: str = "both"):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for c in cues:
+            f.write(f"{_ts(c['start'], '.')} --> {_ts(c['end'], '.')}\n{_cue_lines(c, subs)}\n\n")
+
+_WRITERS = {"srt": write_srt, "vtt": write_vtt}
+
+# ---- 单个文件 ----
+def _chunk_target(duration: float, jobs: int) -> float:
+    # 块数至少是进程数的 3 倍，尾部不会只剩一两个进程在忙；块长限制在 8～30 s
+    return min(30.0, max(8.0, duration / (3 * jobs)))
+
+def transcribe_file(pool: ProcessPoolExecutor, jobs: int, path: str, src: str, tgt: Optional[str], route: str,
+                    max_chars: int = 42) -> Dict:
+    t0 = time.perf_counter()
+    pcm = load_audio(path)
+    duration = pcm.size / RATE
+    t_load = time.perf_counter() - t0
+    target = _chunk_target(duration, jobs)
+    spans = split_at_silence(pcm, RATE, target_s=target, max_s=target * 1.5, min_s=min(5.0, target / 2))
+    futs = [pool.submit(_decode_chunk, i, a / RATE, pcm[a:b].tobytes()) for i, (a, b) in enumerate(spans)]
+    # 按块顺序取结果：前面的块一就绪就切字幕条并翻译，和后面块的识别重叠
+    cues, cpu, t_trans = [], 0.0, 0.0
+    for fut in futs:
+        _idx, utts, c = fut.result()
+        cpu += c
+        part = make_cues(utts, max_chars=max_chars)
+        if tgt:
+            t1 = time.perf_counter()
+            # 一个块的字幕条合成一次批量翻译
+            for cue, trans in zip(part, argos_translate_batch([c["text"] for c in part], src, tgt, route)):
+                cue["translation"] = trans
+            t_trans += time.perf_counter() - t1
+        cues.extend(part)
+    wall = time.perf_counter() - t0
+    return {"file": path, "duration": round(duration, 2), "chunks": len(spans), "cues": cues,
+            "wall": round(wall, 2), "rtf": round(wall / duration, 4) if duration else 0.0,
+            "asr_cpu": round(cpu, 2), "load_s": round(t_load, 2), "translate_s": round(t_trans, 2)}
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="main.py --batch", description="Batch transcription/translation of audio files to SRT/VTT")
+    ap.add_argument("files", nargs="+", help="audio files (WAV natively; other formats via ffmpeg)")
+    ap.add_argument("--asr-lang", default="en", help="source language (ja / zh / en)")
+    ap.add_argument("--tgt-lang", default="zh", help="target language")
+    ap.add_argument("--model", default=None, help=MODEL_HELP)
+    ap.add_argument("--route", choices=sorted(ROUTES), default="auto")
+    ap.add_argument("--no-translate", action="store_true", help="source subtitles only")
+    ap.add_argument("-j", "--jobs", type=int, default=0,
+                    help="worker processes (default: CPU count); each loads its own copy of the model")
+    ap.add_argument("--format", default="srt", help="comma-separated: srt, vtt")
+    ap.add_argument("--subs", choices=["both", "target", "source"], default="both", help="subtitle text lines")
+    ap.add_argument("--max-chars", type=int, default=42, help="max characters per cue before splitting")
+    ap.add_argument("-o", "--out-dir", default=None, help="output directory (default: next to each input)")
+    ap.add_argument("--report", default=None, help="write per-file stats as JSON to this path")
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    formats = [f.strip().lower() for f in args.format.split(",") if f.strip()]
+    bad = [f for f in formats if f not in _WRITERS]
+    if bad or not formats:
+        log(f"unknown subtitle format: {', '.join(bad) or args.format}")
+        return 2
+    model = select_model(args.model, args.asr_lang)
+    if not model:
+        return 2
+    translate = not args.no_translate and args.tgt_lang != args.asr_lang
+    tgt = args.tgt_lang if translate else None
+    route = ROUTES[args.route]
+    if translate:
+        threading.Thread(target=argos_warm_up, args=(args.asr_lang, tgt, route), name="argos-warmup", daemon=True).start()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    # spawn：Kaldi 不保证 fork 安全，且主进程里已有预热线程
+    ctx = multiprocessing.get_context("spawn")
+    stats, failed = [], 0
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx, initializer=_worker_init,
+                             initargs=(os.path.join(MODELS_DIR, model),)) as pool:
+        log(f"batch: {len(args.files)} file(s), model {model}, {jobs} worker(s), "
+             f"{args.asr_lang}->{tgt or args.asr_lang}")
+        for path in args.files:
+            try:
+                r = transcribe_file(pool, jobs, path, args.asr_lang, tgt, route, max_chars=args.max_chars)
+            except Exception as e:
+                failed += 1
+                log(f"{path}: failed: {e}")
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0]
+            base = os.path.join(args.out_dir or os.path.dirname(os.path.abspath(path)), stem)
+            outs = []
+            for fmt in formats:
+                _WRITERS[fmt](f"{base}.{fmt}", r["cues"], args.subs)
+                outs.append(f"{base}.{fmt}")
+            par = r["asr_cpu"] / r["wall"] if r["wall"] else 0.0
+            log(f"{path}: {r['duration']:.1f} s audio, {r['chunks']} chunks, {len(r['cues'])} cues, "
+                 f"wall {r['wall']:.1f} s, RTF {r['rtf']:.3f} (ASR cpu {r['asr_cpu']:.1f} s, {par:.1f}x parallel, "
+                 f"translate {r['translate_s']:.1f} s) -> {', '.join(outs)}")
+            r.pop("cues")
+            stats.append({**r, "outputs": outs})
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"jobs": jobs, "model": model, "files": stats}, f, ensure_ascii=False, indent=1)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import os, sys
+from typing import Optional
+
+from .utils import MODELS_DIR, list_local_vosk_models, ensure_vosk_model_ready, TranslateRoute
+
+# ----------------- 命令行入口共用的小工具（无界面模式 / 批处理 / 基准） -----------------
+
+ROUTES = {"auto": TranslateRoute.AUTO, "direct": TranslateRoute.DIRECT, "via_en": TranslateRoute.VIA_EN}
+
+MODEL_HELP = ("Vosk model folder name under models/ (a path to a folder inside models/ also works); "
+              "default: first installed for --asr-lang")
+
+def log(msg: str):
+    print(msg, file=sys.stderr, flush=True)
+
+def resolve_model(arg: str) -> Optional[str]:
+    # 模型池与清单都按 models/ 下的目录名索引；给路径时只接受 models/ 里的目录，换算成目录名
+    if os.sep not in arg and not (os.altsep and os.altsep in arg):
+        return arg
+    path = os.path.abspath(arg.rstrip("/\\"))
+    if os.path.normcase(os.path.dirname(path)) != os.path.normcase(MODELS_DIR):
+        log(f"--model must name a folder inside {MODELS_DIR} (got {arg}); copy or import the model there first")
+        return None
+    return os.path.basename(path)
+
+def pick_model(lang: str) -> Optional[str]:
+    for m in list_local_vosk_models(lang):
+        if m.get("installed") and m.get("complete", True):
+            return m["folder"]
+    return None
+
+def select_model(arg: Optional[str], lang: str) -> Optional[str]:
+    # --model 给了就按它解析，否则取该语言第一个已安装的模型；再用清单确认模型完整。失败时已打印原因
+    if arg:
+        model = resolve_model(arg)
+        if not model:
+            return None
+    else:
+        model = pick_model(lang)
+        if not model:
+            log(f"no installed Vosk model for '{lang}' under models/ (use --model)")
+            return None
+    ok, msg = ensure_vosk_model_ready(model)
+    if not ok:
+        log(msg)
+        return None
+    return model
@@ -0,0 +1,287 @@
+import os, re, json, time, hashlib, threading
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError
+from typing import Callable, Dict, List, Optional
+
+# ----------------- 可续传、可分段并发的 HTTP 下载 -----------------
+# 数据先写入 <dest>.part，分段进度记录在 <dest>.part.json；取消或出错时两者都保留，
+# 下次对同一 URL 下载会从断点继续。服务器不支持 Range 时退化为单连接、从头下载。
+
+class DownloadCancelled(Exception):
+    pass
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+_UA = {"User-Agent": "Mozilla/5.0"}
+
+def _replace(src: str, dst: str, attempts: int = 40):
+    # Windows 上若有读者（边下载边解压）正短暂打开 .part，改名会失败，稍等重试
+    for i in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if i == attempts - 1:
+                raise
+            time.sleep(0.05)
+
+class _Segment:
+    __slots__ = ("start", "end", "done")
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start = start  # 含
+        self.end = end      # 含
+        self.done = done
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+    @property
+    def finished(self) -> bool:
+        return self.done >= self.size
+
+class SegmentedDownloader:
+    def __init__(self, url: str, dest_path: str, connections: int = 4, chunk_size: int = 256 * 1024,
+                 min_segment: int = 8 * 1024 * 1024, retries: int = 5, backoff: float = 0.5, timeout: float = 60,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 cancelled: Optional[Callable[[], bool]] = None):
+        self.url = url
+        self.dest_path = dest_path
+        self.part_path = dest_path + ".part"
+        self.state_path = dest_path + ".part.json"
+        self.connections = max(1, int(connections))
+        self.chunk = int(chunk_size)
+        self.min_segment = int(min_segment)
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.timeout = timeout
+        self._progress = progress
+        self._cancelled = cancelled or (lambda: False)
+        self._lock = threading.Lock()
+        self._segments: List[_Segment] = []
+        self._meta: Dict = {}
+        self._error: Optional[BaseException] = None
+        self._last_save = 0.0
+        self._save_lock = threading.Lock()
+        self.total = 0
+        self.resumed_bytes = 0
+        self.retried = 0
+        # 边下载边算 SHA-256：首段写入的字节直接进哈希，其余部分在前面连续后从文件补读（多在页缓存里）
+        self._hash_lock = threading.Lock()
+        self._sha = hashlib.sha256()
+        self._hash_pos = 0
+        self.sha256: Optional[str] = None
+
+    # ---- 探测与状态 ----
+    def _probe(self):
+        # 用 bytes=0-0 探测：206 说明支持 Range，并能从 Content-Range 得到总长度。
+        # 服务器忽略 Range 回 200 时响应体就是整个文件：不读，连同打开的响应交给单连接路径，只下载一遍
+        req = Request(self.url, headers={**_UA, "Range": "bytes=0-0"})
+        resp = urlopen(req, timeout=self.timeout)
+        try:
+            m = _CONTENT_RANGE.match(resp.headers.get("Content-Range", "") or "")
+            ranged = resp.status == 206 and m is not None and m.group(3) != "*"
+            total = int(m.group(3)) if ranged else int(resp.headers.get("Content-Length") or 0)
+            validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified") or ""
+            if resp.status == 200:
+                return ranged, total, validator, resp
+            resp.read()
+        except BaseException:
+            resp.close()
+            raise
+        resp.close()
+        return ranged, total, validator, None
+
+    def _load_state(self, total: int, validator: str) -> bool:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                st = json.load(f)
+            if (st.get("url") != self.url or st.get("total") != total or st.get("validator") != validator
+                    or os.path.getsize(self.part_path) != total):
+                return False
+            self._segments = [_Segment(*s) for s in st["segments"]]
+            return bool(self._segments)
+        except Exception:
+            return False
+
+    def _save_state(self, force: bool = False):
+        # 各段线程都会调用：节流判断、取快照、写临时文件、改名全在 _save_lock 内，
+        # 不会两个线程同时写同一个 .tmp，也不会让旧快照覆盖新快照；别的线程正在保存时非强制调用直接跳过
+        if not self._save_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self._last_save < 1.0:
+                return
+            self._last_save = now
+            with self._lock:
+                st = {**self._meta, "segments": [[s.start, s.end, s.done] for s in self._segments]}
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(st, f)
+            os.replace(tmp, self.state_path)
+        except Exception:
+            pass
+        finally:
+            self._save_lock.release()
+
+    def _plan(self, total: int):
+        n = max(1, min(self.connections, total // max(1, self.min_segment)))
+        step = -(-total // n)
+        self._segments = [_Segment(a, min(a + step, total) - 1) for a in range(0, total, step)]
+
+    def done_bytes(self) -> int:
+        with self._lock:
+            return sum(s.done for s in self._segments)
+
+    def contiguous_bytes(self) -> int:
+        # 从文件开头起连续可读的字节数，供边下载边解压按顺序读取
+        with self._lock:
+            end = 0
+            for s in self._segments:
+                end = s.start + s.done
+                if not s.finished:
+                    break
+            return end
+
+    def readable_path(self) -> str:
+        # 下载完成后 .part 会被改名为目标文件
+        return self.part_path if os.path.exists(self.part_path) else self.dest_path
+
+    def _hash_chunk(self, pos: int, data: bytes):
+        with self._hash_lock:
+            if pos == self._hash_pos:
+                self._sha.update(data)
+                self._hash_pos += len(data)
+
+    def _hash_upto(self, end: int):
+        with self._hash_lock:
+            if self._hash_pos >= end:
+                return
+            with open(self.part_path, "rb") as f:
+                f.seek(self._hash_pos)
+                while self._hash_pos < end:
+                    data = f.read(min(4 * 1024 * 1024, end - self._hash_pos))
+                    if not data:
+                        break
+                    self._sha.update(data)
+                    self._hash_pos += len(data)
+
+    def _report(self):
+        if self._progress:
+            self._progress(self.done_bytes(), self.total)
+
+    # ---- 下载 ----
+    def run(self) -> str:
+        ranged, total, validator, body = self._probe()
+        if not ranged or total <= 0:
+            return self._run_single(body)
+        self.total = total
+        self._meta = {"url": self.url, "total": total, "validator": validator}
+        if self._load_state(total, validator):
+            self.resumed_bytes = self.done_bytes()
+        else:
+            self._plan(total)
+            with open(self.part_path, "wb") as f:
+                f.truncate(total)
+        self._save_state(force=True)
+        self._report()
+        threads = [threading.Thread(target=self._segment_loop, args=(s,), name=f"dl-seg-{i}", daemon=True)
+                   for i, s in enumerate(self._segments) if not s.finished]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self._save_state(force=True)
+        if self._error is not None:
+            raise self._error
+        if self._cancelled():
+            raise DownloadCancelled()
+        self._hash_upto(total)
+        self.sha256 = self._sha.hexdigest()
+        _replace(self.part_path, self.dest_path)
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        return self.dest_path
+
+    def _segment_loop(self, seg: _Segment):
+        attempt = 0
+        while not seg.finished and self._error is None and not self._cancelled():
+            before = seg.done
+            try:
+                self._fetch(seg)
+            except DownloadCancelled:
+                return
+            except Exception as e:
+                # 有进展就重置重试计数：长时间下载中偶发的断线不应累计成失败
+                attempt = 0 if seg.done > before else attempt + 1
+                if attempt > self.retries:
+                    self._error = e
+                    return
+                with self._lock:
+                    self.retried += 1
+                time.sleep(min(30.0, self.backoff * (2 ** max(0, attempt - 1))))
+        if seg.finished:
+            # 前面的段完成后把哈希追到当前连续位置，之后后续段的写入又能直接进哈希
+            try:
+                self._hash_upto(self.contiguous_bytes())
+            except OSError:
+                pass
+
+    def _fetch(self, seg: _Segment):
+        pos = seg.start + seg.done
+        req = Request(self.url, headers={**_UA, "Range": f"bytes={pos}-{seg.end}"})
+        with urlopen(req, timeout=self.timeout) as resp:
+            if resp.status != 206:
+                raise HTTPError(self.url, resp.status, "server ignored Range", resp.headers, None)
+            with open(self.part_path, "r+b") as f:
+                f.seek(pos)
+                while not seg.finished:
+                    if self._cancelled() or self._error is not None:
+                        raise DownloadCancelled()
+                    data = resp.read(min(self.chunk, seg.size - seg.done))
+                    if not data:
+                        raise ConnectionError(f"连接中断：{seg.start + seg.done}/{seg.end + 1}")
+                    f.write(data)
+                    f.flush()  # 先落到文件再计入进度：边下载边解压的读者只读已计入的字节
+                    self._hash_chunk(seg.start + seg.done, data)
+                    with self._lock:
+                        seg.done += len(data)
+                    self._report()
+                    self._save_state()
+
+    def _run_single(self, resp=None) -> str:
+        # 不支持 Range：无法续传，单连接从头下载（仍先写 .part，成功后再改名）；
+        # resp 为探测时已打开的 200 响应，直接接着读
+        if resp is None:
+            resp = urlopen(Request(self.url, headers=_UA), timeout=self.timeout)
+        with resp:
+            self.total = resp.length or 0
+            seg = _Segment(0, max(0, self.total - 1))
+            self._segments = [seg]
+            with open(self.part_path, "wb") as f:
+                while True:
+                    if self._cancelled():
+                        raise DownloadCancelled()
+                    data = resp.read(self.chunk)
+                    if not data:
+                        break
+                    f.write(data)
+                    f.flush()
+                    self._sha.update(data)
+                    with self._lock:
+                        seg.done += len(data)
+                    self._report()
+        self.sha256 = self._sha.hexdigest()
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+        _replace(self.part_path, self.dest_path)
+        return self.dest_path
+
+def discard_partial(dest_path: str):
+    for p in (dest_path + ".part", dest_path + ".part.json"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
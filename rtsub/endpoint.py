@@ -0,0 +1,95 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional
+
+# ----------------- 断句策略 -----------------
+PUNCTS = set(".,!?，。！？、;；:")
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = (len(s) - 1) * q / 100.0
+    lo = int(k); hi = min(lo + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+class EndpointPolicy(ABC):
+    # 识别线程每处理一块音频（或空转一次）调用 should_commit；返回 True 时立即出句
+    def __init__(self, min_chars: int = 5, src_max: int = 72, history: int = 500):
+        self.min_chars = min_chars
+        self.src_max = src_max
+        self._lat = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.stable = 0
+        self.last_word_end: Optional[float] = None
+        self.changed_at = 0.0
+
+    def on_partial(self, text: str, words: Optional[list], rec_t: float, now: float):
+        if text != self.text:
+            self.text = text
+            self.stable = 0
+            self.changed_at = now
+            # 没有词级时间戳（旧版 Vosk / 未开 SetPartialWords）时用文本变化时刻近似
+            self.last_word_end = rec_t
+        else:
+            self.stable += 1
+        if words:
+            try:
+                self.last_word_end = float(words[-1].get("end", self.last_word_end))
+            except Exception:
+                pass
+
+    def trailing_silence(self, rec_t: float, idle: float) -> float:
+        if self.last_word_end is None:
+            return 0.0
+        return max(0.0, rec_t - self.last_word_end) + max(0.0, idle)
+
+    @abstractmethod
+    def should_commit(self, rec_t: float, idle: float, now: float) -> bool:
+        ...
+
+    def committed(self, rec_t: float, idle: float):
+        if self.last_word_end is not None:
+            self._lat.append(self.trailing_silence(rec_t, idle))
+        self.reset()
+
+    def latency_stats(self) -> Dict[str, float]:
+        v = list(self._lat)
+        return {"n": len(v), "p50_ms": percentile(v, 50) * 1000, "p90_ms": percentile(v, 90) * 1000,
+                "p99_ms": percentile(v, 99) * 1000}
+
+class FixedEndpointPolicy(EndpointPolicy):
+    # 原有规则：标点 / 超过 src_max / 部分结果 segment_timeout 秒未变化
+    def __init__(self, segment_timeout: float = 1.0, **kw):
+        self.segment_timeout = segment_timeout
+        super().__init__(**kw)
+
+    def should_commit(self, rec_t: float, idle: float, now: float) -> bool:
+        t = self.text
+        if not t:
+            return False
+        if t[-1:] in PUNCTS or len(t) >= self.src_max:
+            return True
+        return len(t) >= self.min_chars and now - self.changed_at >= self.segment_timeout
+
+class LatencyBudgetPolicy(EndpointPolicy):
+    # 按延迟预算断句：末词之后的静音达到 budget 必出句；部分结果已稳定 stable_updates 次时 min_silence 即可出句
+    def __init__(self, budget: float = 0.4, min_silence: float = 0.15, stable_updates: int = 3, **kw):
+        self.budget = budget
+        self.min_silence = min_silence
+        self.stable_updates = stable_updates
+        super().__init__(**kw)
+
+    def should_commit(self, rec_t: float, idle: float, now: float) -> bool:
+        t = self.text
+        if not t:
+            return False
+        if t[-1:] in PUNCTS or len(t) >= self.src_max:
+            return True
+        if len(t) < self.min_chars:
+            return False
+        need = self.min_silence if self.stable >= self.stable_updates else self.budget
+        return self.trailing_silence(rec_t, idle) >= need
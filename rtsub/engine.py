@@ -0,0 +1,439 @@
+import json, time
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+from .utils import ensure_vosk_model_ready, argos_translate, argos_translate_batch, TranslateRoute
+from .pipeline import TranslationStage, StalePolicy
+from .endpoint import EndpointPolicy, FixedEndpointPolicy
+from .modelpool import MODEL_POOL
+from .metrics import METRICS
+from .audio import (StreamingResampler, LevelMeter, AudioRing, OverflowPolicy, VoiceGate,
+                    negotiate_capture_rate, forget_capture_rate)
+
+# ----------------- 采集 → 识别 → 翻译 核心（不依赖 Qt） -----------------
+# GUI 里的 AudioCaptureWorker / ASRWorker 只是把这里的回调转成 Qt 信号；
+# 无界面模式（headless）、批处理与基准测试直接在普通线程里跑这两个类。
+
+def _noop(*_args):
+    pass
+
+# 各阶段指标：导入时注册一次。时间戳统一用 time.monotonic()，采集时刻随 AudioRing 一起传到识别线程
+_M_QUEUE_WAIT = METRICS.histogram("rtsub_audio_queue_wait_seconds", "Capture timestamp to ASR read, per audio block")
+_M_DECODE = METRICS.histogram("rtsub_decode_seconds", "AcceptWaveform time per audio block")
+_M_SOURCE = METRICS.histogram("rtsub_capture_to_source_seconds",
+                              "Capture timestamp of the last block read to source segment emission")
+_M_QUEUE_DEPTH = METRICS.gauge("rtsub_audio_queue_seconds", "Audio buffered between capture and ASR")
+_M_RTF = METRICS.gauge("rtsub_realtime_factor", "ASR decode time / audio time (moving average)")
+_M_DROPPED = METRICS.counter("rtsub_audio_dropped_seconds_total", "Audio dropped because ASR fell behind")
+_M_SEGMENTS = METRICS.counter("rtsub_segments_total", "Source segments emitted")
+_M_OVERFLOWS = METRICS.counter("rtsub_capture_overflows_total", "Input overflows reported by PortAudio")
+# 发出文字时打点（METRICS.stamp），界面 / 输出端拿到后 observe_since 这个直方图
+RENDER_DELAY = METRICS.histogram("rtsub_render_delay_seconds", "Segment emission to overlay/output")
+
+# ----------------- 输入设备 -----------------
+_LOOPBACK_HINTS = ["stereo mix", "立体声", "what u hear", "wave out", "loopback", "monitor", "speakers", "扬声器", "realtek"]
+
+def list_input_devices(pa) -> List[Tuple[int, str]]:
+    devices = []
+    try:
+        for i in range(pa.get_device_count()):
+            try:
+                info = pa.get_device_info_by_index(i)
+                if info.get("maxInputChannels", 0) > 0:
+                    devices.append((i, str(info.get("name", "?"))))
+            except Exception:
+                continue
+    except Exception:
+        pass
+    return devices
+
+def test_input_device(pa, idx: int) -> bool:
+    import pyaudio
+    try:
+        s = pa.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True,
+                    input_device_index=idx, frames_per_buffer=1024)
+        s.close(); return True
+    except Exception:
+        return False
+
+def auto_pick_device(pa) -> Optional[int]:
+    # 优先回环/立体声混音类设备（转录系统播放的声音），其次任何能打开的输入设备
+    devices = list_input_devices(pa)
+    for i, name in devices:
+        if any(k in name.lower() for k in _LOOPBACK_HINTS) and test_input_device(pa, i):
+            return i
+    for i, _name in devices:
+        if test_input_device(pa, i):
+            return i
+    return None
+
+# ----------------- 采集 -----------------
+class CaptureEngine:
+    def __init__(self, device_index: Optional[int], rate=16000, chunk=1024, level_hz=15.0,
+                 sink: Optional[AudioRing] = None, callback_mode=False,
+                 on_level: Callable[[float], None] = _noop, on_chunk: Callable[[bytes], None] = _noop,
+                 on_info: Callable[[int, int, int], None] = _noop,
+                 on_stats: Callable[[int, float], None] = _noop, on_error: Callable[[str], None] = _noop,
+                 should_stop: Callable[[], bool] = lambda: False):
+        self.device_index = device_index
+        self.level_hz = level_hz
+        # 有 sink 时 16k PCM 直接写入识别线程的环形缓冲，不经过 GUI 事件循环；否则走 on_chunk 回调
+        self.sink = sink
+        # 回调模式：PortAudio 回调里只把数据拷进 _raw 环形缓冲，电平/重采样都在采集线程里做
+        self.callback_mode = callback_mode
+        self.rate = rate
+        self.chunk = chunk
+        self.channels = 1
+        self.on_level = on_level
+        self.on_chunk = on_chunk
+        self.on_info = on_info
+        self.on_stats = on_stats
+        self.on_error = on_error
+        self.should_stop = should_stop
+        self._stop = False
+        self.input_rate = None
+        self.target_rate = rate
+        self.input_latency = 0.0
+        self.input_overflows = 0
+        self._resampler: Optional[StreamingResampler] = None
+        self._raw: Optional[AudioRing] = None
+        self._pyaudio = None
+    def stop(self):
+        self._stop = True
+        if self._raw is not None:
+            self._raw.close()
+    def _running(self) -> bool:
+        return not self._stop and not self.should_stop()
+    def _on_audio(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & self._pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        if in_data:
+            self._raw.write(np.frombuffer(in_data, dtype=np.int16), time.monotonic())
+        return (None, self._pyaudio.paContinue)
+    def _open_stream(self, pa, rate: int):
+        kw = dict(format=self._pyaudio.paInt16, channels=self.channels, rate=int(rate), input=True,
+                  input_device_index=self.device_index, frames_per_buffer=self.chunk)
+        if self.callback_mode:
+            self._raw = AudioRing(int(rate * 2), policy=OverflowPolicy.DROP_OLDEST)
+            kw["stream_callback"] = self._on_audio
+        return pa.open(**kw)
+    def _process(self, audio: np.ndarray, meter: LevelMeter, ts: Optional[float] = None):
+        level = meter.update(audio)
+        if level is not None:
+            self.on_level(level)
+        pcm = self._resampler.process(audio) if self._resampler is not None else audio
+        if self.sink is not None:
+            self.sink.write(pcm, ts)
+        else:
+            self.on_chunk(pcm.tobytes())
+    def _report_overflows(self, seen: int) -> int:
+        if self.input_overflows != seen:
+            _M_OVERFLOWS.inc(self.input_overflows - seen)
+            self.on_stats(self.input_overflows, self.input_latency * 1000.0)
+        return self.input_overflows
+    def _run_blocking(self, stream, meter: LevelMeter):
+        seen = 0
+        while self._running():
+            try:
+                data = stream.read(self.chunk, exception_on_overflow=True)
+            except IOError as e:
+                if getattr(e, "errno", None) != self._pyaudio.paInputOverflowed:
+                    raise
+                self.input_overflows += 1
+                seen = self._report_overflows(seen)
+                continue
+            audio = np.frombuffer(data, dtype=np.int16)
+            if audio.size == 0:
+                continue
+            self._process(audio, meter, time.monotonic())
+    def _run_callback(self, stream, meter: LevelMeter):
+        seen = 0
+        buf = np.empty(self.chunk * 4, dtype=np.int16)
+        while self._running() and stream.is_active():
+            n = self._raw.read_into(buf, timeout=0.1)
+            seen = self._report_overflows(seen)
+            if n:
+                self._process(buf[:n], meter, self._raw.read_ts or None)
+    def run(self):
+        import pyaudio
+        self._pyaudio = pyaudio
+        pa = pyaudio.PyAudio()
+        stream = None
+        try:
+            dev_info = pa.get_device_info_by_index(self.device_index) if self.device_index is not None else pa.get_default_input_device_info()
+            default_rate = int(dev_info.get("defaultSampleRate", 16000)) or 16000
+            self.input_rate = negotiate_capture_rate(pa, self.device_index, dev_info, pyaudio.paInt16,
+                                                     channels=self.channels, target=self.target_rate)
+            try:
+                stream = self._open_stream(pa, self.input_rate)
+            except Exception:
+                if self.input_rate == default_rate:
+                    raise
+                # 探测通过但实际打不开（部分驱动会误报），退回设备默认采样率
+                forget_capture_rate(self.device_index)
+                self.input_rate = default_rate
+                stream = self._open_stream(pa, self.input_rate)
+            self._resampler = None
+            if self.input_rate != self.target_rate:
+                self._resampler = StreamingResampler(self.input_rate, self.target_rate, max_chunk=self.chunk * 4)
+                self.on_info(self.input_rate, self._resampler.up, self._resampler.down)
+            else:
+                self.on_info(self.input_rate, 1, 1)
+            try:
+                self.input_latency = float(stream.get_input_latency())
+            except Exception:
+                self.input_latency = 0.0
+            self.on_stats(0, self.input_latency * 1000.0)
+            meter = LevelMeter(self.input_rate, ui_hz=self.level_hz, max_chunk=self.chunk * 4)
+            if self.callback_mode:
+                self._run_callback(stream, meter)
+            else:
+                self._run_blocking(stream, meter)
+        except Exception as e:
+            self.on_error(str(e))
+        finally:
+            try:
+                if stream:
+                    stream.stop_stream(); stream.close()
+            except Exception:
+                pass
+            pa.terminate()
+
+# ----------------- 识别 + 翻译 -----------------
+class RecognitionEngine:
+    def __init__(self, asr_lang="ja", tgt_lang="zh",
+                 route=TranslateRoute.AUTO, model_folder=None, rate=16000,
+                 trans_policy=StalePolicy.MAX_AGE, trans_max_age=3.0, trans_queue_size=8,
+                 trans_batch=8, trans_batch_window=0.0,
+                 speculative=False, spec_stable_updates=2,
+                 ring_seconds=8.0, overflow_policy=OverflowPolicy.DROP_OLDEST, vad=False,
+                 endpoint: Optional[EndpointPolicy] = None,
+                 on_source: Callable[[int, str], None] = _noop, on_text: Callable[[int, str, str], None] = _noop,
+                 on_status: Callable[[str], None] = _noop, on_error: Callable[[str], None] = _noop,
+                 should_stop: Callable[[], bool] = lambda: False):
+        self.asr_lang = asr_lang
+        self.tgt_lang = tgt_lang
+        self.route = route
+        self.model_folder = model_folder
+        self.rate = rate
+        self.on_source = on_source
+        self.on_text = on_text
+        self.on_status = on_status
+        self.on_error = on_error
+        self.should_stop = should_stop
+        self._stop = False
+        self.ring = AudioRing(int(rate * ring_seconds), policy=overflow_policy)
+        self._rbuf = np.empty(int(rate * 0.2), dtype=np.int16)
+        # VAD 门限：持续非语音不送 Vosk，语音→静音时立即 FinalResult 出句
+        self.vad: Optional[VoiceGate] = VoiceGate(rate) if vad else None
+        self.segment_timeout = 1.0
+        self.min_chars = 5
+        self.src_max = 72
+        self.tgt_max = 100
+        # 断句策略可替换；默认沿用固定超时规则，LatencyBudgetPolicy 按词级时间戳与延迟预算出句
+        self.endpoint = endpoint or FixedEndpointPolicy(segment_timeout=self.segment_timeout,
+                                                        min_chars=self.min_chars, src_max=self.src_max)
+        self._cur_partial = ""
+        self._rec_t = 0.0
+        self._last_feed = 0.0
+        self._seg_id = 0
+        self._dec_avg = 0.0
+        self._audio_avg = 0.0
+        # 推测翻译：部分结果的前缀在连续 spec_stable_updates 次更新中不变时提前送去翻译
+        self.speculative = speculative
+        self.spec_stable_updates = max(1, int(spec_stable_updates))
+        self._partial_hist = []
+        self._last_spec = ""
+        joiner = "" if tgt_lang in ("zh", "ja") else " "
+        # trans_batch > 1：积压的段落合成一次批量翻译（见 TranslationStage），1 表示逐条翻译
+        self._trans = TranslationStage(self._translate, self._on_translated,
+                                       maxsize=trans_queue_size, policy=trans_policy, max_age=trans_max_age,
+                                       spec_joiner=joiner if speculative else None,
+                                       batch_fn=self._translate_batch if trans_batch > 1 else None,
+                                       batch_max=trans_batch, batch_window=trans_batch_window)
+    @property
+    def audio_time(self) -> float:
+        # 已送入识别器的音频时长（秒），作为出句的音频时间戳
+        return self._rec_t
+    def stop(self):
+        self._stop = True
+        self.ring.close()
+    def _running(self) -> bool:
+        return not self._stop and not self.should_stop()
+    def feed(self, audio_bytes: bytes):
+        if not self._stop:
+            self.ring.write(np.frombuffer(audio_bytes, dtype=np.int16))
+    def _clip(self, s: str, limit: int) -> str:
+        s = s or ""
+        return (s[:limit] + "...") if len(s) > limit else s
+    def _translate(self, text: str) -> str:
+        return argos_translate(text, self.asr_lang, self.tgt_lang, route=self.route)
+    def _translate_batch(self, texts: List[str]) -> List[str]:
+        return argos_translate_batch(texts, self.asr_lang, self.tgt_lang, route=self.route)
+    def _on_translated(self, seg_id: int, text: str, trans: str):
+        METRICS.stamp(("translation", seg_id))
+        self.on_text(seg_id, self._clip(text, self.src_max), self._clip(trans, self.tgt_max))
+    def _flush_segment(self, text: str):
+        text = (text or "").strip()
+        if not text:
+            return
+        # 原文立即上屏，译文由翻译线程稍后补上，识别循环不再等待 Argos
+        self._seg_id += 1
+        self._partial_hist = []
+        self._last_spec = ""
+        now = time.monotonic()
+        if self.ring.read_ts:
+            _M_SOURCE.observe(now - self.ring.read_ts)
+        _M_SEGMENTS.inc()
+        METRICS.stamp(("source", self._seg_id), now)
+        self.on_source(self._seg_id, self._clip(text, self.src_max))
+        self._trans.submit(self._seg_id, text)
+    def _maybe_speculate(self, partial: str):
+        words = partial.split()
+        self._partial_hist.append(words)
+        if len(self._partial_hist) > self.spec_stable_updates:
+            self._partial_hist.pop(0)
+        if len(self._partial_hist) < self.spec_stable_updates:
+            return
+        # 最近几次部分结果的公共词前缀视为稳定前缀
+        n = min(len(w) for w in self._partial_hist)
+        k = 0
+        while k < n and all(w[k] == self._partial_hist[0][k] for w in self._partial_hist):
+            k += 1
+        stable = " ".join(self._partial_hist[0][:k])
+        if len(stable) >= self.min_chars and stable != self._last_spec:
+            self._last_spec = stable
+            self._trans.speculate(self._seg_id + 1, stable)
+    def spec_stats(self):
+        return self._trans.spec_stats()
+    def run(self):
+        if not self.model_folder:
+            self.on_error("未指定识别模型目录")
+            return
+        ok, msg = ensure_vosk_model_ready(self.model_folder)
+        if not ok:
+            self.on_error(msg); return
+        warm = MODEL_POOL.info(self.model_folder).get("ready", False)
+        try:
+            model = MODEL_POOL.acquire(self.model_folder)
+        except Exception as e:
+            self.on_error(f"加载模型失败：{e}"); return
+        try:
+            self._run_with_model(model, warm)
+        finally:
+            MODEL_POOL.release(self.model_folder)
+    def _make_recognizer(self, model):
+        import vosk  # 延迟导入：vosk 只在真正开始识别时才需要
+        rec = vosk.KaldiRecognizer(model, self.rate)
+        for opt in ("SetWords", "SetPartialWords"):
+            try:
+                getattr(rec, opt)(True)
+            except Exception:
+                pass
+        return rec
+    def _run_with_model(self, model, warm: bool):
+        info = MODEL_POOL.info(self.model_folder)
+        self.on_status(f"模型{'已预热' if warm else '已加载'}：{info.get('load_s', 0.0):.1f} s，"
+                       f"常驻约 {info.get('bytes', 0) / 1024 ** 2:.0f} MB")
+        try:
+            rec = self._make_recognizer(model)
+        except Exception as e:
+            self.on_error(f"加载模型失败：{e}"); return
+        self.run_with_recognizer(rec)
+    def run_with_recognizer(self, rec):
+        # rec 只需提供 KaldiRecognizer 的 AcceptWaveform / Result / PartialResult / FinalResult
+        self._cur_partial = ""
+        self._rec_t = 0.0
+        self._last_feed = time.time()
+        self.endpoint.reset()
+        self._trans.start()
+        try:
+            self._loop(rec)
+        finally:
+            self._trans.stop()
+    def _idle(self, now: float) -> float:
+        return now - self._last_feed
+    def _segment_done(self, text: str, now: float):
+        self.endpoint.committed(self._rec_t, self._idle(now))
+        self._cur_partial = ""
+        if not text:
+            return
+        self._flush_segment(text)
+        st = self.endpoint.latency_stats()
+        msg = f"监听中 … 断句延迟 p50 {st['p50_ms']:.0f} ms / p90 {st['p90_ms']:.0f} ms"
+        if self.vad is not None:
+            msg += f"，跳过静音 {self.vad.skipped_ratio():.0%}"
+        self.on_status(msg)
+    def _commit(self, rec):
+        # 通过 FinalResult 出句：Vosk 同时重置解码状态，下一句不会带上已出句的词
+        try:
+            r = json.loads(rec.FinalResult() or "{}"); final_seg = (r.get("text") or "").strip()
+        except Exception:
+            final_seg = self._cur_partial
+        self._segment_done(final_seg, time.time())
+    def _check_commit(self, rec):
+        now = time.time()
+        if self._cur_partial and self.endpoint.should_commit(self._rec_t, self._idle(now), now):
+            self._commit(rec)
+    def _decode(self, rec, data: bytes):
+        t0 = time.perf_counter()
+        try:
+            is_final = rec.AcceptWaveform(data)
+        except Exception as e:
+            self.on_status(f"识别错误：{e}")
+            return
+        dt = time.perf_counter() - t0
+        _M_DECODE.observe(dt)
+        # 实时率按解码耗时与音频时长各自做滑动平均再相除，VAD 切出的块长短不一也不会被小块带偏
+        self._dec_avg = 0.9 * self._dec_avg + 0.1 * dt
+        self._audio_avg = 0.9 * self._audio_avg + 0.1 * len(data) / 2 / self.rate
+        _M_RTF.set(self._dec_avg / self._audio_avg if self._audio_avg else 0.0)
+        now = time.time()
+        self._rec_t += len(data) / 2 / self.rate
+        self._last_feed = now
+        if is_final:
+            try:
+                r = json.loads(rec.Result() or "{}"); final_seg = (r.get("text") or "").strip()
+            except Exception:
+                final_seg = ""
+            self._segment_done(final_seg, now)
+            return
+        try:
+            d = json.loads(rec.PartialResult() or "{}")
+            pr = (d.get("partial", "") or "").strip(); words = d.get("partial_result")
+        except Exception:
+            pr, words = "", None
+        if pr:
+            if self.speculative and pr != self._cur_partial:
+                self._maybe_speculate(pr)
+            self._cur_partial = pr
+            self.endpoint.on_partial(pr, words, self._rec_t, now)
+        self._check_commit(rec)
+    def _loop(self, rec):
+        self._overruns_seen = self.ring.overruns
+        dropped_seen = self.ring.dropped
+        while self._running():
+            n = self.ring.read_into(self._rbuf, timeout=0.2)
+            if n and self.ring.read_ts:
+                _M_QUEUE_WAIT.observe(time.monotonic() - self.ring.read_ts)
+            _M_QUEUE_DEPTH.set(self.ring.fill() / self.rate)
+            if self.ring.overruns != self._overruns_seen:
+                self._overruns_seen = self.ring.overruns
+                _M_DROPPED.inc((self.ring.dropped - dropped_seen) / self.rate)
+                dropped_seen = self.ring.dropped
+                self.on_status(f"识别跟不上实时，已丢弃 {self.ring.dropped / self.rate:.1f} 秒音频")
+            if n == 0:
+                self._check_commit(rec)
+                continue
+            if self.vad is None:
+                self._decode(rec, self._rbuf[:n].tobytes())
+                continue
+            events = self.vad.process(self._rbuf[:n])
+            if not events:
+                self._check_commit(rec)
+                continue
+            for ev in events:
+                if ev is None:
+                    self._commit(rec)
+                else:
+                    self._decode(rec, ev.tobytes())
@@ -0,0 +1,254 @@
+import os, time, zlib, shutil, struct, zipfile, tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ----------------- 模型 ZIP 解压：流式解压到暂存目录，完成后原子改名进 models/ -----------------
+# StreamingZipExtractor 是“推”式解析器：按顺序喂入 ZIP 字节（可以边下载边喂），
+# 依次解析本地文件头并把条目解压进暂存目录，同时校验 CRC32。
+# 遇到流式无法处理的条目（加密、非 deflate/stored、长度未知的 stored 条目）时置 unsupported，
+# 调用方在整包就绪后改用 extract_zip() 走 zipfile 的常规路径。
+
+_LOCAL = 0x04034B50
+_CENTRAL = 0x02014B50
+_END = 0x06054B50
+_DESCRIPTOR = 0x08074B50
+_HDR = struct.Struct("<IHHHHHIIIHH")
+
+class ExtractError(Exception):
+    pass
+
+class ExtractCancelled(ExtractError):
+    pass
+
+class _Unsupported(Exception):
+    pass
+
+def _safe_name(name: str) -> str:
+    # 防 zip-slip：拒绝绝对路径与 .. 组件
+    name = name.replace("\\", "/")
+    parts = [p for p in name.split("/") if p not in ("", ".")]
+    if name.startswith("/") or any(p == ".." for p in parts) or (parts and ":" in parts[0]):
+        raise ExtractError(f"非法路径：{name}")
+    return "/".join(parts) + ("/" if name.endswith("/") else "")
+
+def _zip64_sizes(extra: bytes, usize: int, csize: int) -> Tuple[int, int, bool]:
+    i = 0
+    while i + 4 <= len(extra):
+        tag, ln = struct.unpack_from("<HH", extra, i)
+        if tag == 0x0001:
+            vals = extra[i + 4:i + 4 + ln]
+            j = 0
+            if usize == 0xFFFFFFFF and j + 8 <= len(vals):
+                usize = struct.unpack_from("<Q", vals, j)[0]; j += 8
+            if csize == 0xFFFFFFFF and j + 8 <= len(vals):
+                csize = struct.unpack_from("<Q", vals, j)[0]; j += 8
+            return usize, csize, True
+        i += 4 + ln
+    return usize, csize, False
+
+class StreamingZipExtractor:
+    def __init__(self, staging_dir: str, on_entry: Optional[Callable[[int, str], None]] = None):
+        self.staging_dir = staging_dir
+        self.on_entry = on_entry
+        self._buf = bytearray()
+        self._state = "header"
+        self._entry: Optional[Dict] = None
+        self._out = None
+        self._inflate = None
+        self.entries: List[Tuple[str, int]] = []  # (name, size)，只含文件
+        self.fed = 0
+        self.done = False
+        self.unsupported: Optional[str] = None
+
+    def feed(self, data: bytes):
+        if self.done or self.unsupported:
+            return
+        self.fed += len(data)
+        self._buf += data
+        try:
+            while not self.done and self._step():
+                pass
+        except _Unsupported as e:
+            self.unsupported = str(e)
+            self._close_out()
+
+    def close(self):
+        self._close_out()
+
+    def _close_out(self):
+        if self._out is not None:
+            try:
+                self._out.close()
+            except Exception:
+                pass
+            self._out = None
+
+    def _step(self) -> bool:
+        buf = self._buf
+        if self._state == "header":
+            if len(buf) < 4:
+                return False
+            sig = struct.unpack_from("<I", buf)[0]
+            if sig in (_CENTRAL, _END):
+                self.done = True
+                return False
+            if sig != _LOCAL:
+                raise ExtractError("ZIP 格式错误：找不到本地文件头")
+            if len(buf) < _HDR.size:
+                return False
+            _, _ver, flags, method, _t, _d, crc, csize, usize, nlen, xlen = _HDR.unpack_from(buf)
+            if len(buf) < _HDR.size + nlen + xlen:
+                return False
+            raw = bytes(buf[_HDR.size:_HDR.size + nlen])
+            extra = bytes(buf[_HDR.size + nlen:_HDR.size + nlen + xlen])
+            del buf[:_HDR.size + nlen + xlen]
+            name = _safe_name(raw.decode("utf-8" if flags & 0x800 else "cp437"))
+            usize, csize, z64 = _zip64_sizes(extra, usize, csize)
+            if flags & 0x1:
+                raise _Unsupported(f"加密条目：{name}")
+            if method not in (0, 8):
+                raise _Unsupported(f"不支持的压缩方式 {method}：{name}")
+            descriptor = bool(flags & 0x8)
+            if descriptor and method == 0 and name.endswith("/"):
+                csize = 0  # 目录条目没有数据，之后直接是数据描述符
+            elif descriptor and method == 0:
+                raise _Unsupported(f"长度未知的 stored 条目：{name}")
+            self._entry = {"name": name, "method": method, "crc": crc, "left": csize, "usize": usize,
+                           "descriptor": descriptor, "zip64": z64, "crc_acc": 0, "written": 0}
+            path = os.path.join(self.staging_dir, *name.rstrip("/").split("/")) if name.strip("/") else self.staging_dir
+            if name.endswith("/"):
+                os.makedirs(path, exist_ok=True)
+                self._out = None
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._out = open(path, "wb")
+            self._inflate = zlib.decompressobj(-15) if method == 8 else None
+            self._state = "data"
+            return True
+        if self._state == "data":
+            e = self._entry
+            if not buf and not (e["method"] == 0 and e["left"] == 0):
+                return False
+            if e["method"] == 0:
+                n = min(e["left"], len(buf))
+                self._write(bytes(buf[:n]))
+                del buf[:n]
+                e["left"] -= n
+                finished = e["left"] == 0
+            else:
+                # 已知压缩长度时只喂本条目的字节；带数据描述符时靠 deflate 流自身的结束标记
+                n = len(buf) if e["descriptor"] else min(e["left"], len(buf))
+                chunk = bytes(buf[:n])
+                del buf[:n]
+                self._write(self._inflate.decompress(chunk))
+                if not e["descriptor"]:
+                    e["left"] -= n
+                if self._inflate.eof:
+                    rest = self._inflate.unused_data
+                    if rest:
+                        self._buf[:0] = rest
+                    finished = True
+                elif not e["descriptor"] and e["left"] == 0:
+                    raise ExtractError(f"压缩数据不完整：{e['name']}")
+                else:
+                    finished = False
+            if finished:
+                self._state = "descriptor" if e["descriptor"] else "verify"
+            return True
+        if self._state == "descriptor":
+            e = self._entry
+            size = 20 if e["zip64"] else 12
+            if len(buf) < 4:
+                return False
+            skip = 4 if struct.unpack_from("<I", buf)[0] == _DESCRIPTOR else 0
+            if len(buf) < skip + size:
+                return False
+            e["crc"] = struct.unpack_from("<I", buf, skip)[0]
+            del buf[:skip + size]
+            self._state = "verify"
+            return True
+        if self._state == "verify":
+            e = self._entry
+            self._close_out()
+            if not e["name"].endswith("/"):
+                if (e["crc_acc"] & 0xFFFFFFFF) != e["crc"]:
+                    raise ExtractError(f"CRC 校验失败：{e['name']}")
+                self.entries.append((e["name"], e["written"]))
+                if self.on_entry:
+                    self.on_entry(len(self.entries), e["name"])
+            self._entry = None
+            self._state = "header"
+            return True
+        return False
+
+    def _write(self, data: bytes):
+        if not data:
+            return
+        e = self._entry
+        e["crc_acc"] = zlib.crc32(data, e["crc_acc"])
+        e["written"] += len(data)
+        if self._out is not None:
+            self._out.write(data)
+
+def verify_against_central(zip_path: str, entries: List[Tuple[str, int]]):
+    # 整包到齐后用中央目录核对：条目数、文件名与解压后大小都必须一致
+    with zipfile.ZipFile(zip_path) as zf:
+        expect = {_safe_name(i.filename): i.file_size for i in zf.infolist() if not i.is_dir()}
+    got = dict(entries)
+    if got != expect:
+        missing = sorted(set(expect) - set(got))[:3]
+        raise ExtractError("解压结果与中央目录不一致" + (f"：缺少 {', '.join(missing)}" if missing else ""))
+
+def zip_root(zip_path: str) -> str:
+    with zipfile.ZipFile(zip_path) as zf:
+        names = zf.namelist()
+    return names[0].replace("\\", "/").split("/")[0] if names else ""
+
+def make_staging(models_dir: str, hint: str) -> str:
+    os.makedirs(models_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f".staging-{hint}-", dir=models_dir)
+
+def extract_zip(zip_path: str, staging_dir: str, on_entry: Optional[Callable[[int, int, str], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None):
+    # 非流式路径（本地导入、或流式解析不支持的包）：仍在调用线程里逐条目解压并汇报进度
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = zf.infolist()
+        for i, info in enumerate(infos, 1):
+            if cancelled and cancelled():
+                raise ExtractCancelled("已取消")
+            name = _safe_name(info.filename)
+            path = os.path.join(staging_dir, *name.rstrip("/").split("/"))
+            if info.is_dir():
+                os.makedirs(path, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with zf.open(info) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            if on_entry:
+                on_entry(i, len(infos), name)
+
+def install_staging(staging_dir: str, models_dir: str, folder: Optional[str] = None) -> str:
+    # 单一根目录的包直接把该目录改名进 models/；平铺的包以 folder 为目录名。
+    # 已有同名目录先挪到 .trash-*，新目录改名到位后再删除旧目录，过程中不会出现半个模型
+    top = [n for n in os.listdir(staging_dir)]
+    if len(top) == 1 and os.path.isdir(os.path.join(staging_dir, top[0])):
+        src, name = os.path.join(staging_dir, top[0]), top[0]
+    else:
+        if not folder:
+            raise ExtractError("压缩包没有根目录，无法确定模型目录名")
+        src, name = staging_dir, folder
+    target = os.path.join(models_dir, name)
+    trash = None
+    if os.path.exists(target):
+        trash = os.path.join(models_dir, f".trash-{name}-{int(time.time() * 1000)}")
+        os.replace(target, trash)
+    try:
+        os.replace(src, target)
+    except Exception:
+        if trash:
+            os.replace(trash, target)
+        raise
+    if trash:
+        shutil.rmtree(trash, ignore_errors=True)
+    if src != staging_dir:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return name
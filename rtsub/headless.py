@@ -0,0 +1,194 @@
+import os, sys, json, time, signal, argparse, threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .startup import PROFILE
+from .utils import argos_warm_up
+from .modelpool import MODEL_POOL, budget_mb_from_env
+from .cli import ROUTES, MODEL_HELP, log, select_model
+from .endpoint import LatencyBudgetPolicy
+from .engine import CaptureEngine, RecognitionEngine, list_input_devices, auto_pick_device, RENDER_DELAY
+from .metrics import METRICS, MetricsExporter, summary_fields
+
+# ----------------- 无界面模式：采集 → 识别 → 翻译，结果以 JSONL 输出 -----------------
+# 不导入 PySide6；用法：python main.py --headless --asr-lang en --tgt-lang zh [--model 目录] [--device 序号|名称] [-o out.jsonl]
+
+class JsonlWriter:
+    # 原文来自识别线程、译文来自翻译线程，逐行加锁写出并立即 flush，方便下游 tail -f
+    def __init__(self, path: str):
+        self._f = sys.stdout if path in ("", "-") else open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, rec: Dict):
+        now = time.time()
+        rec = {"ts": datetime.fromtimestamp(now, timezone.utc).isoformat(timespec="milliseconds"),
+               "wall": round(now, 3), **rec}
+        line = json.dumps(rec, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def close(self):
+        if self._f is not sys.stdout:
+            self._f.close()
+
+def _spec_line(rec: RecognitionEngine) -> str:
+    s = rec.spec_stats()
+    return (f"speculative: submitted {s['submitted']}, translated {s['translated']}, used {s['used']}, "
+            f"patched {s['patched']}, discarded {s['discarded']}, skipped {s['skipped']}")
+
+def _resolve_device(pa, spec: str) -> Optional[int]:
+    if spec in ("", "auto"):
+        return auto_pick_device(pa)
+    if spec == "default":
+        try:
+            return int(pa.get_default_input_device_info()["index"])
+        except Exception:
+            return None
+    if spec.isdigit():
+        return int(spec)
+    for i, name in list_input_devices(pa):
+        if spec.lower() in name.lower():
+            return i
+    return None
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="main.py --headless", description="Headless capture → ASR → translation, JSONL output")
+    ap.add_argument("--asr-lang", default="en", help="source language (ja / zh / en)")
+    ap.add_argument("--tgt-lang", default="zh", help="target language")
+    ap.add_argument("--model", default=None, help=MODEL_HELP)
+    ap.add_argument("--device", default="auto", help="input device index, name substring, 'default' or 'auto'")
+    ap.add_argument("--list-devices", action="store_true", help="list input devices and exit")
+    ap.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    ap.add_argument("--route", choices=sorted(ROUTES), default="auto")
+    ap.add_argument("--no-translate", action="store_true", help="emit source segments only")
+    ap.add_argument("--no-vad", action="store_true", help="feed silence to the recognizer too")
+    ap.add_argument("--budget", type=float, default=0.4, help="endpointing latency budget in seconds")
+    ap.add_argument("--model-pool-mb", type=float, default=budget_mb_from_env(),
+                    help="memory budget for warm Vosk models in MiB (default: $RTSUB_MODEL_POOL_MB or 3072)")
+    ap.add_argument("--speculative", action="store_true",
+                    help="translate stable partial-result prefixes early and reuse them for the final segment")
+    ap.add_argument("--trans-batch", type=int, default=8, help="max backlogged segments per translation call (1 = off)")
+    env_port = os.environ.get("RTSUB_METRICS_PORT", "").strip()
+    ap.add_argument("--metrics-port", type=int, default=int(env_port) if env_port.isdigit() else None,
+                    help="serve Prometheus metrics on 127.0.0.1:PORT/metrics (default: $RTSUB_METRICS_PORT)")
+    ap.add_argument("--metrics-file", default=os.environ.get("RTSUB_METRICS_FILE") or None,
+                    help="rewrite Prometheus metrics to this file every 5 s (default: $RTSUB_METRICS_FILE)")
+    ap.add_argument("--metrics-log", type=float, default=0.0, help="log a timing summary to stderr every N seconds")
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    import pyaudio
+
+    if args.list_devices:
+        pa = pyaudio.PyAudio()
+        try:
+            for i, name in list_input_devices(pa):
+                print(f"{i}\t{name}")
+        finally:
+            pa.terminate()
+        return 0
+
+    model = select_model(args.model, args.asr_lang)
+    if not model:
+        return 2
+    MODEL_POOL.set_budget(int(args.model_pool_mb * 1024 ** 2))
+    pa = pyaudio.PyAudio()
+    try:
+        device = _resolve_device(pa, args.device)
+    finally:
+        pa.terminate()
+    if device is None:
+        log(f"input device not found: {args.device} (see --list-devices)")
+        return 2
+
+    translate = not args.no_translate and args.tgt_lang != args.asr_lang
+    tgt = args.tgt_lang if translate else args.asr_lang
+    route = ROUTES[args.route]
+    out = JsonlWriter(args.output)
+    stop = threading.Event()
+    failed = []
+    audio_t: Dict[int, float] = {}
+
+    def on_source(seg_id: int, text: str):
+        audio_t[seg_id] = round(rec.audio_time, 3)
+        out.write({"type": "source", "seg": seg_id, "audio_t": audio_t[seg_id], "lang": args.asr_lang, "text": text})
+        METRICS.observe_since(RENDER_DELAY, ("source", seg_id))
+
+    def on_text(seg_id: int, src: str, trans: str):
+        if translate:
+            out.write({"type": "translation", "seg": seg_id, "audio_t": audio_t.pop(seg_id, None),
+                       "lang": tgt, "text": src, "translation": trans})
+            METRICS.observe_since(RENDER_DELAY, ("translation", seg_id))
+        else:
+            audio_t.pop(seg_id, None)
+
+    first_status = [True]
+    def on_status(msg: str):
+        if first_status[0]:
+            first_status[0] = False
+            PROFILE.mark("model ready")
+            PROFILE.finish()
+        log(msg)
+
+    def on_error(msg: str):
+        failed.append(msg)
+        log(f"error: {msg}")
+        stop.set()
+
+    rec = RecognitionEngine(args.asr_lang, tgt, route=route, model_folder=model, vad=not args.no_vad,
+                            trans_batch=args.trans_batch, speculative=args.speculative,
+                            endpoint=LatencyBudgetPolicy(budget=args.budget),
+                            on_source=on_source, on_text=on_text, on_status=on_status, on_error=on_error,
+                            should_stop=stop.is_set)
+    cap = CaptureEngine(device, rate=16000, chunk=1024, sink=rec.ring, callback_mode=True,
+                        on_error=on_error, should_stop=stop.is_set)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            signal.signal(sig, lambda *_: stop.set())
+        except (ValueError, OSError):
+            pass
+    if translate:
+        # 翻译模型在后台预热，不拖慢启动；首句到达时通常已就绪
+        threading.Thread(target=argos_warm_up, args=(args.asr_lang, tgt, route), name="argos-warmup", daemon=True).start()
+    threads = [threading.Thread(target=rec.run, name="asr", daemon=True),
+               threading.Thread(target=cap.run, name="capture", daemon=True)]
+    for th in threads:
+        th.start()
+    exporter = None
+    if args.metrics_port is not None or args.metrics_file:
+        exporter = MetricsExporter(port=args.metrics_port, path=args.metrics_file)
+        try:
+            log(f"metrics: {exporter.start().describe()}")
+        except OSError as e:
+            log(f"metrics export disabled: {e}")
+            exporter = None
+    log(f"listening: device #{device}, model {model}, {args.asr_lang}->{tgt}")
+    next_log = time.monotonic() + args.metrics_log
+    try:
+        while not stop.wait(0.5):
+            if not all(th.is_alive() for th in threads):
+                break
+            if args.metrics_log > 0 and time.monotonic() >= next_log:
+                next_log += args.metrics_log
+                f = summary_fields()
+                log(f"timing p50/p95: queue {f['queue']}, decode {f['decode']}, translate {f['trans']}, "
+                     f"output {f['render']}, buffer {f['depth']} s, RTF {f['rtf']}, dropped {f['dropped']} s")
+                if args.speculative:
+                    log(_spec_line(rec))
+    finally:
+        stop.set()
+        cap.stop()
+        rec.stop()
+        for th in threads:
+            th.join(3.0)
+        out.close()
+        if exporter is not None:
+            exporter.stop()
+        if args.speculative:
+            log(_spec_line(rec))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
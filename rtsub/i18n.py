@@ -28,6 +28,18 @@ T: Dict[str, Dict[str, str]] = {
         "label.status": "状态：",
         "label.engine": "翻译引擎：",
         "label.level": "音频电平：",
+        "label.capture": "采集：",
+        "capture.native": "{rate} Hz 原生采集，无需重采样",
+        "capture.decimate": "{rate} Hz → 16 kHz（整数倍降采样 ÷{down}）",
+        "capture.polyphase": "{rate} Hz → 16 kHz（多相重采样 {up}/{down}）",
+        "capture.latency": "输入延迟 {ms} ms",
+        "capture.overflows": "输入溢出 {n} 次",
+        "label.metrics": "计时 p50/p95：",
+        "metrics.summary": "排队 {queue} · 解码 {decode} · 翻译 {trans} · 上屏 {render} · 缓冲 {depth} s · RTF {rtf} · 丢弃 {dropped} s",
+        "metrics.exporting": "指标导出：{where}",
+        "metrics.spec": " · 推测 采用 {used} / 补尾 {patched} / 作废 {discarded}",
+        "chk.speculative": "推测翻译",
+        "tip.speculative": "识别结果的前缀稳定后提前送去翻译，整句结束时复用，缩短译文上屏延迟",
 
         "group.ui_lang": "语言",
         "label.ui_lang": "语言",
@@ -52,6 +64,8 @@ T: Dict[str, Dict[str, str]] = {
         "engine.no_argos": "未安装 argostranslate（仍可只显示原文）",
         "engine.pairs_installed": "已装",
         "engine.pairs_missing": "缺少该方向词典",
+        "engine.warming": "{pair} 预热中 …",
+        "engine.warm_ready": "{pair} 已就绪（预热 {sec} s）",
 
         "msg.no_input_device": "未找到可用的输入设备。\n请启用立体声混音/Loopback，或手动选择麦克风/回环设备。",
         "msg.select_model_first": "请先选择或安装识别模型。",
@@ -76,6 +90,7 @@ T: Dict[str, Dict[str, str]] = {
         "dlg.not_installed": "当前选择的模型未安装或无目录。",
         "dlg.unzip_ok": "已导入并解压到 ./models/",
         "dlg.unzip_fail": "解压错误：{err}",
+        "dlg.extracting": "正在解压：已完成 {n} 个文件",
         "dlg.download.connecting": "连接中…",
         "dlg.download_cancelled": "已取消",
         "dlg.download_failed": "下载失败",
@@ -95,6 +110,7 @@ T: Dict[str, Dict[str, str]] = {
         "combo.argos_missing": "（未安装 argostranslate 库）",
         "combo.installed": "[已装] ",
         "combo.not_installed": "[未装] ",
+        "combo.checking": "[检查中] ",
         "combo.recommended": "★ ",
 
         "toast.listening_en": "Listening...",
@@ -120,6 +136,18 @@ T: Dict[str, Dict[str, str]] = {
         "label.status": "Status: ",
         "label.engine": "Translator: ",
         "label.level": "Level: ",
+        "label.capture": "Capture: ",
+        "capture.native": "{rate} Hz native, no resampling",
+        "capture.decimate": "{rate} Hz → 16 kHz (integer decimation ÷{down})",
+        "capture.polyphase": "{rate} Hz → 16 kHz (polyphase {up}/{down})",
+        "capture.latency": "input latency {ms} ms",
+        "capture.overflows": "{n} input overflows",
+        "label.metrics": "Timing p50/p95: ",
+        "metrics.summary": "queue {queue} · decode {decode} · translate {trans} · render {render} · buffer {depth} s · RTF {rtf} · dropped {dropped} s",
+        "metrics.exporting": "Metrics export: {where}",
+        "metrics.spec": " · speculative used {used} / patched {patched} / discarded {discarded}",
+        "chk.speculative": "Speculative translation",
+        "tip.speculative": "Translate stable partial-result prefixes early and reuse them when the sentence ends, to show translations sooner",
 
         "group.subtitle": "Subtitles",
         "label.font_style": "Style",
@@ -144,6 +172,8 @@ T: Dict[str, Dict[str, str]] = {
         "engine.no_argos": "Argos not installed (will show source only)",
         "engine.pairs_installed": "Installed",
         "engine.pairs_missing": "Pair missing",
+        "engine.warming": "warming up {pair} …",
+        "engine.warm_ready": "{pair} ready (warm-up {sec} s)",
 
         "msg.no_input_device": "No input device found.\nEnable Stereo Mix/Loopback, or select a mic/monitor device.",
         "msg.select_model_first": "Please select or install an ASR model first.",
@@ -168,6 +198,7 @@ T: Dict[str, Dict[str, str]] = {
         "dlg.not_installed": "The selected model is not installed or has no directory.",
         "dlg.unzip_ok": "Imported and extracted to ./models/",
         "dlg.unzip_fail": "Unzip error: {err}",
+        "dlg.extracting": "Extracting: {n} files done",
         "dlg.download.connecting": "Connecting…",
         "dlg.download_cancelled": "Cancelled",
         "dlg.download_failed": "Download failed",
@@ -187,6 +218,7 @@ T: Dict[str, Dict[str, str]] = {
         "combo.argos_missing": "(argostranslate not installed)",
         "combo.installed": "[Installed] ",
         "combo.not_installed": "[Not Installed] ",
+        "combo.checking": "[Checking…] ",
         "combo.recommended": "★ ",
 
         "toast.listening_en": "Listening...",
@@ -0,0 +1,156 @@
+import os, json, time, hashlib, threading
+from typing import Callable, Dict, List, Optional
+
+# ----------------- 本地模型清单（持久化 + 增量更新） -----------------
+# 每个模型目录记录：语言、大小、文件数、内容指纹、完整性与最后校验时间。
+# sync() 只 listdir 一次 models/ 并 stat 各模型目录，目录未变化的条目直接复用，
+# 所以 models/ 在慢速网络盘上也很便宜；目录变化由 UI 层的 QFileSystemWatcher 触发 refresh(folder)。
+
+# 缺少这些文件（或文件为空）的模型视为解压不完整；graph 既可以是 HCLG 也可以是 HCLr+Gr（lookahead）
+_REQUIRED = ("am/final.mdl", "conf/mfcc.conf")
+_GRAPHS = (("graph/HCLG.fst",), ("graph/HCLr.fst", "graph/Gr.fst"))
+_BINARY = (".mdl", ".fst", ".mat", ".dubm", ".ie", ".carpa")
+_FP_HEAD = 64 * 1024
+
+def _dir_mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+class ModelManifest:
+    def __init__(self, models_dir: str, path: Optional[str] = None, lang_of: Optional[Callable[[str], str]] = None):
+        self.models_dir = models_dir
+        self.path = path
+        self.lang_of = lang_of or (lambda name: "")
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._loaded = False
+        self.scans = 0
+
+    # ---- 持久化 ----
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("models_dir") == os.path.abspath(self.models_dir):
+                self._entries = {e["folder"]: e for e in data.get("models", []) if e.get("folder")}
+        except Exception:
+            self._entries = {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"models_dir": os.path.abspath(self.models_dir),
+                           "models": sorted(self._entries.values(), key=lambda e: e["folder"])},
+                          f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    # ---- 扫描单个模型目录 ----
+    def _scan(self, folder: str) -> Dict:
+        self.scans += 1
+        root = os.path.join(self.models_dir, folder)
+        files = []
+        for d, _dirs, names in os.walk(root):
+            for n in names:
+                full = os.path.join(d, n)
+                try:
+                    size = os.path.getsize(full)
+                except OSError:
+                    continue
+                files.append((os.path.relpath(full, root).replace(os.sep, "/"), size))
+        files.sort()
+        sizes = dict(files)
+        problem = None
+        if not (os.path.exists(os.path.join(root, "model.conf")) or os.path.isdir(os.path.join(root, "am"))):
+            problem = "模型结构异常"
+        else:
+            missing = [r for r in _REQUIRED if not sizes.get(r)]
+            if not any(all(sizes.get(g) for g in graph) for graph in _GRAPHS):
+                missing.append("graph/HCLG.fst")
+            empty = [r for r, s in files if s == 0 and r.endswith(_BINARY)]
+            if missing:
+                problem = "缺少文件：" + ", ".join(missing)
+            elif empty:
+                problem = "文件为空：" + ", ".join(empty[:3])
+        # 指纹：文件列表与大小 + 关键文件头部内容；解压截断、换了版本都会改变指纹
+        h = hashlib.sha256()
+        for rel, size in files:
+            h.update(f"{rel}\0{size}\n".encode("utf-8"))
+        for rel in _REQUIRED:
+            try:
+                with open(os.path.join(root, rel), "rb") as f:
+                    h.update(f.read(_FP_HEAD))
+            except OSError:
+                pass
+        return {"folder": folder, "lang": self.lang_of(folder), "bytes": sum(sizes.values()),
+                "files": len(files), "fingerprint": h.hexdigest()[:16], "complete": problem is None,
+                "problem": problem, "mtime": _dir_mtime(root), "verified_at": time.time()}
+
+    # ---- 对外接口 ----
+    def refresh(self, folder: str, save: bool = True) -> Optional[Dict]:
+        with self._lock:
+            self._load()
+            root = os.path.join(self.models_dir, folder)
+            if not os.path.isdir(root):
+                gone = self._entries.pop(folder, None)
+                if gone is not None and save:
+                    self._save()
+                return None
+            e = self._entries[folder] = self._scan(folder)
+            if save:
+                self._save()
+            return e
+
+    def sync(self) -> List[str]:
+        # 增量同步：新增/删除/目录 mtime 变化的模型才重新扫描，返回发生变化的目录名
+        with self._lock:
+            self._load()
+            try:
+                # 以 . / _ 开头的是临时目录（下载中的 zip、解压暂存区），不计入清单
+                names = {n for n in os.listdir(self.models_dir)
+                         if n[:1] not in "._" and os.path.isdir(os.path.join(self.models_dir, n))}
+            except OSError:
+                names = set()
+            changed = [f for f in self._entries if f not in names]
+            for f in changed:
+                del self._entries[f]
+            for name in sorted(names):
+                e = self._entries.get(name)
+                if e is None or e.get("mtime") != _dir_mtime(os.path.join(self.models_dir, name)):
+                    self._entries[name] = self._scan(name)
+                    changed.append(name)
+            if changed:
+                self._save()
+            return changed
+
+    def get(self, folder: str) -> Optional[Dict]:
+        with self._lock:
+            self._load()
+            e = self._entries.get(folder)
+            if e is None or e.get("mtime") != _dir_mtime(os.path.join(self.models_dir, folder)):
+                e = self.refresh(folder)
+            return dict(e) if e else None
+
+    def entries(self, lang: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            self._load()
+            return [dict(e) for e in sorted(self._entries.values(), key=lambda e: e["folder"])
+                    if lang is None or e.get("lang") == lang]
+
+    def forget(self, folder: str):
+        with self._lock:
+            self._load()
+            if self._entries.pop(folder, None) is not None:
+                self._save()
@@ -0,0 +1,254 @@
+import os, time, bisect, threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from .endpoint import percentile
+
+# ----------------- 各阶段计时：直方图 / 计量 / 计数，Prometheus 文本格式导出 -----------------
+# 各模块在导入时向 METRICS 注册自己的指标，热路径上只做一次加锁累加。
+# 导出：本地 HTTP（GET /metrics）或定期原子写文件（可配合 node_exporter 的 textfile collector）。
+# GUI 通过环境变量 RTSUB_METRICS_PORT / RTSUB_METRICS_FILE 开启，无界面模式另有同名命令行参数。
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    v = float(v)
+    return str(int(v)) if v.is_integer() and abs(v) < 1e15 else repr(v)
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 1024):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        # 最近 window 个样本，界面摘要按它算分位数（桶边界太粗，不适合直接显示）
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, v: float):
+        v = max(0.0, float(v))
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, v)] += 1
+            self._sum += v
+            self._count += 1
+            self._recent.append(v)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            recent = list(self._recent)
+        return percentile(recent, q)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total, n = list(self._counts), self._sum, self._count
+        lines, acc = [], 0
+        for le, c in zip(self.buckets + (float("inf"),), counts):
+            acc += c
+            lines.append(f'{self.name}_bucket{{le="{_fmt(le)}"}} {acc}')
+        lines.append(f"{self.name}_sum {_fmt(total)}")
+        lines.append(f"{self.name}_count {n}")
+        return lines
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, v: float):
+        self.value = float(v)
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {_fmt(self.value)}"]
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, v: float = 1.0):
+        if v > 0:
+            with self._lock:
+                self.value += v
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {_fmt(self.value)}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 跨线程的起止打点：识别线程发出一段文字时 stamp，界面线程上屏时 observe_since
+        self._stamps: "OrderedDict[Tuple, float]" = OrderedDict()
+
+    def _get(self, cls, name: str, help: str, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, **kw)
+            return m
+
+    def histogram(self, name: str, help: str, **kw) -> Histogram:
+        return self._get(Histogram, name, help, **kw)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def stamp(self, key: Tuple, ts: Optional[float] = None):
+        with self._lock:
+            self._stamps[key] = time.monotonic() if ts is None else ts
+            while len(self._stamps) > 256:
+                self._stamps.popitem(last=False)
+
+    def observe_since(self, hist: Histogram, key: Tuple):
+        with self._lock:
+            ts = self._stamps.pop(key, None)
+        if ts is not None:
+            hist.observe(time.monotonic() - ts)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        out = []
+        for m in metrics:
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+    def summary(self) -> Dict[str, float]:
+        # 界面用的扁平摘要：直方图给 p50/p95（最近样本），计量与计数给当前值
+        with self._lock:
+            metrics = list(self._metrics.values())
+        s = {}
+        for m in metrics:
+            if isinstance(m, Histogram):
+                s[f"{m.name}:p50"] = m.quantile(50)
+                s[f"{m.name}:p95"] = m.quantile(95)
+                s[f"{m.name}:count"] = m.count
+            else:
+                s[m.name] = m.value
+        return s
+
+    def write_file(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+METRICS = MetricsRegistry()
+
+def summary_fields(registry: MetricsRegistry = METRICS) -> Dict[str, str]:
+    # 状态面板 / 无界面日志共用的紧凑摘要（已格式化，配合 i18n 的 metrics.summary）
+    s = registry.summary()
+    def ms(name: str) -> str:
+        return f"{s.get(name + ':p50', 0.0) * 1000:.0f}/{s.get(name + ':p95', 0.0) * 1000:.0f} ms"
+    return {"queue": ms("rtsub_audio_queue_wait_seconds"), "decode": ms("rtsub_decode_seconds"),
+            "trans": ms("rtsub_translate_seconds"), "render": ms("rtsub_render_delay_seconds"),
+            "depth": f"{s.get('rtsub_audio_queue_seconds', 0.0):.1f}",
+            "rtf": f"{s.get('rtsub_realtime_factor', 0.0):.2f}",
+            "dropped": f"{s.get('rtsub_audio_dropped_seconds_total', 0.0):.1f}"}
+
+# ----------------- 导出 -----------------
+class MetricsExporter:
+    def __init__(self, registry: MetricsRegistry = METRICS, port: Optional[int] = None, host: str = "127.0.0.1",
+                 path: Optional[str] = None, interval: float = 5.0):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = float(interval)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, registry: MetricsRegistry = METRICS) -> Optional["MetricsExporter"]:
+        port = os.environ.get("RTSUB_METRICS_PORT", "").strip()
+        path = os.environ.get("RTSUB_METRICS_FILE", "").strip()
+        if not port and not path:
+            return None
+        return cls(registry, port=int(port) if port.isdigit() else None,
+                   host=os.environ.get("RTSUB_METRICS_HOST", "127.0.0.1"), path=path or None)
+
+    def start(self) -> "MetricsExporter":
+        if self.port is not None:
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *_args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, int(self.port)), Handler)
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="rtsub-metrics-http", daemon=True).start()
+        if self.path:
+            self._writer = threading.Thread(target=self._write_loop, name="rtsub-metrics-file", daemon=True)
+            self._writer.start()
+        return self
+
+    def describe(self) -> str:
+        where = []
+        if self._server is not None:
+            where.append(f"http://{self.host}:{self.port}/metrics")
+        if self.path:
+            where.append(self.path)
+        return ", ".join(where)
+
+    def _write_loop(self):
+        while True:
+            try:
+                self.registry.write_file(self.path)
+            except OSError:
+                pass
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer is not None:
+            self._writer.join(2.0)
+            self._writer = None
+            try:
+                self.registry.write_file(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,162 @@
+import os, time, threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .utils import MODELS_DIR, ensure_vosk_model_ready
+
+# ----------------- 常驻 vosk.Model 池（跨 Start/Stop 复用，按内存预算 LRU 淘汰） -----------------
+def _rss_bytes() -> int:
+    try:
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class _Entry:
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.model = None
+        self.error: Optional[str] = None
+        self.ready = threading.Event()
+        self.load_s = 0.0
+        self.bytes = 0
+        self.refs = 0
+        self.hits = 0
+        self.last_used = 0.0
+
+class VoskModelPool:
+    def __init__(self, budget_bytes: int = 3 * 1024 ** 3):
+        self.budget_bytes = int(budget_bytes)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # 串行加载，RSS 差值才能归到单个模型上
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _entry(self, folder: str, ref: bool = False):
+        with self._lock:
+            e = self._entries.get(folder)
+            created = e is None
+            if created:
+                e = self._entries[folder] = _Entry(folder)
+            self._entries.move_to_end(folder)
+            if ref:
+                e.refs += 1
+            return e, created
+
+    def _load(self, e: _Entry):
+        try:
+            ok, msg = ensure_vosk_model_ready(e.folder)
+            if not ok:
+                raise RuntimeError(msg)
+            import vosk
+            with self._load_lock:
+                rss0 = _rss_bytes(); t0 = time.perf_counter()
+                e.model = vosk.Model(os.path.join(MODELS_DIR, e.folder))
+                e.load_s = time.perf_counter() - t0
+                delta = _rss_bytes() - rss0
+            e.bytes = delta if delta > 0 else _dir_bytes(os.path.join(MODELS_DIR, e.folder))
+        except Exception as ex:
+            e.error = str(ex)
+            with self._lock:
+                if self._entries.get(e.folder) is e:
+                    del self._entries[e.folder]
+        finally:
+            e.last_used = time.time()
+            e.ready.set()
+        self._evict(keep=e)
+
+    def preload(self, folder: str):
+        if not folder:
+            return
+        e, created = self._entry(folder)
+        if created:
+            threading.Thread(target=self._load, args=(e,), name=f"vosk-preload-{folder}", daemon=True).start()
+
+    def acquire(self, folder: str, timeout: Optional[float] = None):
+        # 命中则立即返回；正在后台预加载则等待；否则在调用线程里加载。
+        # 引用在加载 / 等待之前就记上，加载完的淘汰不会把调用方正要用的模型踢掉
+        e, created = self._entry(folder, ref=True)
+        try:
+            if created:
+                self._load(e)
+            else:
+                e.hits += 1
+            if not e.ready.wait(timeout):
+                raise TimeoutError(f"模型加载超时：{folder}")
+            if e.error:
+                raise RuntimeError(e.error)
+        except BaseException:
+            with self._lock:
+                e.refs -= 1
+            raise
+        with self._lock:
+            e.last_used = time.time()
+        return e.model
+
+    def release(self, folder: str):
+        with self._lock:
+            e = self._entries.get(folder)
+            if e and e.refs > 0:
+                e.refs -= 1
+                e.last_used = time.time()
+        self._evict()
+
+    def info(self, folder: str) -> Dict:
+        with self._lock:
+            e = self._entries.get(folder)
+            if not e:
+                return {}
+            return {"folder": e.folder, "ready": e.ready.is_set(), "load_s": e.load_s, "bytes": e.bytes,
+                    "refs": e.refs, "hits": e.hits, "last_used": e.last_used, "error": e.error}
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            folders = list(self._entries)
+        return [self.info(f) for f in folders]
+
+    def _evict(self, keep: Optional[_Entry] = None):
+        with self._lock:
+            total = sum(e.bytes for e in self._entries.values() if e.ready.is_set())
+            for folder in list(self._entries):
+                if total <= self.budget_bytes:
+                    break
+                e = self._entries[folder]
+                if e is keep or e.refs > 0 or not e.ready.is_set() or len(self._entries) <= 1:
+                    continue
+                total -= e.bytes
+                del self._entries[folder]
+
+    def set_budget(self, budget_bytes: int):
+        self.budget_bytes = max(0, int(budget_bytes))
+        self._evict()
+
+    def drop(self, folder: str):
+        with self._lock:
+            e = self._entries.get(folder)
+            if e and e.refs == 0:
+                del self._entries[folder]
+
+# 内存预算默认 3 GiB，可用环境变量 RTSUB_MODEL_POOL_MB 调整（无界面模式另有 --model-pool-mb）
+DEFAULT_BUDGET_MB = 3072
+
+def budget_mb_from_env(default: float = DEFAULT_BUDGET_MB) -> float:
+    try:
+        return max(0.0, float(os.environ.get("RTSUB_MODEL_POOL_MB", "").strip() or default))
+    except ValueError:
+        return float(default)
+
+MODEL_POOL = VoskModelPool(int(budget_mb_from_env() * 1024 ** 2))
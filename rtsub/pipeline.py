@@ -0,0 +1,285 @@
+import threading, time
+from collections import deque
+from typing import Callable, Optional, Dict, List
+
+from .metrics import METRICS
+
+_M_TRANSLATE = METRICS.histogram("rtsub_translate_seconds", "Translation time per final segment")
+_M_WAIT = METRICS.histogram("rtsub_translate_queue_wait_seconds", "Time a segment waits for the translation thread")
+_M_DEPTH = METRICS.gauge("rtsub_translate_queue_depth", "Segments waiting for translation")
+_M_DROPPED = METRICS.counter("rtsub_translations_dropped_total", "Stale segments dropped without translation")
+_M_BATCH = METRICS.histogram("rtsub_translate_batch_size", "Segments per translation call",
+                             buckets=(1, 2, 3, 4, 6, 8, 12, 16))
+# 推测翻译：提交 / 实际翻译 / 被新任务顶掉 / 整句复用 / 前缀复用后补尾 / 作废
+_M_SPEC = {k: METRICS.counter(f"rtsub_speculative_{k}_total", h) for k, h in (
+    ("submitted", "Speculative prefix translations requested"),
+    ("translated", "Speculative prefix translations actually run"),
+    ("skipped", "Speculative jobs superseded before they ran"),
+    ("used", "Final segments served entirely from a speculative translation"),
+    ("patched", "Final segments built from a speculative prefix plus a translated tail"),
+    ("discarded", "Speculative translations thrown away"))}
+
+# ----------------- 翻译阶段（独立线程 + 有界队列） -----------------
+class StalePolicy:
+    KEEP = "keep"            # 队列满时丢最旧的，其余全部翻译
+    LATEST = "latest_wins"   # 只翻译最新的一条，积压的直接丢弃
+    MAX_AGE = "max_age"      # 丢弃排队超过 max_age 秒的段落
+
+class TranslationStage:
+    def __init__(self, translate_fn: Callable[[str], str],
+                 on_result: Callable[[int, str, str], None],
+                 maxsize: int = 8, policy: str = StalePolicy.MAX_AGE, max_age: float = 3.0,
+                 on_drop: Optional[Callable[[int, str], None]] = None, name: str = "rtsub-translate",
+                 spec_joiner: Optional[str] = None,
+                 batch_fn: Optional[Callable[[List[str]], List[str]]] = None, batch_max: int = 8,
+                 batch_window: float = 0.0):
+        self.translate_fn = translate_fn
+        self.on_result = on_result
+        self.on_drop = on_drop
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.max_age = float(max_age)
+        self.name = name
+        # None 表示只在最终文本与推测前缀完全一致时复用；否则按词边界拼接“前缀译文 + 尾部译文”
+        self.spec_joiner = spec_joiner
+        # 批量模式：翻译线程忙时排起来的段落（至多 batch_max 条）合成一次 batch_fn 调用；
+        # batch_window > 0 时单条段落也再等这么久凑批，默认 0，孤立的段落与逐条翻译一样快
+        self.batch_fn = batch_fn
+        self.batch_max = max(1, int(batch_max))
+        self.batch_window = float(batch_window)
+        self._q = deque()
+        self._cv = threading.Condition()
+        self._stop = False
+        self._th: Optional[threading.Thread] = None
+        self._spec_job = None
+        self._spec_results: Dict[int, Dict[str, str]] = {}
+        self._last_final = 0
+        self.submitted = 0
+        self.translated = 0
+        self.dropped = 0
+        self.spec_submitted = 0
+        self.spec_translated = 0
+        self.spec_skipped = 0
+        self.spec_used = 0
+        self.spec_patched = 0
+        self.spec_discarded = 0
+        self.batches = 0
+        self.batched = 0
+
+    def start(self):
+        if self._th and self._th.is_alive():
+            return
+        self._stop = False
+        self._th = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._th.start()
+
+    def stop(self, timeout: float = 2.0):
+        with self._cv:
+            self._stop = True
+            self._q.clear()
+            self._spec_job = None
+            self._cv.notify_all()
+        if self._th:
+            self._th.join(timeout)
+            self._th = None
+
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._q)
+
+    def submit(self, seg_id: int, text: str) -> bool:
+        dropped = []
+        with self._cv:
+            if self._stop:
+                return False
+            if self.policy == StalePolicy.LATEST:
+                dropped.extend(self._q); self._q.clear()
+            while len(self._q) >= self.maxsize:
+                dropped.append(self._q.popleft())
+            self.dropped += len(dropped)
+            if self._spec_job and self._spec_job[0] <= seg_id:
+                self._spec_job = None; self._spec_count("skipped")
+            self._q.append((seg_id, text, time.monotonic()))
+            self.submitted += 1
+            _M_DEPTH.set(len(self._q))
+            self._cv.notify()
+        self._report_drops(dropped)
+        return True
+
+    def speculate(self, seg_id: int, prefix: str) -> bool:
+        # 推测任务优先级最低：只保留最新一条，且只在没有正式段落排队时执行
+        with self._cv:
+            if self._stop or not prefix:
+                return False
+            if prefix in self._spec_results.get(seg_id, {}):
+                return False
+            if self._spec_job:
+                self._spec_count("skipped")
+            self._spec_job = (seg_id, prefix)
+            self._spec_count("submitted")
+            self._cv.notify()
+        return True
+
+    def _spec_count(self, key: str, n: int = 1):
+        setattr(self, "spec_" + key, getattr(self, "spec_" + key) + n)
+        _M_SPEC[key].inc(n)
+
+    def spec_stats(self) -> Dict[str, int]:
+        return {"submitted": self.spec_submitted, "translated": self.spec_translated,
+                "skipped": self.spec_skipped, "used": self.spec_used,
+                "patched": self.spec_patched, "discarded": self.spec_discarded}
+
+    def _report_drops(self, items):
+        # self.dropped 已在收集被丢段落的加锁区内累加，这里只做指标与回调
+        _M_DROPPED.inc(len(items))
+        if self.on_drop:
+            for seg_id, text, _ts in items:
+                try:
+                    self.on_drop(seg_id, text)
+                except Exception:
+                    pass
+
+    def _take(self):
+        dropped = []
+        with self._cv:
+            while not self._stop and not self._q and not self._spec_job:
+                self._cv.wait(0.5)
+            if self._stop:
+                return None, None, dropped
+            if not self._q:
+                job, self._spec_job = self._spec_job, None
+                return None, job, dropped
+            if self.policy == StalePolicy.MAX_AGE and self.max_age > 0:
+                now = time.monotonic()
+                # 最新的一条总会保留，保证屏幕上最终能看到译文
+                while len(self._q) > 1 and now - self._q[0][2] > self.max_age:
+                    dropped.append(self._q.popleft())
+                self.dropped += len(dropped)
+            item = self._q.popleft()
+            _M_DEPTH.set(len(self._q))
+            return item, None, dropped
+
+    def _translate(self, text: str) -> str:
+        try:
+            return self.translate_fn(text) or text
+        except Exception:
+            return text
+
+    def _take_more(self) -> List:
+        with self._cv:
+            if self.batch_window > 0 and not self._q and not self._stop:
+                self._cv.wait(self.batch_window)
+            items = [self._q.popleft() for _ in range(min(len(self._q), self.batch_max - 1))]
+            _M_DEPTH.set(len(self._q))
+            return items
+
+    def _translate_many(self, texts: List[str]) -> List[str]:
+        try:
+            out = self.batch_fn(texts)
+            if len(out) != len(texts):
+                raise ValueError("batch size mismatch")
+            return [o or t for o, t in zip(out, texts)]
+        except Exception:
+            return [self._translate(t) for t in texts]
+
+    def _run_batch(self, items: List):
+        t0 = time.monotonic()
+        for _seg, _text, queued in items:
+            _M_WAIT.observe(t0 - queued)
+        # 已有推测译文的段落按原逻辑复用 / 补尾，其余合成一批
+        # rtsub_translate_seconds 按段计：复用推测的段落各记各的耗时，合批的段落平摊这次调用的耗时
+        results: Dict[int, str] = {}
+        plain = []
+        for seg_id, text, _q in items:
+            done = self._take_spec(seg_id)
+            if done:
+                t1 = time.monotonic()
+                results[seg_id] = self._translate_final(seg_id, text, done)
+                _M_TRANSLATE.observe(time.monotonic() - t1)
+            else:
+                plain.append((seg_id, text))
+        if plain:
+            _M_BATCH.observe(len(plain))
+            self.batches += 1
+            self.batched += len(plain)
+            t1 = time.monotonic()
+            for (seg_id, _t), trans in zip(plain, self._translate_many([t for _s, t in plain])):
+                results[seg_id] = trans
+            per_seg = (time.monotonic() - t1) / len(plain)
+            for _ in plain:
+                _M_TRANSLATE.observe(per_seg)
+        for seg_id, text, _q in items:
+            if self._stop:
+                return
+            self.translated += 1
+            try:
+                self.on_result(seg_id, text, results[seg_id])
+            except Exception:
+                pass
+
+    def _run_spec(self, seg_id: int, prefix: str):
+        trans = self._translate(prefix)
+        with self._cv:
+            self._spec_count("translated")
+            # 该段落的正式文本已经翻译过，推测结果作废
+            if seg_id <= self._last_final:
+                self._spec_count("discarded")
+                return
+            self._spec_results.setdefault(seg_id, {})[prefix] = trans
+
+    def _take_spec(self, seg_id: int) -> Dict[str, str]:
+        with self._cv:
+            self._last_final = max(self._last_final, seg_id)
+            done = self._spec_results.pop(seg_id, {})
+            for old in [i for i in self._spec_results if i < seg_id]:
+                self._spec_count("discarded", len(self._spec_results.pop(old)))
+            return done
+
+    def _translate_final(self, seg_id: int, text: str, done: Optional[Dict[str, str]] = None) -> str:
+        done = self._take_spec(seg_id) if done is None else done
+        if not done:
+            return self._translate(text)
+        if text in done:
+            self._spec_count("used")
+            self._spec_count("discarded", len(done) - 1)
+            return done[text]
+        if self.spec_joiner is not None:
+            best = ""
+            for p in done:
+                if len(p) > len(best) and text.startswith(p) and text[len(p):len(p) + 1].isspace():
+                    best = p
+            if best:
+                self._spec_count("patched")
+                self._spec_count("discarded", len(done) - 1)
+                tail = self._translate(text[len(best):].strip())
+                return done[best].rstrip() + self.spec_joiner + tail.lstrip()
+        self._spec_count("discarded", len(done))
+        return self._translate(text)
+
+    def _run(self):
+        while True:
+            item, spec, dropped = self._take()
+            self._report_drops(dropped)
+            if item is None and spec is None:
+                return
+            if spec is not None:
+                self._run_spec(*spec)
+                continue
+            if self.batch_fn is not None and self.batch_max > 1:
+                more = self._take_more()
+                if more:
+                    self._run_batch([item] + more)
+                    continue
+            seg_id, text, queued = item
+            t0 = time.monotonic()
+            _M_WAIT.observe(t0 - queued)
+            _M_BATCH.observe(1)
+            trans = self._translate_final(seg_id, text)
+            _M_TRANSLATE.observe(time.monotonic() - t0)
+            if self._stop:
+                return
+            self.translated += 1
+            try:
+                self.on_result(seg_id, text, trans)
+            except Exception:
+                pass
@@ -0,0 +1,119 @@
+import os, json, time, threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ----------------- Argos 包索引缓存（磁盘 JSON + TTL，按语言对字典查找） -----------------
+def _version(meta: Dict) -> Tuple[int, ...]:
+    parts = []
+    for p in str(meta.get("package_version", "")).split("."):
+        try:
+            parts.append(int(p))
+        except ValueError:
+            parts.append(0)
+    return tuple(parts)
+
+# 查询只读内存/磁盘，从不联网；刷新由调用方放到后台线程执行，失败时保留上一份索引，离线可用
+class PackageIndex:
+    def __init__(self, path: Optional[str], fetch: Callable[[], List[Dict]], ttl: float = 24 * 3600,
+                 retry_after: float = 600):
+        self.path = path
+        self.ttl = float(ttl)
+        self.retry_after = float(retry_after)
+        self._attempted_at = 0.0
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._by_pair: Dict[Tuple[str, str], Dict] = {}
+        self.fetched_at = 0.0
+        self.last_error: Optional[str] = None
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.path:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._set(data.get("packages") or [], float(data.get("fetched_at", 0.0)))
+            except Exception:
+                pass
+
+    def _set(self, packages: List[Dict], fetched_at: float):
+        by_pair = {}
+        for meta in packages:
+            key = (str(meta.get("from_code", "")), str(meta.get("to_code", "")))
+            old = by_pair.get(key)
+            # 同一语言对出现多个版本时保留版本号最大的
+            if old is None or _version(meta) > _version(old):
+                by_pair[key] = meta
+        self._by_pair = by_pair
+        self.fetched_at = fetched_at
+
+    def lookup(self, src: str, tgt: str) -> Optional[Dict]:
+        self._ensure_loaded()
+        return self._by_pair.get((src, tgt))
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        self._ensure_loaded()
+        return sorted(self._by_pair)
+
+    def age(self) -> float:
+        self._ensure_loaded()
+        return time.time() - self.fetched_at if self.fetched_at else float("inf")
+
+    def is_stale(self) -> bool:
+        return self.age() > self.ttl
+
+    def refresh_due(self) -> bool:
+        # 过期且距上次尝试已超过 retry_after：离线时不会每次切换语言都去联网
+        return self.is_stale() and time.time() - self._attempted_at > self.retry_after
+
+    def refresh(self, force: bool = False) -> bool:
+        # 阻塞调用：联网拉取索引并原子写盘；并发调用只会有一个真正联网
+        if not self._refresh_lock.acquire(blocking=False):
+            with self._refresh_lock:
+                return not self.is_stale()
+        try:
+            if not force and not self.is_stale():
+                return True
+            self._attempted_at = time.time()
+            try:
+                packages = [dict(p) for p in self._fetch()]
+            except Exception as e:
+                self.last_error = str(e)
+                return False
+            if not packages:
+                self.last_error = "empty package index"
+                return False
+            now = time.time()
+            with self._lock:
+                self._set(packages, now)
+                self._loaded = True
+            self.last_error = None
+            self._save(packages, now)
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _save(self, packages: List[Dict], fetched_at: float):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "packages": packages}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+def package_url(meta: Optional[Dict]) -> Optional[str]:
+    if not meta:
+        return None
+    links = meta.get("links") or []
+    return links[0] if links else meta.get("download_url")
@@ -0,0 +1,82 @@
+import os, sys, time, builtins, threading
+from contextlib import contextmanager
+from typing import List, Tuple
+
+# ----------------- 启动耗时剖析 -----------------
+# 阶段耗时始终记录（开销可忽略）；设置 RTSUB_PROFILE_STARTUP=1 或传 --profile-startup 时
+# 额外统计每个顶层 import 的耗时，并在窗口可交互后把报告打印到 stderr。
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.enabled = False
+        self.phases: List[Tuple[str, float, float]] = []
+        self.imports: List[Tuple[str, float]] = []
+        self._orig_import = None
+        self._depth = threading.local()
+        self._reported = False
+
+    def begin(self, argv=None):
+        argv = sys.argv if argv is None else argv
+        self.enabled = os.environ.get("RTSUB_PROFILE_STARTUP", "") not in ("", "0") or "--profile-startup" in argv
+        if "--profile-startup" in argv:
+            argv.remove("--profile-startup")
+        if self.enabled and self._orig_import is None:
+            self._orig_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        depth = getattr(self._depth, "n", 0)
+        # 只计最外层、首次加载的绝对导入，嵌套导入的耗时算进外层
+        if depth or level or not name or name in sys.modules:
+            self._depth.n = depth + 1
+            try:
+                return self._orig_import(name, globals, locals, fromlist, level)
+            finally:
+                self._depth.n = depth
+        self._depth.n = 1
+        t = time.perf_counter()
+        try:
+            return self._orig_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth.n = 0
+            self.imports.append((name, (time.perf_counter() - t) * 1000.0))
+
+    def stop_import_tracking(self):
+        if self._orig_import is not None:
+            builtins.__import__ = self._orig_import
+            self._orig_import = None
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (t - self.t0) * 1000.0, (time.perf_counter() - t) * 1000.0))
+
+    def mark(self, name: str):
+        now = (time.perf_counter() - self.t0) * 1000.0
+        self.phases.append((name, now, 0.0))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000.0
+
+    def report(self) -> str:
+        lines = [f"startup profile (total {self.elapsed_ms():.0f} ms)", "  phases:"]
+        for name, at, dur in self.phases:
+            lines.append(f"    {at:8.1f} ms  +{dur:8.1f} ms  {name}")
+        if self.imports:
+            lines.append("  imports (first load, inclusive):")
+            for name, ms in sorted(self.imports, key=lambda x: -x[1])[:25]:
+                lines.append(f"    {ms:8.1f} ms  {name}")
+        return "\n".join(lines)
+
+    def finish(self):
+        if self._reported:
+            return
+        self._reported = True
+        self.stop_import_tracking()
+        if self.enabled:
+            print(self.report(), file=sys.stderr, flush=True)
+
+PROFILE = StartupProfile()
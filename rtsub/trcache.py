@@ -0,0 +1,132 @@
+import os, re, time, sqlite3, threading, unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict
+
+# ----------------- 翻译结果缓存（内存 LRU + 可选 SQLite 持久层） -----------------
+_WS = re.compile(r"\s+")
+_SCHEMA = 2  # 2：键不再转小写（大小写不同的专有名词 / 产品名译法可能不同）
+
+def normalize_text(text: str) -> str:
+    # 只做 NFKC 与空白折叠，保留大小写
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WS.sub(" ", text).strip()
+
+class TranslationCache:
+    ENTRY_OVERHEAD = 96  # 估算每条记录的 dict/tuple 开销（字节）
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024, db_path: Optional[str] = None,
+                 max_disk_rows: int = 200_000):
+        self.max_bytes = int(max_bytes)
+        self.db_path = db_path
+        self.max_disk_rows = int(max_disk_rows)
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[Tuple[str, str, str, str], str]" = OrderedDict()
+        self._bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA:
+                # 旧库的键是小写化的，无法还原原文大小写，直接丢弃
+                db.execute("DROP TABLE IF EXISTS tr")
+                db.execute(f"PRAGMA user_version={_SCHEMA}")
+            db.execute("CREATE TABLE IF NOT EXISTS tr ("
+                       "src TEXT, tgt TEXT, route TEXT, text TEXT, trans TEXT, used REAL, "
+                       "PRIMARY KEY (src, tgt, route, text))")
+            n = db.execute("SELECT COUNT(*) FROM tr").fetchone()[0]
+            if n > self.max_disk_rows:
+                db.execute("DELETE FROM tr WHERE rowid IN (SELECT rowid FROM tr ORDER BY used LIMIT ?)",
+                           (n - self.max_disk_rows,))
+            self._db = db
+        except Exception:
+            self._db = None
+
+    @staticmethod
+    def _size(key, trans: str) -> int:
+        return len(key[3].encode("utf-8")) + len(trans.encode("utf-8")) + TranslationCache.ENTRY_OVERHEAD
+
+    def _mem_put(self, key, trans: str):
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._bytes -= self._size(key, old)
+        self._mem[key] = trans
+        self._bytes += self._size(key, trans)
+        while self._bytes > self.max_bytes and self._mem:
+            k, v = self._mem.popitem(last=False)
+            self._bytes -= self._size(k, v)
+
+    def get(self, text: str, src: str, tgt: str, route: str) -> Optional[str]:
+        key = (src, tgt, route, normalize_text(text))
+        with self._lock:
+            trans = self._mem.get(key)
+            if trans is not None:
+                self._mem.move_to_end(key)
+                self.hits_mem += 1
+                return trans
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT trans FROM tr WHERE src=? AND tgt=? AND route=? AND text=?",
+                                           key).fetchone()
+                except Exception:
+                    row = None
+                if row:
+                    self.hits_disk += 1
+                    self._mem_put(key, row[0])
+                    try:
+                        self._db.execute("UPDATE tr SET used=? WHERE src=? AND tgt=? AND route=? AND text=?",
+                                         (time.time(),) + key)
+                    except Exception:
+                        pass
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, text: str, src: str, tgt: str, route: str, trans: str):
+        key = (src, tgt, route, normalize_text(text))
+        if not key[3] or trans is None:
+            return
+        with self._lock:
+            self._mem_put(key, trans)
+            if self._db is not None:
+                try:
+                    self._db.execute("INSERT OR REPLACE INTO tr VALUES (?, ?, ?, ?, ?, ?)",
+                                     key + (trans, time.time()))
+                except Exception:
+                    pass
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+            if disk and self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM tr")
+                except Exception:
+                    pass
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._db.close()
+                except Exception:
+                    pass
+                self._db = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits_mem + self.hits_disk + self.misses
+            return {
+                "hits_mem": self.hits_mem, "hits_disk": self.hits_disk, "misses": self.misses,
+                "hit_rate": ((self.hits_mem + self.hits_disk) / total) if total else 0.0,
+                "entries": len(self._mem), "bytes": self._bytes,
+            }
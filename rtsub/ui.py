@@ -1,19 +1,24 @@
 import os
-from PySide6.QtCore import Qt, QThread, Signal, Slot, QTimer
+from typing import Optional
+from PySide6.QtCore import Qt, QThread, Signal, Slot, QTimer, QFileSystemWatcher
 from PySide6.QtGui import QFont, QShortcut, QKeySequence, QIcon, QGuiApplication, QCursor
 
 from PySide6.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QMainWindow, QPushButton,
     QComboBox, QHBoxLayout, QProgressBar, QGroupBox, QGridLayout, QStatusBar,
-    QMessageBox, QSpacerItem, QSizePolicy, QProgressDialog, QFileDialog, QSpinBox
+    QMessageBox, QSpacerItem, QSizePolicy, QProgressDialog, QFileDialog, QSpinBox, QCheckBox
 )
 
 from .utils import (
-    MODELS_DIR, abs_path, list_local_vosk_models, unzip_to_models,
-    argos_pair_installed, argos_find_package, argos_install_from_file,
-    argos_uninstall_pair, ARGOS_OK
+    MODELS_DIR, abs_path, list_local_vosk_models,
+    argos_find_package, argos_index_lookup, argos_install_from_file,
+    argos_uninstall_pair, package_url, ARGOS_INDEX, ARGOS_OK, MODEL_MANIFEST
 )
-from .workers import DownloadWorker, ArgosPkgDownloadWorker
+from .workers import DownloadWorker, ModelInstallWorker, ArgosPkgDownloadWorker, ArgosWarmupWorker, ArgosIndexWorker
+from .extract import zip_root
+from .modelpool import MODEL_POOL
+from .metrics import METRICS
+from .engine import RENDER_DELAY
 from .i18n import t, set_lang, get_lang
 
 class OverlayWindow(QWidget):
@@ -37,6 +42,7 @@ class OverlayWindow(QWidget):
         self.hideTimer = QTimer(self)
         self.hideTimer.setSingleShot(True)
         self.hideTimer.timeout.connect(self._hide)
+        self._seg_id = 0
         self.resize_to_bottom()
     def resize_to_bottom(self):
         pos = QCursor.pos()
@@ -54,6 +60,19 @@ class OverlayWindow(QWidget):
         self.show()
         self.hideTimer.stop()
         self.hideTimer.start(2000)
+    @Slot(int, str)
+    def show_source(self, seg_id: int, src_txt: str):
+        self._seg_id = max(self._seg_id, seg_id)
+        self.show_texts(src_txt, "")
+        METRICS.observe_since(RENDER_DELAY, ("source", seg_id))
+    @Slot(int, str, str)
+    def show_translation(self, seg_id: int, src_txt: str, tgt_txt: str):
+        # 新的原文已经上屏时，迟到的旧译文不再覆盖
+        if seg_id < self._seg_id:
+            return
+        self._seg_id = seg_id
+        self.show_texts(src_txt, tgt_txt)
+        METRICS.observe_since(RENDER_DELAY, ("translation", seg_id))
     def _hide(self):
         self.hide()
     @Slot(str, int)
@@ -74,6 +93,11 @@ class MainWindow(QMainWindow):
         super().__init__()
         self._live_threads = set()
         self._live_dialogs = set()
+        self._warm_token = 0
+        self._warm_worker = None
+        self._index_worker = None
+        self._pair_installed = None  # (src, tgt, 是否已安装)，由预热线程查询后填入
+        self._argos_state = ("engine.ready", {})
         self._build_ui()
         self._build_shortcuts()
         
@@ -205,16 +229,20 @@ class MainWindow(QMainWindow):
         hd = QHBoxLayout(self.grpAudio)
         self.lbInput = QLabel(); self.devCombo = QComboBox(); self.devCombo.addItem("")
         hd.addWidget(self.lbInput); hd.addWidget(self.devCombo, 1)
+        self.chkSpeculative = QCheckBox()
+        hd.addWidget(self.chkSpeculative)
 
         self.grpStatus = QGroupBox()
         grid.addWidget(self.grpStatus, 2, 0, 1, 2)
         vs = QVBoxLayout(self.grpStatus)
         self.lbStatus = QLabel()
         self.lbArgos  = QLabel()
+        self.lbCapture = QLabel()
+        self.lbMetrics = QLabel()
         hb = QHBoxLayout(); self.pbLevel = QProgressBar(); self.pbLevel.setRange(0,100); self.pbLevel.setFixedHeight(14)
         self.lbLevel = QLabel()
         hb.addWidget(self.lbLevel); hb.addWidget(self.pbLevel, 1)
-        vs.addWidget(self.lbStatus); vs.addWidget(self.lbArgos); vs.addLayout(hb)
+        vs.addWidget(self.lbStatus); vs.addWidget(self.lbArgos); vs.addWidget(self.lbCapture); vs.addWidget(self.lbMetrics); vs.addLayout(hb)
 
         self.grpSubtitle = QGroupBox()
         grid.addWidget(self.grpSubtitle, 3, 0, 1, 1)
@@ -260,8 +288,10 @@ class MainWindow(QMainWindow):
 
 
         self.asrCombo.currentTextChanged.connect(self._reload_asr_models)
+        self.asrCombo.currentTextChanged.connect(self._reload_trans_models)
         self.tgtCombo.currentTextChanged.connect(self._reload_trans_models)
         self.asrModelCombo.activated.connect(self._maybe_download_selected_asr_model)
+        self.asrModelCombo.currentIndexChanged.connect(self._preload_selected_asr_model)
         self.transModelCombo.activated.connect(self._maybe_download_selected_trans_model)
         self.btnAsrDelete.clicked.connect(self._delete_selected_vosk_model)
         self.btnAsrImport.clicked.connect(self._import_local_vosk_zip)
@@ -271,6 +301,7 @@ class MainWindow(QMainWindow):
         self.styleCombo.currentIndexChanged.connect(self._emit_subtitle_style)
         self.sizeSpin.valueChanged.connect(self._emit_subtitle_style)
 
+        self._init_model_watch()
         self._reload_asr_models()
         self._reload_trans_models()
 
@@ -349,9 +380,13 @@ class MainWindow(QMainWindow):
             self.devCombo.addItem(t("input.auto"))
         else:
             self.devCombo.setItemText(0, t("input.auto"))
+        self.chkSpeculative.setText(t("chk.speculative"))
+        self.chkSpeculative.setToolTip(t("tip.speculative"))
 
         self.lbStatus.setText(t("label.status") + t("status.idle"))
-        self.lbArgos.setText(t("label.engine") + t("engine.ready"))
+        self._set_argos_state(*self._argos_state)
+        self.lbCapture.setText(t("label.capture") + "-")
+        self.lbMetrics.setText(t("label.metrics") + "-")
         self.lbLevel.setText(t("label.level"))
 
         self.lbStyle.setText(t("label.font_style"))
@@ -365,6 +400,7 @@ class MainWindow(QMainWindow):
 
     def setRunning(self, running: bool):
         self.running = running
+        self.chkSpeculative.setEnabled(not running)  # 运行中不能切换，下次开始时生效
         if running:
             self.btnStartStop.setText(t("btn.stop"))
             self.btnStartStop.setObjectName("stop")
@@ -374,10 +410,62 @@ class MainWindow(QMainWindow):
             self.btnStartStop.setObjectName("")
             self.btnStartStop.setStyle(self.style())
 
+    def _init_model_watch(self):
+        # models/ 的增删改由文件监视增量同步到清单，不再每次刷新都整目录扫描
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        MODEL_MANIFEST.sync()
+        self._model_dirty = set()
+        self._model_watch = QFileSystemWatcher(self)
+        self._model_watch.directoryChanged.connect(self._on_models_dir_changed)
+        self._model_timer = QTimer(self)
+        self._model_timer.setSingleShot(True)
+        self._model_timer.setInterval(800)  # 解压/复制过程中事件很密集，合并后再扫描
+        self._model_timer.timeout.connect(self._sync_model_manifest)
+        self._update_model_watch()
+
+    def _update_model_watch(self):
+        want = {MODELS_DIR}
+        for e in MODEL_MANIFEST.entries():
+            root = os.path.join(MODELS_DIR, e["folder"])
+            want.add(root)
+            # 也监视一级子目录（am/、graph/ …），文件写入这些目录时模型目录本身的 mtime 不会变
+            try:
+                want.update(os.path.join(root, n) for n in os.listdir(root) if os.path.isdir(os.path.join(root, n)))
+            except OSError:
+                pass
+        have = set(self._model_watch.directories())
+        if have - want:
+            self._model_watch.removePaths(list(have - want))
+        if want - have:
+            self._model_watch.addPaths([p for p in want - have if os.path.isdir(p)])
+
+    @Slot(str)
+    def _on_models_dir_changed(self, path: str):
+        rel = os.path.relpath(path, MODELS_DIR)
+        self._model_dirty.add(None if rel == "." else rel.split(os.sep)[0])
+        self._model_timer.start()
+
+    @Slot()
+    def _sync_model_manifest(self):
+        dirty, self._model_dirty = self._model_dirty, set()
+        if None in dirty:
+            changed = bool(MODEL_MANIFEST.sync())
+            dirty.discard(None)
+        else:
+            changed = False
+        for folder in dirty:
+            MODEL_MANIFEST.refresh(folder)
+            changed = True
+        self._update_model_watch()
+        if changed:
+            self._reload_asr_models()
+
     @Slot()
     def _reload_asr_models(self):
         lang = self.asrCombo.currentText()
         items = list_local_vosk_models(lang)
+        cur = (self.asrModelCombo.currentData() or {}).get("folder")
+        self.asrModelCombo.blockSignals(True)
         self.asrModelCombo.clear()
         for it in items:
             tag = (t("combo.installed") if it.get("installed") else t("combo.not_installed"))
@@ -385,6 +473,19 @@ class MainWindow(QMainWindow):
             self.asrModelCombo.addItem(f"{rec}{tag}{it['label']}", it)
         if self.asrModelCombo.count() == 0:
             self.asrModelCombo.addItem(t("combo.no_models"), {"installed": False, "folder": None})
+        for i in range(self.asrModelCombo.count()):
+            if cur and (self.asrModelCombo.itemData(i) or {}).get("folder") == cur:
+                self.asrModelCombo.setCurrentIndex(i)
+                break
+        self.asrModelCombo.blockSignals(False)
+        self._preload_selected_asr_model()
+
+    @Slot()
+    def _preload_selected_asr_model(self):
+        # 选中已安装模型即在后台加载进 MODEL_POOL，点击开始时基本无需等待
+        data = self.asrModelCombo.currentData()
+        if data and data.get("installed") and data.get("complete", True) and data.get("folder"):
+            MODEL_POOL.preload(data["folder"])
 
     @Slot()
     def _maybe_download_selected_asr_model(self):
@@ -400,11 +501,11 @@ class MainWindow(QMainWindow):
                                  QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
         if r != QMessageBox.Yes:
             return
+        if not self._confirm_overwrite(folder):
+            return
         os.makedirs(MODELS_DIR, exist_ok=True)
         tmpzip = os.path.join(MODELS_DIR, f"_{folder}.zip")
-        self._download_with_dialog(url, tmpzip, t("dlg.title.download_asr"),
-                                   on_ok=lambda: unzip_to_models(self, tmpzip),
-                                   on_done=self._reload_asr_models)
+        self._install_with_dialog(tmpzip, folder, t("dlg.title.download_asr"), url=url, sha256=data.get("sha256"))
 
     @Slot()
     def _delete_selected_vosk_model(self):
@@ -419,8 +520,10 @@ class MainWindow(QMainWindow):
         if r != QMessageBox.Yes:
             return
         import shutil
+        MODEL_POOL.drop(folder)
         try:
             shutil.rmtree(p, ignore_errors=True)
+            MODEL_MANIFEST.forget(folder)
             QMessageBox.information(self, t("dlg.title.done"), t("dlg.done.deleted"))
         except Exception as e:
             QMessageBox.critical(self, t("dlg.title.fail"), f"{e}")
@@ -431,13 +534,93 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getOpenFileName(self, t("dlg.import_asr_pick"), "", "ZIP (*.zip)")
         if not path:
             return
-        if unzip_to_models(self, path):
-            QMessageBox.information(self, t("dlg.title.done"), t("dlg.unzip_ok"))
+        try:
+            root = zip_root(path)
+        except Exception as e:
+            QMessageBox.critical(self, t("dlg.title.fail"), t("dlg.unzip_fail", err=e)); return
+        folder = root or os.path.splitext(os.path.basename(path))[0]
+        if not self._confirm_overwrite(folder):
+            return
+        self._install_with_dialog(path, folder, t("dlg.import_asr_pick"))
+
+    def _confirm_overwrite(self, folder: str) -> bool:
+        if not os.path.isdir(os.path.join(MODELS_DIR, folder)):
+            return True
+        r = QMessageBox.question(self, t("dlg.title.overwrite"), f"{t('dlg.title.overwrite')}: {folder}\n",
+                                 QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return r == QMessageBox.Yes
+
+    def _install_with_dialog(self, zip_path: str, folder: str, title: str, url: Optional[str] = None,
+                             sha256: Optional[str] = None):
+        # 下载与解压都在 ModelInstallWorker 里完成，界面只更新进度；旧模型在新模型就绪后才被替换
+        dlg = QProgressDialog(t("dlg.download.connecting") if url else t("dlg.extracting", n=0),
+                              t("dlg.download_cancelled"), 0, 100, self)
+        dlg.setWindowTitle(title)
+        dlg.setWindowModality(Qt.ApplicationModal)
+        dlg.setMinimumDuration(0)
+        dlg.setValue(0)
+        self._live_dialogs.add(dlg)
+        def _dlg_cleanup():
+            self._live_dialogs.discard(dlg)
+        dlg.destroyed.connect(_dlg_cleanup)
+        dlg.finished.connect(_dlg_cleanup)
+
+        MODEL_POOL.drop(folder)
+        worker = ModelInstallWorker(zip_path, folder=folder, url=url, sha256=sha256, parent=self)
+        self._track_thread(worker)
+        worker.progress.connect(dlg.setValue)
+        worker.extracted.connect(lambda n, _name: dlg.setLabelText(t("dlg.extracting", n=n)))
+        dlg.canceled.connect(worker.requestInterruption)
+
+        def _finished(ok: bool, msg: str):
+            dlg.close()
+            if ok:
+                QMessageBox.information(self, t("dlg.title.done"), t("dlg.unzip_ok"))
+            else:
+                QMessageBox.critical(self, t("dlg.title.fail"), t("dlg.unzip_fail", err=msg or "unknown error"))
             self._reload_asr_models()
 
+        worker.finished.connect(_finished)
+        worker.start()
+
     def _pair_text(self, s: str, t2: str) -> str:
         return f"{s}->{t2}"
 
+    def _set_argos_state(self, key: str, kwargs: dict):
+        self._argos_state = (key, kwargs)
+        self.lbArgos.setText(t("label.engine") + t(key, **kwargs))
+
+    def _warm_translator(self, src: str, tgt: str):
+        # 选择变化时取消上一轮预热（已在加载中的模型无法中断，但其结果会被丢弃）
+        if self._warm_worker is not None:
+            self._warm_worker.requestInterruption()
+            self._warm_worker = None
+        self._warm_token += 1
+        if not ARGOS_OK:
+            self._set_argos_state("engine.no_argos", {})
+            return
+        pair = self._pair_text(src, tgt)
+        self._set_argos_state("engine.warming", {"pair": pair})
+        worker = ArgosWarmupWorker(self._warm_token, src, tgt, parent=self)
+        self._track_thread(worker)
+        def on_pair_checked(token: int, installed: bool):
+            if token != self._warm_token:
+                return
+            self._pair_installed = (src, tgt, installed)
+            self._fill_trans_combo(src, tgt)
+        worker.pairChecked.connect(on_pair_checked)
+        def on_finished(token: int, state: str, secs: float):
+            if token != self._warm_token:
+                return
+            self._warm_worker = None
+            if state == "ready":
+                self._set_argos_state("engine.warm_ready", {"pair": pair, "sec": f"{secs:.1f}"})
+            elif state == "missing":
+                self._set_argos_state("engine.pairs_missing", {})
+        worker.finished.connect(on_finished)
+        self._warm_worker = worker
+        worker.start()
+
     @Slot()
     def _reload_trans_models(self):
         src = self.asrCombo.currentText()
@@ -446,25 +629,52 @@ class MainWindow(QMainWindow):
         if not ARGOS_OK:
             self.transModelCombo.addItem(t("combo.argos_missing"),
                                          {"installed": False, "pair": (src, tgt), "url": None})
+            self._set_argos_state("engine.no_argos", {})
             return
-        installed = argos_pair_installed(src, tgt)
-        pkg = argos_find_package(src, tgt)
-        url = getattr(pkg, "download_url", None) if pkg else None
-        tag = t("combo.installed") if installed else t("combo.not_installed")
+        # 安装状态要加载 argostranslate 才能查到，交给预热线程；这里先按缓存索引显示“检查中”
+        self._pair_installed = None
+        self._fill_trans_combo(src, tgt)
+        self._warm_translator(src, tgt)
+
+    def _fill_trans_combo(self, src: str, tgt: str):
+        # 只查缓存的包索引，切换语言时不联网；索引过期则后台刷新。
+        # installed 为 None 表示预热线程还没查完
+        self.transModelCombo.clear()
+        known = self._pair_installed
+        installed = known[2] if known and known[:2] == (src, tgt) else None
+        meta = argos_index_lookup(src, tgt)
+        if installed is None:
+            tag = t("combo.checking")
+        else:
+            tag = t("combo.installed") if installed else t("combo.not_installed")
         self.transModelCombo.addItem(f"{tag}{self._pair_text(src, tgt)}",
-                                     {"installed": installed, "pair": (src, tgt), "url": url, "pkg": pkg})
+                                     {"installed": installed, "pair": (src, tgt), "url": package_url(meta), "meta": meta})
+        if ARGOS_INDEX.refresh_due():
+            self._refresh_argos_index()
+
+    def _refresh_argos_index(self, force: bool = False):
+        if self._index_worker is not None:
+            return
+        worker = ArgosIndexWorker(force=force, parent=self)
+        self._track_thread(worker)
+        def on_finished(ok: bool):
+            self._index_worker = None
+            if ok:
+                self._fill_trans_combo(self.asrCombo.currentText(), self.tgtCombo.currentText())
+        worker.finished.connect(on_finished)
+        self._index_worker = worker
+        worker.start()
 
     @Slot()
     def _maybe_download_selected_trans_model(self):
         data = self.transModelCombo.currentData()
-        if not data or data.get("installed"):
+        if not data or data.get("installed") is not False:
             return
         if not ARGOS_OK:
             QMessageBox.warning(self, t("dlg.title.tip"), t("dlg.argos_not_installed"))
             return
         src, tgt = data.get("pair", ("", ""))
-        pkg = data.get("pkg", None)
-        if not pkg:
+        if not data.get("meta"):
             QMessageBox.information(self, t("dlg.title.tip"), t("dlg.argos_index_missing"))
             return
         r = QMessageBox.question(self, t("dlg.title.download_trans"),
@@ -489,6 +699,10 @@ class MainWindow(QMainWindow):
             self._download_with_dialog(url, tmp_file, t("dlg.title.download_trans"),
                                        on_ok=on_ok, on_done=self._reload_trans_models)
         else:
+            pkg = argos_find_package(src, tgt)
+            if not pkg:
+                QMessageBox.information(self, t("dlg.title.tip"), t("dlg.argos_index_missing"))
+                return
             busy = QProgressDialog(t("dlg.download_busy", src=src, tgt=tgt), t("dlg.download_cancelled"), 0, 0, self)
             busy.setWindowModality(Qt.ApplicationModal)
             busy.setMinimumDuration(0)
@@ -504,12 +718,11 @@ class MainWindow(QMainWindow):
                 busy.close()
                 if not ok:
                     QMessageBox.critical(self, t("dlg.title.fail"), msg); return
-                try:
-                    from argostranslate import package as argospkg
-                    argospkg.install_from_path(path)
+                ok2, msg2 = argos_install_from_file(path)
+                if ok2:
                     QMessageBox.information(self, t("dlg.title.done"), t("dlg.argos_install_ok"))
-                except Exception as e:
-                    QMessageBox.critical(self, t("dlg.title.fail"), t("dlg.argos_install_fail", err=e))
+                else:
+                    QMessageBox.critical(self, t("dlg.title.fail"), t("dlg.argos_install_fail", err=msg2))
                 self._reload_trans_models()
             worker.finished.connect(on_finished)
             worker.start()
@@ -1,6 +1,11 @@
-import os, re, shutil, zipfile
+import os, re, json, shutil, threading
+from importlib.util import find_spec
 from typing import Tuple, Optional, List, Dict
 from .i18n import t
+from .trcache import TranslationCache
+from .pkgindex import PackageIndex, package_url
+from .manifest import ModelManifest
+from .argosbatch import batcher_for, is_short
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 def abs_path(*parts):
@@ -9,6 +14,7 @@ def abs_path(*parts):
 MODELS_DIR = abs_path("models")
 
 # ----------------- Vosk 模型索引与本地扫描 -----------------
+# 条目可带可选的 "sha256"：下载后的压缩包哈希不符则拒绝安装
 KNOWN_VOSK_MODELS: Dict[str, List[Dict]] = {
     "ja": [
         {"label": "small-ja-0.22（默认）", "folder": "vosk-model-small-ja-0.22",
@@ -38,17 +44,27 @@ LANG_HINTS_REGEX = {
     "en": re.compile(r"(vosk-model.*en.*)", re.IGNORECASE),
 }
 
+def vosk_model_lang(folder: str) -> str:
+    for code, rx in LANG_HINTS_REGEX.items():
+        if rx.match(folder):
+            return code
+    return ""
+
+# 已安装模型清单：持久化在 ./cache，models/ 的变化由 UI 的文件监视增量同步
+MODEL_MANIFEST = ModelManifest(MODELS_DIR, abs_path("cache", "models_manifest.json"), lang_of=vosk_model_lang)
+
+def _fmt_bytes(n: int) -> str:
+    return f"{n / 1024 ** 3:.1f} GB" if n >= 1024 ** 3 else f"{n / 1024 ** 2:.0f} MB"
+
 def list_local_vosk_models(lang_code: str) -> List[Dict]:
     results: List[Dict] = []
     if not os.path.isdir(MODELS_DIR):
         os.makedirs(MODELS_DIR, exist_ok=True)
-    hint = LANG_HINTS_REGEX.get(lang_code)
-    if hint:
-        for name in sorted(os.listdir(MODELS_DIR)):
-            full = os.path.join(MODELS_DIR, name)
-            if os.path.isdir(full) and hint.match(name):
-                results.append({"label": f"{name}（本地）", "folder": name, "url": None,
-                                "recommended": False, "installed": True})
+    for e in MODEL_MANIFEST.entries(lang_code):
+        note = _fmt_bytes(e["bytes"]) if e["complete"] else "不完整"
+        results.append({"label": f"{e['folder']}（本地，{note}）", "folder": e["folder"], "url": None,
+                        "recommended": False, "installed": True, "complete": e["complete"],
+                        "bytes": e["bytes"], "fingerprint": e["fingerprint"]})
     known = KNOWN_VOSK_MODELS.get(lang_code, [])
     known_map = {k["folder"]: k for k in known}
     for folder, k in known_map.items():
@@ -64,76 +80,157 @@ def list_local_vosk_models(lang_code: str) -> List[Dict]:
 
 def ensure_vosk_model_ready(folder_name: str) -> Tuple[bool, str]:
     p = os.path.join(MODELS_DIR, folder_name)
-    if not os.path.isdir(p):
+    e = MODEL_MANIFEST.get(folder_name)
+    if e is None:
         return False, f"未安装模型目录：{p}"
-    ok = os.path.exists(os.path.join(p, "model.conf")) or os.path.isdir(os.path.join(p, "am"))
-    return (True, "ok") if ok else (False, f"模型结构异常：{p}")
-
-# ----------------- ZIP 解压到 ./models -----------------
-def unzip_to_models(parent_qwidget, zip_path: str) -> bool:
-    from PySide6.QtWidgets import QMessageBox
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            members = zf.namelist()
-            root = members[0].split('/')[0] if members else ""
-            target_dir = os.path.join(MODELS_DIR, root) if root else MODELS_DIR
-            if root and os.path.isdir(target_dir):
-                r = QMessageBox.question(parent_qwidget, t("dlg.title.overwrite"),
-                                         f"{t('dlg.title.overwrite')}: {root}\n",
-                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if r != QMessageBox.Yes:
-                    return False
-                shutil.rmtree(target_dir, ignore_errors=True)
-            zf.extractall(MODELS_DIR)
-        return True
-    except Exception as e:
-        QMessageBox.critical(parent_qwidget, t("dlg.title.fail"), t("dlg.unzip_fail", err=e))
-        return False
-    finally:
-        try:
-            os.remove(zip_path)
-        except Exception:
-            pass
+    if not e["complete"]:
+        return False, f"模型不完整（{e['problem']}），请重新下载或导入：{p}"
+    return True, "ok"
 
 # ----------------- Argos Translate 工具 -----------------
-ARGOS_OK = False
+# 只探测是否安装，不在导入期加载 argostranslate（会连带加载 CTranslate2 / SentencePiece / 分句模型，耗时数秒）
 try:
-    import argostranslate.translate as argos
-    import argostranslate.package as argospkg
-    ARGOS_OK = True
+    ARGOS_OK = find_spec("argostranslate") is not None
 except Exception:
     ARGOS_OK = False
+_ARGOS_MODS = None
+_ARGOS_LOCK = threading.Lock()
+
+def _argos_modules():
+    global _ARGOS_MODS
+    if _ARGOS_MODS is None:
+        with _ARGOS_LOCK:
+            if _ARGOS_MODS is None:
+                import argostranslate.translate as argos
+                import argostranslate.package as argospkg
+                _ARGOS_MODS = (argos, argospkg)
+    return _ARGOS_MODS
+
+# 翻译路线
+class TranslateRoute:
+    AUTO = "auto"
+    DIRECT = "prefer_direct"
+    VIA_EN = "prefer_via_en"
+
+# 进程级翻译器注册表：语言表与 (src, tgt, route) 路线只解析一次，安装/卸载后失效
+_LANG_NORM = {"zh-cn": "zh", "zh_hans": "zh", "ja-jp": "ja", "jp": "ja"}
+
+def _norm_lang(code: str) -> str:
+    code = (code or "").lower()
+    return _LANG_NORM.get(code, code)
+
+class _TranslatorRegistry:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._langs = None
+        self._pairs: Dict[Tuple[str, str], object] = {}
+        self._routes: Dict[Tuple[str, str, str], Optional[tuple]] = {}
+        self.generation = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._langs = None
+            self._pairs.clear()
+            self._routes.clear()
+            self.generation += 1
+
+    def _languages(self) -> Dict[str, object]:
+        if self._langs is None:
+            self._langs = {l.code: l for l in _argos_modules()[0].get_installed_languages()}
+        return self._langs
+
+    def get(self, a: str, b: str):
+        with self._lock:
+            key = (a, b)
+            if key not in self._pairs:
+                tr = None
+                try:
+                    langs = self._languages()
+                    if langs.get(a) and langs.get(b):
+                        tr = langs[a].get_translation(langs[b])
+                except Exception:
+                    tr = None
+                self._pairs[key] = tr
+            return self._pairs[key]
+
+    def resolve(self, src: str, tgt: str, route: str) -> Optional[tuple]:
+        with self._lock:
+            key = (src, tgt, route)
+            if key not in self._routes:
+                self._routes[key] = self._resolve(src, tgt, route)
+            return self._routes[key]
+
+    def _resolve(self, src: str, tgt: str, route: str) -> Optional[tuple]:
+        direct = self.get(src, tgt)
+        via = None
+        if src != "en" and tgt != "en":
+            a, b = self.get(src, "en"), self.get("en", tgt)
+            via = (a, b) if a and b else None
+        if route == TranslateRoute.DIRECT and direct:
+            return (direct,)
+        if route == TranslateRoute.VIA_EN and via:
+            return via
+        if direct:
+            return (direct,)
+        return via
+
+_REGISTRY = _TranslatorRegistry()
+
+def argos_reset_registry():
+    _REGISTRY.invalidate()
 
 def argos_pair_installed(src: str, tgt: str) -> bool:
     if not ARGOS_OK:
         return False
     try:
-        langs = {l.code: l for l in argos.get_installed_languages()}
-        if not (langs.get(src) and langs.get(tgt)):
-            return False
-        tr = langs[src].get_translation(langs[tgt])
-        return tr is not None
+        return _REGISTRY.get(_norm_lang(src), _norm_lang(tgt)) is not None
     except Exception:
         return False
 
-def argos_find_package(src: str, tgt: str):
+# 可下载包索引：缓存在 ./cache/argos_index.json，查找不联网，过期后由 ArgosIndexWorker 在后台刷新
+ARGOS_INDEX_PATH = abs_path("cache", "argos_index.json")
+ARGOS_INDEX_TTL = 24 * 3600
+
+def _argos_fetch_index() -> List[Dict]:
+    argospkg = _argos_modules()[1]
+    argospkg.update_package_index()
+    try:
+        from argostranslate import settings
+        with open(settings.local_package_index, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        keys = ("from_code", "to_code", "package_version", "argos_version", "from_name", "to_name", "links")
+        return [{k: getattr(p, k) for k in keys if hasattr(p, k)} for p in argospkg.get_available_packages()]
+
+ARGOS_INDEX = PackageIndex(ARGOS_INDEX_PATH, _argos_fetch_index, ttl=ARGOS_INDEX_TTL)
+
+def argos_index_lookup(src: str, tgt: str) -> Optional[Dict]:
     if not ARGOS_OK:
         return None
+    return ARGOS_INDEX.lookup(_norm_lang(src), _norm_lang(tgt))
+
+def argos_index_refresh(force: bool = False) -> bool:
+    if not ARGOS_OK:
+        return False
+    return ARGOS_INDEX.refresh(force=force)
+
+def argos_find_package(src: str, tgt: str):
+    # 从缓存索引构造 AvailablePackage（供 pkg.download() 使用），不会触发联网
+    meta = argos_index_lookup(src, tgt)
+    if not meta:
+        return None
     try:
-        argospkg.update_package_index()
-        avail = argospkg.get_available_packages()
-        for p in avail:
-            if getattr(p, "from_code", "") == src and getattr(p, "to_code", "") == tgt:
-                return p
+        return _argos_modules()[1].AvailablePackage(meta)
     except Exception:
-        pass
-    return None
+        return None
 
 def argos_install_from_file(path: str):
     if not ARGOS_OK:
         return False, "argostranslate 未安装"
     try:
+        argospkg = _argos_modules()[1]
         argospkg.install_from_path(path)
+        argos_reset_registry()
         return True, "安装成功"
     except Exception as e:
         return False, f"安装失败：{e}"
@@ -142,50 +239,134 @@ def argos_uninstall_pair(parent_qwidget, src: str, tgt: str):
     if not ARGOS_OK:
         return False, "argostranslate 未安装"
     try:
+        argospkg = _argos_modules()[1]
         if hasattr(argospkg, "get_installed_packages"):
             pkgs = argospkg.get_installed_packages()
             for p in pkgs:
                 if getattr(p, "from_code", None) == src and getattr(p, "to_code", None) == tgt:
                     if hasattr(argospkg, "uninstall"):
                         argospkg.uninstall(p)
+                        argos_reset_registry()
                         return True, "卸载成功"
                     d = getattr(p, "package_path", None) or getattr(p, "install_dir", None)
                     if d and os.path.isdir(d):
                         shutil.rmtree(d, ignore_errors=True)
+                        argos_reset_registry()
                         return True, "卸载成功（直接删除包目录）"
     except Exception:
         pass
     return False, "未能自动卸载，请手动删除 Argos 包目录（不同系统路径不同）。"
 
-# 翻译路线
-class TranslateRoute:
-    AUTO = "auto"
-    DIRECT = "prefer_direct"
-    VIA_EN = "prefer_via_en"
+def argos_warm_up(src: str, tgt: str, route: str = TranslateRoute.AUTO, cancelled=None) -> Optional[bool]:
+    # 预先跑一遍该路线上每个翻译器，触发 CTranslate2 / SentencePiece / 分句模型的加载
+    # 返回 True=就绪，False=该语言对未安装，None=中途被取消
+    if not ARGOS_OK or _norm_lang(src) == _norm_lang(tgt):
+        return True
+    chain = _REGISTRY.resolve(_norm_lang(src), _norm_lang(tgt), route)
+    if not chain:
+        return False
+    for tr in chain:
+        if cancelled and cancelled():
+            return None
+        try:
+            # 能批量的翻译对象经 batcher 加载模型，与翻译线程共用同一把加载锁
+            b = batcher_for(tr)
+            if b is not None:
+                b.warm_up()
+            else:
+                tr.translate("Hello.")
+        except Exception:
+            return False
+    return True
+
+# 翻译结果缓存：默认内存 LRU + ./cache 下的 SQLite，可通过 configure_translation_cache 调整
+TRANSLATION_CACHE_PATH = abs_path("cache", "translations.sqlite3")
+_CACHE: Optional[TranslationCache] = None
+_CACHE_OFF = False
+_CACHE_LOCK = threading.Lock()
+
+def configure_translation_cache(max_bytes: int = 4 * 1024 * 1024, db_path: Optional[str] = TRANSLATION_CACHE_PATH,
+                                enabled: bool = True):
+    global _CACHE, _CACHE_OFF
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.close()
+        _CACHE = TranslationCache(max_bytes=max_bytes, db_path=db_path) if enabled else None
+        _CACHE_OFF = not enabled
+
+def _translation_cache() -> Optional[TranslationCache]:
+    global _CACHE
+    if _CACHE is None and not _CACHE_OFF:
+        with _CACHE_LOCK:
+            if _CACHE is None and not _CACHE_OFF:
+                _CACHE = TranslationCache(db_path=TRANSLATION_CACHE_PATH)
+    return _CACHE
+
+def translation_cache_stats() -> Dict[str, float]:
+    c = _CACHE
+    return c.stats() if c is not None else {}
 
 def argos_translate(text: str, src: str, tgt: str, route: str = TranslateRoute.AUTO) -> str:
     if not text or not text.strip() or src == tgt or not ARGOS_OK:
         return text
     try:
-        langs = argos.get_installed_languages()
-        by = {l.code: l for l in langs}
-        def has(a, b):
-            try:
-                return bool(by.get(a) and by.get(b) and by[a].get_translation(by[b]))
-            except Exception:
-                return False
-        def do(a, b, s):
-            tr = by[a].get_translation(by[b]); return tr.translate(s)
-        norm = {"zh-cn": "zh", "zh_hans": "zh", "ja-jp": "ja", "jp": "ja"}
-        src = norm.get(src.lower(), src.lower()); tgt = norm.get(tgt.lower(), tgt.lower())
-        if route == TranslateRoute.DIRECT and has(src, tgt):
-            return do(src, tgt, text)
-        if route == TranslateRoute.VIA_EN and has(src, "en") and has("en", tgt):
-            return do("en", tgt, do(src, "en", text))
-        if has(src, tgt):
-            return do(src, tgt, text)
-        if src != "en" and tgt != "en" and has(src, "en") and has("en", tgt):
-            return do("en", tgt, do(src, "en", text))
+        src, tgt = _norm_lang(src), _norm_lang(tgt)
+        chain = _REGISTRY.resolve(src, tgt, route)
+        if chain:
+            # 缓存键用实际解析出的路线，装上直连包后不会命中旧的英语中转结果
+            route_key = "direct" if len(chain) == 1 else "via_en"
+            cache = _translation_cache()
+            if cache is not None:
+                hit = cache.get(text, src, tgt, route_key)
+                if hit is not None:
+                    return hit
+            out = text
+            for tr in chain:
+                # 短的单句走快速路径（直接 SentencePiece + CTranslate2，不分句），长文本走 argos 完整流程
+                b = batcher_for(tr)
+                if b is None:
+                    out = tr.translate(out)
+                else:
+                    out = b.translate(out) if is_short(out) else b.full_translate(out)
+            if cache is not None:
+                cache.put(text, src, tgt, route_key, out)
+            return out
     except Exception:
         pass
     return text
+
+def argos_translate_batch(texts: List[str], src: str, tgt: str, route: str = TranslateRoute.AUTO) -> List[str]:
+    # 多段一起翻译：缓存命中的直接返回，其余在路线的每一跳上合成一次 CTranslate2 批量调用；
+    # 翻译对象不支持批量时该跳逐段 translate()，出错则整批退回逐段 argos_translate
+    out = list(texts)
+    if not texts or not ARGOS_OK or _norm_lang(src) == _norm_lang(tgt):
+        return out
+    try:
+        src, tgt = _norm_lang(src), _norm_lang(tgt)
+        chain = _REGISTRY.resolve(src, tgt, route)
+        if not chain:
+            return out
+        route_key = "direct" if len(chain) == 1 else "via_en"
+        cache = _translation_cache()
+        todo = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            hit = cache.get(text, src, tgt, route_key) if cache is not None else None
+            if hit is not None:
+                out[i] = hit
+            else:
+                todo.append(i)
+        cur = [texts[i] for i in todo]
+        for tr in chain:
+            if not cur:
+                break
+            b = batcher_for(tr)
+            cur = b.translate_batch(cur) if b is not None else [tr.translate(x) for x in cur]
+        for i, res in zip(todo, cur):
+            out[i] = res
+            if cache is not None:
+                cache.put(texts[i], src, tgt, route_key, res)
+        return out
+    except Exception:
+        return [argos_translate(text, src, tgt, route) for text in texts]
@@ -1,55 +1,164 @@
-import os, json, time, queue
-from urllib.request import urlopen, Request
+import os, time, zlib, shutil, zipfile, threading
 from typing import Optional
-import numpy as np
-import pyaudio
 from PySide6.QtCore import QThread, Signal, Slot
 
-import vosk
-
-from .utils import MODELS_DIR, ensure_vosk_model_ready, argos_translate, TranslateRoute
+from .utils import MODELS_DIR, MODEL_MANIFEST, argos_pair_installed, argos_warm_up, argos_index_refresh, TranslateRoute
+from .download import SegmentedDownloader, DownloadCancelled, discard_partial
+from .archcache import ARCHIVE_CACHE
+from .extract import (StreamingZipExtractor, ExtractError, ExtractCancelled, extract_zip, verify_against_central,
+                      make_staging, install_staging)
+from .audio import AudioRing
+from .engine import CaptureEngine, RecognitionEngine, list_input_devices
 
 # ----------------- 下载线程 -----------------
 class DownloadWorker(QThread):
     progress = Signal(int)
     finished = Signal(bool, str)
-    def __init__(self, url: str, dest_path: str, chunk_size: int = 1024 * 256, parent=None):
+    def __init__(self, url: str, dest_path: str, chunk_size: int = 1024 * 256, connections: int = 4, parent=None):
         super().__init__(parent)
         self.url = url
         self.dest_path = dest_path
         self.chunk = chunk_size
+        self.connections = connections
+        self._pct = -1
+    def _on_progress(self, done: int, total: int):
+        if total > 0:
+            pct = min(100, int(done * 100 / total))
+            if pct != self._pct:
+                self._pct = pct
+                self.progress.emit(pct)
     def run(self):
+        # 断点与分段进度保存在 dest_path.part(.json)，取消或失败后再次下载同一文件会续传
+        dl = SegmentedDownloader(self.url, self.dest_path, connections=self.connections, chunk_size=self.chunk,
+                                 progress=self._on_progress, cancelled=self.isInterruptionRequested)
         try:
-            req = Request(self.url, headers={"User-Agent": "Mozilla/5.0"})
-            with urlopen(req, timeout=60) as resp:
-                total = resp.length or 0
-                done = 0
-                with open(self.dest_path, "wb") as f:
-                    while True:
-                        if self.isInterruptionRequested():
-                            try:
-                                f.close(); os.remove(self.dest_path)
-                            except Exception:
-                                pass
-                            self.finished.emit(False, "已取消")
-                            return
-                        data = resp.read(self.chunk)
-                        if not data:
-                            break
-                        f.write(data)
-                        done += len(data)
-                        if total > 0:
-                            pct = int(done * 100 / total)
-                            self.progress.emit(min(100, pct))
+            dl.run()
             self.progress.emit(100)
             self.finished.emit(True, "")
+        except DownloadCancelled:
+            self.finished.emit(False, "已取消")
+        except Exception as e:
+            self.finished.emit(False, f"{e}")
+
+# ----------------- 模型安装线程：边下载边解压到暂存目录，完成后原子改名进 models/ -----------------
+class ModelInstallWorker(DownloadWorker):
+    extracted = Signal(int, str)
+    def __init__(self, zip_path: str, folder: Optional[str] = None, url: Optional[str] = None,
+                 sha256: Optional[str] = None, connections: int = 4, parent=None):
+        super().__init__(url or "", zip_path, connections=connections, parent=parent)
+        self.folder = folder
+        self.sha256 = sha256  # 已知的压缩包哈希（可选），不符则拒绝安装
+        self.from_cache = False
+        self._wake = threading.Event()
+    def _on_progress(self, done: int, total: int):
+        super()._on_progress(done, total)
+        self._wake.set()
+    def _on_entry(self, n: int, name: str):
+        self.extracted.emit(n, name)
+    def _on_extract(self, i: int, total: int, name: str):
+        self.progress.emit(int(i * 100 / max(1, total)))
+        self._on_entry(i, name)
+    def run(self):
+        staging = make_staging(MODELS_DIR, self.folder or "import")
+        try:
+            cached = ARCHIVE_CACHE.lookup_url(self.url) if self.url else None
+            if cached:
+                # 缓存里的包入库前已校验过 SHA-256，解压时 zipfile 还会逐条目校验 CRC
+                self.from_cache = True
+                extract_zip(cached, staging, on_entry=self._on_extract, cancelled=self.isInterruptionRequested)
+            elif self.url:
+                self._download_and_extract(staging)
+            else:
+                extract_zip(self.dest_path, staging, on_entry=self._on_extract, cancelled=self.isInterruptionRequested)
+            name = install_staging(staging, MODELS_DIR, self.folder)
+            MODEL_MANIFEST.refresh(name)
+            self.progress.emit(100)
+            self.finished.emit(True, name)
+        except (DownloadCancelled, ExtractCancelled):
+            self.finished.emit(False, "已取消")
         except Exception as e:
+            self.finished.emit(False, f"{e}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    def _download_and_extract(self, staging: str):
+        dl = SegmentedDownloader(self.url, self.dest_path, connections=self.connections, chunk_size=self.chunk,
+                                 progress=self._on_progress, cancelled=self.isInterruptionRequested)
+        ex = StreamingZipExtractor(staging, on_entry=self._on_entry)
+        box = {}
+        def _download():
             try:
-                if os.path.exists(self.dest_path):
-                    os.remove(self.dest_path)
-            except Exception:
+                dl.run()
+            except BaseException as e:
+                box["error"] = e
+            finally:
+                self._wake.set()
+        th = threading.Thread(target=_download, name="model-download", daemon=True)
+        th.start()
+        # 按顺序读取已落盘的连续字节喂给解压器；分段并发时首段之后的数据会在前面的段完成后一次性追上
+        pos = 0
+        try:
+            while True:
+                alive = th.is_alive()
+                avail = dl.contiguous_bytes()
+                if avail > pos and not ex.unsupported and not ex.done:
+                    try:
+                        with open(dl.readable_path(), "rb") as f:
+                            f.seek(pos)
+                            data = f.read(min(avail - pos, 4 * 1024 * 1024))
+                    except FileNotFoundError:
+                        continue  # 恰好在改名，重读
+                    ex.feed(data)
+                    pos += len(data)
+                    continue
+                if not alive:
+                    break
+                self._wake.wait(0.2)
+                self._wake.clear()
+        except ExtractError:
+            # 包内容有误（CRC、非法路径）：不必再下载剩余部分，也不要留下坏的断点供续传
+            self.requestInterruption()
+            th.join()
+            discard_partial(self.dest_path)
+            raise
+        except BaseException:
+            self.requestInterruption()
+            raise
+        finally:
+            ex.close()
+            th.join()
+        if "error" in box:
+            raise box["error"]
+        sha = dl.sha256
+        try:
+            if ARCHIVE_CACHE.is_bad(sha):
+                raise ExtractError(f"该压缩包此前已校验失败，拒绝安装（sha256 {sha[:12]}…）")
+            if self.sha256 and sha != self.sha256.lower():
+                raise ExtractError(f"SHA-256 不符：期望 {self.sha256[:12]}…，实际 {sha[:12]}…")
+            if ex.unsupported or not ex.done:
+                # 流式解析不了的包：整包已就绪，改走 zipfile 常规解压
+                shutil.rmtree(staging, ignore_errors=True)
+                os.makedirs(staging, exist_ok=True)
+                extract_zip(self.dest_path, staging, on_entry=lambda i, n, name: self._on_entry(i, name),
+                            cancelled=self.isInterruptionRequested)
+            else:
+                verify_against_central(self.dest_path, ex.entries)
+        except Exception as e:
+            # 只把内容层面的失败记为坏包；取消、磁盘满之类与包本身无关
+            if isinstance(e, (ExtractError, zipfile.BadZipFile, zlib.error)) and not isinstance(e, ExtractCancelled):
+                ARCHIVE_CACHE.mark_bad(sha, str(e))
+            try:
+                os.remove(self.dest_path)
+            except OSError:
+                pass
+            raise
+        # 校验通过的压缩包移入按内容寻址的缓存，删除后重装不用再下载
+        try:
+            ARCHIVE_CACHE.put(self.dest_path, sha, self.url, name=self.folder or "")
+        except Exception:
+            try:
+                os.remove(self.dest_path)
+            except OSError:
                 pass
-            self.finished.emit(False, f"{e}")
 
 # ----------------- Argos 包下载线程 -----------------
 class ArgosPkgDownloadWorker(QThread):
@@ -64,163 +173,98 @@ class ArgosPkgDownloadWorker(QThread):
         except Exception as e:
             self.finished.emit(False, f"下载失败：{e}", "")
 
+# ----------------- Argos 包索引刷新线程 -----------------
+class ArgosIndexWorker(QThread):
+    finished = Signal(bool)
+    def __init__(self, force: bool = False, parent=None):
+        super().__init__(parent)
+        self.force = force
+    def run(self):
+        try:
+            ok = argos_index_refresh(force=self.force)
+        except Exception:
+            ok = False
+        self.finished.emit(ok)
+
+# ----------------- Argos 翻译器预热线程 -----------------
+class ArgosWarmupWorker(QThread):
+    # 先报告该语言对是否已安装（首次会加载 argostranslate，耗时数秒，不能放在界面线程），再预热
+    pairChecked = Signal(int, bool)
+    finished = Signal(int, str, float)
+    def __init__(self, token: int, src: str, tgt: str, route=TranslateRoute.AUTO, parent=None):
+        super().__init__(parent)
+        self.token = token
+        self.src = src
+        self.tgt = tgt
+        self.route = route
+    def run(self):
+        t0 = time.perf_counter()
+        installed = argos_pair_installed(self.src, self.tgt)
+        self.pairChecked.emit(self.token, installed)
+        try:
+            r = argos_warm_up(self.src, self.tgt, self.route, cancelled=self.isInterruptionRequested) if installed else False
+        except Exception:
+            r = False
+        state = "cancelled" if r is None or self.isInterruptionRequested() else ("ready" if r else "missing")
+        self.finished.emit(self.token, state, time.perf_counter() - t0)
+
+# ----------------- 输入设备枚举线程 -----------------
+class DeviceScanWorker(QThread):
+    # PortAudio 初始化与设备枚举可能耗时数百毫秒，放到后台避免拖慢首屏；
+    # 扫描用的 PyAudio 实例随结果一并交给调用方复用
+    finished = Signal(list, object)
+    def run(self):
+        devices = []
+        pa = None
+        try:
+            import pyaudio
+            pa = pyaudio.PyAudio()
+            devices = [(f"{name} (#{i})", i) for i, name in list_input_devices(pa)]
+        except Exception:
+            pass
+        self.finished.emit(devices, pa)
+
 # ----------------- 录音线程 -----------------
 class AudioCaptureWorker(QThread):
     levelChanged = Signal(float)
     chunkReady = Signal(bytes)
+    captureInfo = Signal(int, int, int)
+    inputStats = Signal(int, float)
     error = Signal(str)
-    def __init__(self, device_index: Optional[int], rate=16000, chunk=1024, parent=None):
+    def __init__(self, device_index: Optional[int], rate=16000, chunk=1024, level_hz=15.0,
+                 sink: Optional[AudioRing] = None, callback_mode=False, parent=None):
         super().__init__(parent)
-        self.device_index = device_index
-        self.rate = rate
-        self.chunk = chunk
-        self.channels = 1
-        self._stop = False
-        self.input_rate = None
-        self.target_rate = rate
+        # 采集逻辑在 CaptureEngine（无 Qt），这里只把回调转成信号
+        self.engine = CaptureEngine(device_index, rate=rate, chunk=chunk, level_hz=level_hz, sink=sink,
+                                    callback_mode=callback_mode,
+                                    on_level=self.levelChanged.emit, on_chunk=self.chunkReady.emit,
+                                    on_info=self.captureInfo.emit, on_stats=self.inputStats.emit,
+                                    on_error=self.error.emit, should_stop=self.isInterruptionRequested)
     def stop(self):
-        self._stop = True
-    def _resample_to_16k(self, audio_np: np.ndarray) -> bytes:
-        if self.input_rate == self.target_rate:
-            return audio_np.tobytes()
-        src = float(self.input_rate); dst = float(self.target_rate)
-        if audio_np.size == 0:
-            return b""
-        dst_len = int(round(audio_np.size * dst / src))
-        if dst_len <= 0:
-            return b""
-        x_old = np.linspace(0, 1, num=audio_np.size, endpoint=False, dtype=np.float64)
-        x_new = np.linspace(0, 1, num=dst_len, endpoint=False, dtype=np.float64)
-        y = np.interp(x_new, x_old, audio_np.astype(np.float64))
-        y = np.clip(y, -32768, 32767).astype(np.int16)
-        return y.tobytes()
+        self.engine.stop()
     def run(self):
-        pa = pyaudio.PyAudio()
-        stream = None
-        try:
-            dev_info = pa.get_device_info_by_index(self.device_index) if self.device_index is not None else pa.get_default_input_device_info()
-            self.input_rate = int(dev_info.get("defaultSampleRate", 16000)) or 16000
-            stream = pa.open(format=pyaudio.paInt16, channels=self.channels, rate=int(self.input_rate),
-                             input=True, input_device_index=self.device_index, frames_per_buffer=self.chunk)
-            level_hist = []
-            while not self._stop and not self.isInterruptionRequested():
-                data = stream.read(self.chunk, exception_on_overflow=False)
-                audio = np.frombuffer(data, dtype=np.int16)
-                if audio.size == 0:
-                    continue
-                rms = float(np.sqrt(np.mean((audio.astype(np.float64) ** 2))))
-                level_hist.append(rms)
-                if len(level_hist) > 30:
-                    level_hist.pop(0)
-                import numpy as _np
-                ref = max(100.0, _np.percentile(level_hist, 95)) if level_hist else 1500.0
-                level_percent = max(0.0, min(100.0, (rms / ref) * 100.0))
-                self.levelChanged.emit(level_percent)
-                resampled = self._resample_to_16k(audio)
-                self.chunkReady.emit(resampled)
-        except Exception as e:
-            self.error.emit(str(e))
-        finally:
-            try:
-                if stream:
-                    stream.stop_stream(); stream.close()
-            except Exception:
-                pass
-            pa.terminate()
+        self.engine.run()
 
 # ----------------- 识别 + 翻译线程 -----------------
 class ASRWorker(QThread):
-    textReady = Signal(str, str)
+    sourceReady = Signal(int, str)
+    textReady = Signal(int, str, str)
     status = Signal(str)
     error = Signal(str)
-    def __init__(self, asr_lang="ja", tgt_lang="zh",
-                 route=TranslateRoute.AUTO, model_folder=None, rate=16000, parent=None):
+    def __init__(self, asr_lang="ja", tgt_lang="zh", parent=None, **kw):
         super().__init__(parent)
-        self.asr_lang = asr_lang
-        self.tgt_lang = tgt_lang
-        self.route = route
-        self.model_folder = model_folder
-        self.rate = rate
-        self._stop = False
-        self._queue = queue.Queue()
-        self.segment_timeout = 1.0
-        self.min_chars = 5
-        self.src_max = 72
-        self.tgt_max = 100
-        self._puncts = set(".,!?，。！？、;；:")
-        self._cur_partial = ""
-        self._last_change_ts = 0.0
+        # 识别/断句/翻译调度在 RecognitionEngine（无 Qt），参数原样透传
+        self.engine = RecognitionEngine(asr_lang, tgt_lang,
+                                        on_source=self.sourceReady.emit, on_text=self.textReady.emit,
+                                        on_status=self.status.emit, on_error=self.error.emit,
+                                        should_stop=self.isInterruptionRequested, **kw)
+        self.ring = self.engine.ring
     def stop(self):
-        self._stop = True
+        self.engine.stop()
     @Slot(bytes)
     def feed(self, audio_bytes: bytes):
-        if not self._stop:
-            self._queue.put(audio_bytes)
-    def _clip(self, s: str, limit: int) -> str:
-        s = s or ""
-        return (s[:limit] + "...") if len(s) > limit else s
-    def _flush_segment(self, text: str):
-        text = (text or "").strip()
-        if not text:
-            return
-        try:
-            trans = argos_translate(text, self.asr_lang, self.tgt_lang, route=self.route) or text
-        except Exception:
-            trans = text
-        self.textReady.emit(self._clip(text, self.src_max), self._clip(trans, self.tgt_max))
+        self.engine.feed(audio_bytes)
+    def spec_stats(self):
+        return self.engine.spec_stats()
     def run(self):
-        if not self.model_folder:
-            self.error.emit("未指定识别模型目录")
-            return
-        model_path = os.path.join(MODELS_DIR, self.model_folder)
-        ok, msg = ensure_vosk_model_ready(self.model_folder)
-        if not ok:
-            self.error.emit(msg); return
-        try:
-            model = vosk.Model(model_path)
-            rec = vosk.KaldiRecognizer(model, self.rate)
-        except Exception as e:
-            self.error.emit(f"加载模型失败：{e}"); return
-        self._cur_partial = ""
-        self._last_change_ts = time.time()
-        while not self._stop and not self.isInterruptionRequested():
-            try:
-                data = self._queue.get(timeout=0.2)
-            except queue.Empty:
-                now = time.time()
-                if self._cur_partial and (now - self._last_change_ts) >= self.segment_timeout and len(self._cur_partial) >= self.min_chars:
-                    self._flush_segment(self._cur_partial)
-                    self._cur_partial = ""
-                continue
-            try:
-                is_final = rec.AcceptWaveform(data)
-            except Exception as e:
-                self.status.emit(f"识别错误：{e}")
-                continue
-            if is_final:
-                try:
-                    r = json.loads(rec.Result() or "{}"); final_seg = (r.get("text") or "").strip()
-                except Exception:
-                    final_seg = ""
-                if final_seg:
-                    self._flush_segment(final_seg)
-                self._cur_partial = ""
-                self._last_change_ts = time.time()
-                continue
-            try:
-                pr = json.loads(rec.PartialResult() or "{}").get("partial", ""); pr = (pr or "").strip()
-            except Exception:
-                pr = ""
-            if pr and pr != self._cur_partial:
-                self._cur_partial = pr
-                self._last_change_ts = time.time()
-                if pr[-1:] in self._puncts or len(pr) >= self.src_max:
-                    self._flush_segment(pr)
-                    self._cur_partial = ""
-                    self._last_change_ts = time.time()
-                    continue
-            now = time.time()
-            if self._cur_partial and (now - self._last_change_ts) >= self.segment_timeout and len(self._cur_partial) >= self.min_chars:
-                self._flush_segment(self._cur_partial)
-                self._cur_partial = ""
-                self._last_change_ts = now
+        self.engine.run()